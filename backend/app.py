@@ -1,12 +1,35 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, stream_with_context
 import pymysql
 import os
 import secrets
+import time
 import logging
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from dotenv import load_dotenv
 import json
+from compression import init_compression, compression_stats
+from rate_limit import init_rate_limit, rate_limit_stats
+from json_provider import FastJSONProvider, JSONFragment
+import snapshots
+import events
+from change_feed import ChangeFeed
+from idempotency import idempotent, init_idempotency
+import group_commit
+import jobs
+import roster
+from replicas import ReplicaPool
+from query_cache import QueryCache
+from hot_store import HotQuizStore
+from tag_index import TagIndex, normalize_tags, bit_positions
+import autocomplete
+import dedupe
+import grading
+import irt
+import numpy as np
+import recommender
+import srs
+from datetime import datetime, timezone
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +37,12 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev')
 
+# Encode responses with orjson when it is installed
+app.json = FastJSONProvider(app)
+
+# Opt-in gzip/brotli response compression
+init_compression(app)
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -32,10 +61,104 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
+# Optional read replicas (DB_REPLICA_HOSTS=host[:port],...) for read-only handlers
+replicas = ReplicaPool.from_env(DB_CONFIG)
+# Callers read from the primary for this long after a write, so they see their own changes
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+# Upper bound on ids accepted by GET /quizzes?ids=...
+MAX_BATCH_IDS = int(os.environ.get('MAX_BATCH_IDS', 100))
+# Upper bounds for the review queue and for grades recorded in one request
+MAX_DUE_REVIEWS = 100
+# Unseen quizzes of the requested theme added to a review queue that is not full
+NEW_REVIEW_CARDS = 10
+MAX_REVIEW_BATCH = 500
+# Upper bound on changed rows returned by one GET /sync page
+MAX_SYNC_BATCH = 1000
+# Upper bound on answers graded by one POST /quizzes/grade
+MAX_GRADE_BATCH = 5000
+
 def get_db():
     """Get database connection"""
     return pymysql.connect(**DB_CONFIG)
 
+def api_key_exists(api_key):
+    """Check whether an API key belongs to a user"""
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM api_keys WHERE api_key = %s", (api_key,))
+            return cursor.fetchone() is not None
+    finally:
+        db.close()
+
+# Opt-in per-client token bucket rate limiting
+init_rate_limit(app, api_key_exists)
+
+# Last write per user in this process; session users also carry it in their cookie
+_last_writes = {}
+MAX_TRACKED_WRITERS = 10000
+
+def wrote_recently():
+    """Check whether the current caller wrote within READ_YOUR_WRITES_SECONDS"""
+    user_id = getattr(request, 'user_id', None) or session.get('user_id')
+    last_write = max(_last_writes.get(user_id, 0), session.get('last_write_at', 0))
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+def get_read_db():
+    """Connection for read-only handlers: a healthy replica, or the primary
+
+    The primary is used when no replica is configured or healthy, and for
+    callers who wrote recently and might not see their change on a replica yet.
+    """
+    if replicas is None or wrote_recently():
+        return get_db()
+    config = replicas.choose()
+    if config is None:
+        return get_db()
+    try:
+        return pymysql.connect(**config)
+    except pymysql.err.OperationalError as e:
+        logger.warning(f"Replica {config['host']} unavailable, reading from the primary: {e}")
+        replicas.mark_down(config)
+        return get_db()
+
+@app.after_request
+def remember_write(response):
+    """Record successful writes for read-your-writes routing"""
+    if replicas is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        now = time.time()
+        user_id = getattr(request, 'user_id', None) or session.get('user_id')
+        if user_id is not None:
+            if len(_last_writes) >= MAX_TRACKED_WRITERS:
+                _last_writes.clear()
+            _last_writes[user_id] = now
+        if 'user_id' in session:
+            session['last_write_at'] = now
+    return response
+
+# Opt-in cache for small, hot, rarely changing reads; writes invalidate by table
+query_cache = QueryCache.from_env()
+# Opt-in store of the most read quizzes, kept with their encoded detail response
+hot_quizzes = HotQuizStore.from_env()
+# Tables read by quiz_select() queries
+QUIZ_TABLES = ('quizzes', 'themes', 'users')
+
+def cached_rows(sql, params, tables):
+    """Rows of a read query through query_cache, connecting only on a miss"""
+    def load():
+        db = get_read_db()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(sql, params)
+                return list(cursor.fetchall())
+        finally:
+            db.close()
+    return query_cache.get_or_load(sql, params, tables, load)
+
+# Optional write coalescing for bursts of POST /quizzes
+quiz_writer = group_commit.GroupCommitter(get_db) if group_commit.GROUP_COMMIT_ENABLED else None
+
 def require_api_key(f):
     """Decorator to require API key for protected routes"""
     @wraps(f)
@@ -84,15 +207,191 @@ def require_login(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def check_admin_exists():
-    """Check if admin user exists"""
-    db = get_db()
+# Quiz fields clients may request with ?fields=..., and the SQL selecting each
+QUIZ_FIELDS = {
+    'id': 'q.id',
+    'user_id': 'q.user_id',
+    'quiz_type': 'q.quiz_type',
+    'question_text': 'q.question_text',
+    'answer_text': 'q.answer_text',
+    'answer_tolerance': 'q.answer_tolerance',
+    'theme_id': 'q.theme_id',
+    'theme_name': 't.name AS theme_name',
+    'created_by': 'u.name AS created_by',
+    'created_at': 'q.created_at',
+    'updated_at': 'q.updated_at',
+    # IRT estimate from the calibrate_difficulty job; higher is harder, None until calibrated
+    'difficulty': 'qd.difficulty',
+}
+# Lightweight default for list views; answer bodies are only sent on request
+SUMMARY_FIELDS = ('id', 'quiz_type', 'question_text', 'theme_id', 'theme_name')
+# Default for single quiz lookups
+DETAIL_FIELDS = ('id', 'user_id', 'quiz_type', 'question_text', 'answer_text', 'theme_id', 'theme_name', 'created_at')
+
+def parse_fields(default):
+    """Resolve the ?fields= parameter (a comma separated list, 'summary' or 'all') against QUIZ_FIELDS"""
+    value = request.args.get('fields', '').strip()
+    if not value:
+        return default
+    if value == 'summary':
+        return SUMMARY_FIELDS
+    if value == 'all':
+        return tuple(QUIZ_FIELDS)
+
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in QUIZ_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Rows are always identified by id
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return tuple(fields)
+
+def quiz_select(fields, join_users=False, extra_columns=()):
+    """Build the SELECT ... FROM clause reading only the columns behind the requested fields"""
+    columns = [QUIZ_FIELDS[field] for field in fields]
+    if 'answer_text' in fields and 'quiz_type' not in fields:
+        # decode_answer needs the type; prepare_quizzes drops it again
+        columns.append(QUIZ_FIELDS['quiz_type'])
+    columns.extend(extra_columns)
+
+    sql = f"SELECT {', '.join(columns)} FROM quizzes q"
+    if 'theme_name' in fields:
+        sql += " LEFT JOIN themes t ON q.theme_id = t.id"
+    if join_users or 'created_by' in fields:
+        sql += " JOIN users u ON q.user_id = u.id"
+    if 'difficulty' in fields:
+        sql += " LEFT JOIN quiz_difficulty qd ON qd.quiz_id = q.id"
+    return sql
+
+# Heavy payloads kept outside the quizzes table, loaded only with ?expand=...
+EXPANSIONS = ('structure',)
+
+def parse_expand():
+    """Resolve the ?expand= parameter against EXPANSIONS"""
+    value = request.args.get('expand', '')
+    expand = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = expand.difference(EXPANSIONS)
+    if unknown:
+        raise ValueError(f"Unknown expansions: {', '.join(sorted(unknown))}")
+    return expand
+
+def load_structures(cursor, quizzes):
+    """Attach the structured payload (hints, code examples, ...) of each quiz with one batched query"""
+    if not quizzes:
+        return quizzes
+    quiz_ids = [quiz['id'] for quiz in quizzes]
+    placeholders = ', '.join(['%s'] * len(quiz_ids))
+    cursor.execute(
+        f"SELECT quiz_id, structure FROM quiz_structures WHERE quiz_id IN ({placeholders})",
+        quiz_ids
+    )
+    # MySQL has already validated the JSON, so it is sent on without decoding
+    structures = {row['quiz_id']: JSONFragment(row['structure']) for row in cursor.fetchall()}
+    for quiz in quizzes:
+        quiz['structure'] = structures.get(quiz['id'])
+    return quizzes
+
+def prepare_quizzes(quizzes, fields):
+    """Decode answers and drop helper columns that were not requested"""
+    for quiz in quizzes:
+        decode_answer(quiz)
+        if 'quiz_type' not in fields:
+            quiz.pop('quiz_type', None)
+    return quizzes
+
+def decode_answer(quiz):
+    """Parse the answer_text of a multiple choice quiz row from JSON, in place"""
+    if quiz.get('quiz_type') == 'multiple_choice' and 'answer_text' in quiz:
+        try:
+            quiz['answer_text'] = json.loads(quiz['answer_text'])
+        except (json.JSONDecodeError, TypeError):
+            # If JSON parsing fails, leave as is
+            pass
+    return quiz
+
+def next_change_seq(cursor):
+    """Allocate the change sequence number for a quiz write
+
+    The counter row stays locked until the surrounding transaction commits,
+    so quiz changes become visible in sequence order and GET /sync never
+    skips a row that commits late.
+    """
+    cursor.execute(
+        "UPDATE change_sequence SET value = LAST_INSERT_ID(value + 1) WHERE name = 'quizzes'"
+    )
+    cursor.execute("SELECT LAST_INSERT_ID() AS seq")
+    seq = cursor.fetchone()['seq']
+    quiz_changes.mark_local(seq)
+    return seq
+
+# Quiz columns sent with quiz.created events
+QUIZ_EVENT_FIELDS = ('id', 'user_id', 'quiz_type', 'question_text', 'theme_id')
+
+def quiz_event(row):
+    """The /events event for a row of load_quiz_changes, identified by its change_seq"""
+    if row['deleted_at'] is not None:
+        return events.Event(row['change_seq'], 'quiz.deleted', row['theme_id'], row['user_id'],
+                            {'id': row['id'], 'user_id': row['user_id'], 'theme_id': row['theme_id']})
+    if not row['created']:
+        return events.Event(row['change_seq'], 'quiz.updated', row['theme_id'], row['user_id'],
+                            {'id': row['id'], 'user_id': row['user_id'], 'theme_id': row['theme_id'],
+                             'tags': row['tags']})
+    return events.Event(row['change_seq'], 'quiz.created', row['theme_id'], row['user_id'],
+                        {field: row[field] for field in QUIZ_EVENT_FIELDS})
+
+def publish_quiz_event(row):
+    """Notify /events subscribers about a committed quiz change"""
+    event = quiz_event(row)
     try:
-        with db.cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE is_admin = TRUE")
-            return cursor.fetchone() is not None
-    finally:
-        db.close()
+        events.publish(event.type, event.data, theme_id=event.theme_id, user_id=event.user_id, event_id=event.id)
+    except Exception:
+        # The write already succeeded; a lost notification only delays clients
+        logger.error(f"Failed to publish {event.type} event", exc_info=True)
+
+def quiz_created(quiz):
+    """Bring this process's caches and indexes up to date with a committed new quiz
+
+    quiz holds id, user_id, quiz_type, question_text, theme_id and tags.
+    """
+    query_cache.invalidate('quizzes')
+    tag_index.add(quiz['id'], quiz['tags'])
+    completions.quiz_added(quiz['question_text'], quiz['theme_id'])
+    snapshots.schedule_rebuild(quiz['theme_id'])
+
+def quiz_updated(quiz):
+    """Bring this process's caches and indexes up to date with a committed edit of a quiz's tags
+
+    quiz holds id and tags.
+    """
+    query_cache.invalidate('quizzes')
+    tag_index.remove(quiz['id'])
+    tag_index.add(quiz['id'], quiz['tags'])
+
+def quiz_deleted(quiz):
+    """Drop a committed deletion from this process's caches and indexes
+
+    quiz holds id, user_id, question_text and theme_id.
+    """
+    query_cache.invalidate('quizzes')
+    hot_quizzes.discard(quiz['id'])
+    tag_index.remove(quiz['id'])
+    completions.quiz_removed(quiz['question_text'], quiz['theme_id'])
+    duplicates.remove(quiz['id'])
+    snapshots.schedule_rebuild(quiz['theme_id'])
+
+def is_admin(cursor, user_id):
+    """Check whether a user is an admin"""
+    cursor.execute("SELECT is_admin FROM users WHERE id = %s", (user_id,))
+    user = cursor.fetchone()
+    return bool(user and user['is_admin'])
+
+# Named lock held while the first admin is created
+SETUP_LOCK = 'quizbox_setup'
+
+def check_admin_exists():
+    """Check if admin user exists; cached, so setup_admin re-checks on the primary"""
+    return bool(cached_rows("SELECT id FROM users WHERE is_admin = TRUE LIMIT 1", (), ('users',)))
 
 @app.route('/setup/status', methods=['GET'])
 def setup_status():
@@ -102,10 +401,6 @@ def setup_status():
 @app.route('/setup', methods=['POST'])
 def setup_admin():
     """Create admin user"""
-    if check_admin_exists():
-        logger.warning("Attempt to create admin when one already exists")
-        return jsonify({'error': 'Admin already exists'}), 400
-    
     data = request.get_json()
     logger.debug(f"Setup data received: {data}")
     
@@ -116,34 +411,20 @@ def setup_admin():
     db = get_db()
     try:
         with db.cursor() as cursor:
-            # Create admin user
-            password_hash = generate_password_hash(data['password'])
-            logger.debug(f"Creating admin user: {data['name']}, {data['email']}")
-            
-            cursor.execute(
-                "INSERT INTO users (name, email, password_hash, is_admin) VALUES (%s, %s, %s, %s)",
-                (data['name'], data['email'], password_hash, True)
-            )
-            user_id = cursor.lastrowid
-            logger.debug(f"Created admin user with ID: {user_id}")
-            
-            # Generate API key
-            api_key = secrets.token_urlsafe(32)
-            cursor.execute(
-                "INSERT INTO api_keys (user_id, api_key) VALUES (%s, %s)",
-                (user_id, api_key)
-            )
-            
-            db.commit()
-            logger.info("Admin user created successfully")
-            
-            # Set session for the new admin
-            session['user_id'] = user_id
-            
-            return jsonify({
-                'message': 'Admin user created successfully',
-                'api_key': api_key
-            }), 201
+            # Serialize setups and check the primary, not query_cache, so a
+            # stale cached answer can never let a second admin through
+            cursor.execute("SELECT GET_LOCK(%s, 10) AS locked", (SETUP_LOCK,))
+            if not cursor.fetchone()['locked']:
+                return jsonify({'error': 'Setup is already in progress'}), 409
+            try:
+                cursor.execute("SELECT id FROM users WHERE is_admin = TRUE LIMIT 1 FOR UPDATE")
+                if cursor.fetchone():
+                    db.rollback()
+                    logger.warning("Attempt to create admin when one already exists")
+                    return jsonify({'error': 'Admin already exists'}), 400
+                return create_admin(db, cursor, data)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (SETUP_LOCK,))
     except Exception as e:
         logger.error("Error during admin setup", exc_info=True)
         db.rollback()
@@ -151,7 +432,40 @@ def setup_admin():
     finally:
         db.close()
 
+def create_admin(db, cursor, data):
+    """Insert the first admin and their API key; runs while setup_admin holds SETUP_LOCK"""
+    # Create admin user
+    password_hash = generate_password_hash(data['password'])
+    logger.debug(f"Creating admin user: {data['name']}, {data['email']}")
+    
+    cursor.execute(
+        "INSERT INTO users (name, email, password_hash, is_admin) VALUES (%s, %s, %s, %s)",
+        (data['name'], data['email'], password_hash, True)
+    )
+    user_id = cursor.lastrowid
+    logger.debug(f"Created admin user with ID: {user_id}")
+    
+    # Generate API key
+    api_key = secrets.token_urlsafe(32)
+    cursor.execute(
+        "INSERT INTO api_keys (user_id, api_key) VALUES (%s, %s)",
+        (user_id, api_key)
+    )
+    
+    db.commit()
+    query_cache.invalidate('users')
+    logger.info("Admin user created successfully")
+    
+    # Set session for the new admin
+    session['user_id'] = user_id
+    
+    return jsonify({
+        'message': 'Admin user created successfully',
+        'api_key': api_key
+    }), 201
+
 @app.route('/register', methods=['POST'])
+@idempotent
 def register():
     """Register a new user"""
     data = request.get_json()
@@ -182,6 +496,7 @@ def register():
                 
                 # Commit transaction
                 db.commit()
+                query_cache.invalidate('users')
                 
                 # Set session
                 session['user_id'] = user_id
@@ -315,88 +630,350 @@ def health_check():
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose internal performance counters"""
+    stats = {'compression': compression_stats(), 'rate_limit': rate_limit_stats()}
+    if replicas is not None:
+        stats['replicas'] = replicas.stats()
+    if query_cache.enabled:
+        stats['query_cache'] = query_cache.stats()
+    if hot_quizzes.enabled:
+        stats['hot_quizzes'] = hot_quizzes.stats()
+    if quiz_writer is not None:
+        stats['group_commit'] = quiz_writer.stats()
+    if duplicates.enabled:
+        stats['duplicates'] = duplicates.stats()
+    stats['change_feed'] = quiz_changes.stats()
+    return jsonify(stats)
+
 @app.route('/themes', methods=['GET'])
 def get_themes():
     """Get all available themes"""
-    db = get_db()
     try:
-        with db.cursor() as cursor:
-            cursor.execute("SELECT id, name FROM themes")
-            themes = cursor.fetchall()
-            logger.debug(f"Found {len(themes)} themes: {themes}")
-            return jsonify(themes)  # Return themes array directly
+        themes = cached_rows("SELECT id, name FROM themes", (), ('themes',))
+        logger.debug(f"Found {len(themes)} themes: {themes}")
+        return jsonify(themes)  # Return themes array directly
     except Exception as e:
         logger.error("Error fetching themes", exc_info=True)
         return jsonify({'error': 'Failed to fetch themes'}), 500
-    finally:
-        db.close()
+
+@app.route('/autocomplete', methods=['GET'])
+@require_login
+def get_autocomplete():
+    """Most used theme names or question texts starting with ?prefix="""
+    kind = request.args.get('kind', 'theme')
+    if kind not in autocomplete.KINDS:
+        return jsonify({'error': f"kind must be one of: {', '.join(autocomplete.KINDS)}"}), 400
+    try:
+        limit = int(request.args.get('limit', autocomplete.DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= autocomplete.MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {autocomplete.MAX_LIMIT}'}), 400
+
+    matches = completions.search(kind, request.args.get('prefix', ''), limit)
+    if kind == 'theme':
+        return jsonify([{'id': theme_id, 'name': name, 'quizzes': quizzes} for name, quizzes, theme_id in matches])
+    return jsonify([{'question_text': text, 'quizzes': quizzes} for text, quizzes, _ in matches])
 
 @app.route('/quizzes', methods=['POST'])
 @require_login
+@idempotent
 def create_quiz():
-    db = get_db()
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-            
-        required_fields = ['quiz_type', 'question_text', 'answer_text', 'theme_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+
+        error = validate_quiz(data)
+        if error:
+            return jsonify({'error': error}), 400
+        structure = data.get('structure')
                 
-        # Validate quiz type
-        if data['quiz_type'] not in ['text', 'multiple_choice', 'true_false']:
-            return jsonify({'error': 'Invalid quiz type'}), 400
-            
-        # For multiple choice quizzes, validate answer_text format
-        if data['quiz_type'] == 'multiple_choice':
+        user_id = request.user_id
+        data['signature'] = dedupe.signature(data['question_text'])
+        similar = duplicates.find(data['signature'], user_id, data['theme_id'])
+        if similar and duplicates.mode == 'reject' and not data.get('allow_duplicate'):
+            return jsonify({'error': 'A similar question already exists', 'duplicates': duplicate_list(similar)}), 409
+
+        if quiz_writer is not None:
+            # Committed together with other quizzes arriving at the same time
+            quiz_id = quiz_writer.run(lambda cursor: insert_quiz(cursor, user_id, data, structure))
+        else:
+            db = get_db()
             try:
-                if not isinstance(data['answer_text'], dict):
-                    return jsonify({'error': 'Answer text must be a JSON object for multiple choice quizzes'}), 400
-                if 'options' not in data['answer_text'] or 'correct' not in data['answer_text']:
-                    return jsonify({'error': 'Answer text must contain options and correct fields for multiple choice quizzes'}), 400
-                data['answer_text'] = json.dumps(data['answer_text'])
-            except json.JSONDecodeError:
-                return jsonify({'error': 'Invalid JSON format for answer text'}), 400
-                
-        with db.cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO quizzes (user_id, quiz_type, question_text, answer_text, theme_id) 
-                   VALUES (%s, %s, %s, %s, %s)""",
-                (request.user_id, data['quiz_type'], data['question_text'], 
-                 data['answer_text'], data['theme_id'])
-            )
-            quiz_id = cursor.lastrowid
-            db.commit()
-            
-            return jsonify({
-                'message': 'Quiz created successfully',
-                'id': quiz_id
-            }), 201
+                with db.cursor() as cursor:
+                    quiz_id = insert_quiz(cursor, user_id, data, structure)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        duplicates.add(quiz_id, user_id, data['theme_id'], data['signature'])
+        quiz_created(dict(data, id=quiz_id, user_id=user_id))
+        
+        result = {
+            'message': 'Quiz created successfully',
+            'id': quiz_id
+        }
+        if similar:
+            result['duplicates'] = duplicate_list(similar)
+        return jsonify(result), 201
         
     except Exception as e:
-        db.rollback()
         app.logger.error(f"Error creating quiz: {str(e)}")
         return jsonify({'error': 'Failed to create quiz'}), 500
+
+def validate_quiz(data):
+    """Check a quiz submitted by a client; returns an error message or None
+
+    Multiple choice answers are encoded to JSON text in place.
+    """
+    required_fields = ['quiz_type', 'question_text', 'answer_text', 'theme_id']
+    for field in required_fields:
+        if field not in data:
+            return f'Missing required field: {field}'
+            
+    # Validate quiz type
+    if data['quiz_type'] not in ['text', 'multiple_choice', 'true_false']:
+        return 'Invalid quiz type'
+        
+    # For multiple choice quizzes, validate answer_text format
+    if data['quiz_type'] == 'multiple_choice':
+        try:
+            if not isinstance(data['answer_text'], dict):
+                return 'Answer text must be a JSON object for multiple choice quizzes'
+            if 'options' not in data['answer_text'] or 'correct' not in data['answer_text']:
+                return 'Answer text must contain options and correct fields for multiple choice quizzes'
+            data['answer_text'] = json.dumps(data['answer_text'])
+        except (TypeError, ValueError):
+            return 'Invalid JSON format for answer text'
+
+    # Typos forgiven when grading text answers; None uses a length-based default
+    tolerance = data.get('answer_tolerance')
+    if tolerance is not None and (not isinstance(tolerance, int) or not 0 <= tolerance <= grading.MAX_TOLERANCE):
+        return f'answer_tolerance must be an integer from 0 to {grading.MAX_TOLERANCE}'
+
+    # Optional nested payload (hints, code examples, ...) stored in a side table
+    structure = data.get('structure')
+    if structure is not None and not isinstance(structure, dict):
+        return 'Structure must be a JSON object'
+
+    try:
+        data['tags'] = normalize_tags(data.get('tags', []))
+    except ValueError as e:
+        return str(e)
+    return None
+
+def insert_quiz(cursor, user_id, data, structure=None):
+    """Insert a validated quiz (answer_text already encoded) and its structure; returns the id
+
+    The question's MinHash signature is stored too, and left in data['signature'].
+    """
+    seq = next_change_seq(cursor)
+    cursor.execute(
+        """INSERT INTO quizzes (user_id, quiz_type, question_text, answer_text, answer_tolerance, theme_id,
+                                change_seq, created_seq) 
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+        (user_id, data['quiz_type'], data['question_text'], 
+         data['answer_text'], data.get('answer_tolerance'), data['theme_id'], seq, seq)
+    )
+    quiz_id = cursor.lastrowid
+    if structure is not None:
+        cursor.execute(
+            "INSERT INTO quiz_structures (quiz_id, structure) VALUES (%s, %s)",
+            (quiz_id, json.dumps(structure))
+        )
+    if data.get('tags'):
+        insert_quiz_tags(cursor, quiz_id, data['tags'])
+    data['signature'] = data.get('signature') or dedupe.signature(data['question_text'])
+    cursor.execute(
+        "INSERT INTO quiz_signatures (quiz_id, signature) VALUES (%s, %s)",
+        (quiz_id, data['signature'])
+    )
+    return quiz_id
+
+def insert_quiz_tags(cursor, quiz_id, tags):
+    """Attach tags (normalized names) to a quiz, creating missing tags"""
+    cursor.executemany("INSERT IGNORE INTO tags (name) VALUES (%s)", [(tag,) for tag in tags])
+    placeholders = ', '.join(['%s'] * len(tags))
+    cursor.execute(
+        f"""INSERT IGNORE INTO quiz_tags (quiz_id, tag_id)
+            SELECT %s, id FROM tags WHERE name IN ({placeholders})""",
+        (quiz_id, *tags)
+    )
+
+def load_quiz_tags():
+    """(quiz_id, tag) pairs of live quizzes, for building the tag index"""
+    db = get_db()
+    try:
+        with db.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                """SELECT qt.quiz_id, t.name FROM quiz_tags qt
+                   JOIN tags t ON t.id = qt.tag_id
+                   JOIN quizzes q ON q.id = qt.quiz_id
+                   WHERE q.deleted_at IS NULL"""
+            )
+            return list(cursor)
+    finally:
+        db.close()
+
+# In-memory tag bitmaps answering GET /quizzes?tags=..., updated on every tag write
+tag_index = TagIndex(load_quiz_tags)
+
+def load_autocomplete():
+    """Themes with their live quiz counts and every live question, for the autocomplete index"""
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT t.id, t.name, COUNT(q.id) AS quizzes FROM themes t
+                   LEFT JOIN quizzes q ON q.theme_id = t.id AND q.deleted_at IS NULL
+                   GROUP BY t.id, t.name"""
+            )
+            themes = [(row['id'], row['name'], row['quizzes']) for row in cursor.fetchall()]
+        with db.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute("SELECT question_text FROM quizzes WHERE deleted_at IS NULL")
+            questions = [row[0] for row in cursor]
+        return themes, questions
     finally:
         db.close()
 
+# Sorted prefix indexes behind GET /autocomplete, updated on quiz writes
+completions = autocomplete.Autocomplete(load_autocomplete)
+
+def load_signatures(after_seq):
+    """Quiz signatures changed after a change_seq, for the duplicate index
+
+    Quizzes created before signatures were stored get theirs computed and
+    saved here, so the first load after an upgrade backfills them.
+    """
+    db = get_db()
+    try:
+        with db.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                """SELECT q.id, q.user_id, q.theme_id, q.deleted_at IS NOT NULL, q.change_seq, s.signature,
+                          CASE WHEN s.signature IS NULL AND q.deleted_at IS NULL THEN q.question_text END
+                   FROM quizzes q LEFT JOIN quiz_signatures s ON s.quiz_id = q.id
+                   WHERE q.change_seq > %s ORDER BY q.change_seq""",
+                (after_seq,)
+            )
+            rows = list(cursor)
+        missing = {}
+        for quiz_id, _, _, deleted, _, signature, question_text in rows:
+            if signature is None and not deleted:
+                missing[quiz_id] = dedupe.signature(question_text)
+        if missing:
+            with db.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT IGNORE INTO quiz_signatures (quiz_id, signature) VALUES (%s, %s)",
+                    list(missing.items())
+                )
+            db.commit()
+        return [(quiz_id, user_id, theme_id, deleted, change_seq, missing.get(quiz_id, signature))
+                for quiz_id, user_id, theme_id, deleted, change_seq, signature, _ in rows]
+    finally:
+        db.close()
+
+# MinHash/LSH index flagging (DUPLICATE_CHECK=flag) or rejecting (=reject)
+# near-duplicate questions of the same user or theme
+duplicates = dedupe.DuplicateIndex.from_env(load_signatures)
+
+def duplicate_list(similar):
+    return [{'id': quiz_id, 'similarity': score} for quiz_id, score in similar]
+
+def current_change_seq():
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT value FROM change_sequence WHERE name = 'quizzes'")
+            row = cursor.fetchone()
+            return row['value'] if row else 0
+    finally:
+        db.close()
+
+def load_quiz_changes(after_seq, limit):
+    """Quizzes written after a change_seq, oldest first, with the tags of live ones
+
+    'created' tells quizzes inserted after after_seq from older ones edited since.
+    """
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            # Range scan on idx_quizzes_change_seq
+            cursor.execute(
+                """SELECT id, user_id, quiz_type, question_text, theme_id, deleted_at, change_seq, created_seq
+                   FROM quizzes WHERE change_seq > %s ORDER BY change_seq LIMIT %s""",
+                (after_seq, limit)
+            )
+            rows = list(cursor.fetchall())
+            live = [row['id'] for row in rows if row['deleted_at'] is None]
+            tags = {}
+            if live:
+                placeholders = ', '.join(['%s'] * len(live))
+                cursor.execute(
+                    f"""SELECT qt.quiz_id, t.name FROM quiz_tags qt JOIN tags t ON t.id = qt.tag_id
+                        WHERE qt.quiz_id IN ({placeholders})""",
+                    live
+                )
+                for row in cursor.fetchall():
+                    tags.setdefault(row['quiz_id'], []).append(row['name'])
+            for row in rows:
+                row['tags'] = tags.get(row['id'], [])
+                row['created'] = row.pop('created_seq') > after_seq
+            return rows
+    finally:
+        db.close()
+
+def apply_quiz_changes(rows):
+    """Run the post-commit hooks for quiz writes made by other processes, and publish every change
+
+    Events for this process's own writes are published here too, so /events
+    sees all changes in change_seq order whichever process made them.
+    """
+    for row in rows:
+        if not row['local']:
+            if row['deleted_at'] is not None:
+                quiz_deleted(row)
+            elif row['created']:
+                quiz_created(row)
+            else:
+                quiz_updated(row)
+        publish_quiz_event(row)
+
+def replay_quiz_events(last_id, limit):
+    """Events after last_id read back from quizzes, for /events clients resuming from before the buffer"""
+    return [quiz_event(row) for row in load_quiz_changes(last_id, limit)]
+
+# Keeps this process in step with writes from other API processes and job workers
+quiz_changes = ChangeFeed(current_change_seq, load_quiz_changes, apply_quiz_changes,
+                          on_start=lambda seq: events.get_broker().start_at(seq))
+
+@app.before_request
+def follow_quiz_changes():
+    # Started by the first request, so only processes serving the API poll
+    quiz_changes.start()
+
 @app.route('/quiz/mine', methods=['GET'])
 @require_login
 def get_my_quizzes():
     """Get all quizzes created by the current user"""
-    db = get_db()
+    try:
+        fields = parse_fields(SUMMARY_FIELDS)
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = get_read_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute(
-                """SELECT q.id, q.question_text, q.answer_text, q.structure, q.theme_id, t.name as theme_name
-                   FROM quizzes q
-                   LEFT JOIN themes t ON q.theme_id = t.id
-                   WHERE q.user_id = %s""",
-                (request.user_id,)
-            )
-            quizzes = cursor.fetchall()
+            cursor.execute(quiz_select(fields) + " WHERE q.deleted_at IS NULL AND q.user_id = %s", (request.user_id,))
+            quizzes = prepare_quizzes(cursor.fetchall(), fields)
+            if 'structure' in expand:
+                load_structures(cursor, quizzes)
             return jsonify(quizzes)
     finally:
         db.close()
@@ -404,56 +981,136 @@ def get_my_quizzes():
 @app.route('/quizzes/default', methods=['GET'])
 def get_default_quizzes():
     """Get all quizzes created by admin users"""
-    db = get_db()
+    try:
+        fields = parse_fields(SUMMARY_FIELDS + ('created_by',))
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = get_read_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute(
-                """SELECT q.id, q.quiz_type, q.question_text, q.answer_text, q.theme_id, t.name as theme_name, u.name as created_by
-                   FROM quizzes q
-                   LEFT JOIN themes t ON q.theme_id = t.id
-                   JOIN users u ON q.user_id = u.id
-                   WHERE u.is_admin = TRUE"""
-            )
-            quizzes = cursor.fetchall()
-            
-            # For multiple choice quizzes, parse the answer_text as JSON
-            for quiz in quizzes:
-                if quiz['quiz_type'] == 'multiple_choice':
-                    try:
-                        quiz['answer_text'] = json.loads(quiz['answer_text'])
-                    except (json.JSONDecodeError, TypeError):
-                        # If JSON parsing fails, leave as is
-                        pass
-            
+            cursor.execute(quiz_select(fields, join_users=True) + " WHERE q.deleted_at IS NULL AND u.is_admin = TRUE")
+            quizzes = prepare_quizzes(cursor.fetchall(), fields)
+            if 'structure' in expand:
+                load_structures(cursor, quizzes)
             return jsonify(quizzes)
     finally:
         db.close()
 
+def parse_id_list(value):
+    """Parse a comma separated list of ids, keeping their order and dropping duplicates"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(f'Invalid quiz id: {part}')
+        ids.append(int(part))
+    return list(dict.fromkeys(ids))
+
+def get_quizzes_by_ids(quiz_ids, fields, expand=()):
+    """Fetch many quizzes with a single query, in the requested order"""
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(quiz_ids))
+            cursor.execute(quiz_select(fields) + f" WHERE q.deleted_at IS NULL AND q.id IN ({placeholders})", quiz_ids)
+            quizzes = prepare_quizzes(cursor.fetchall(), fields)
+            if 'structure' in expand:
+                load_structures(cursor, quizzes)
+            found = {quiz['id']: quiz for quiz in quizzes}
+    finally:
+        db.close()
+
+    return jsonify({
+        'quizzes': [found[quiz_id] for quiz_id in quiz_ids if quiz_id in found],
+        'missing': [quiz_id for quiz_id in quiz_ids if quiz_id not in found]
+    })
+
+def parse_tag_list(name):
+    value = request.args.get(name, '')
+    return normalize_tags(value.split(',')) if value else []
+
+def get_quizzes_by_tags():
+    """Quizzes matching a tag expression, evaluated on the in-memory tag bitmaps"""
+    try:
+        all_of = parse_tag_list('tags')
+        any_of = parse_tag_list('any')
+        none_of = parse_tag_list('not')
+        fields = parse_fields(SUMMARY_FIELDS)
+        limit = int(request.args.get('limit', MAX_BATCH_IDS))
+        after = int(request.args.get('after', 0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not all_of and not any_of:
+        return jsonify({'error': 'tags or any is required'}), 400
+    if not 1 <= limit <= MAX_BATCH_IDS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_BATCH_IDS}'}), 400
+
+    matches = tag_index.query(all_of, any_of, none_of)
+    total = matches.bit_count()
+    # Keyset pagination: drop ids up to and including `after`
+    matches = (matches >> (after + 1)) << (after + 1) if after > 0 else matches
+    quiz_ids = bit_positions(matches, limit=limit + 1)
+    has_more = len(quiz_ids) > limit
+    quiz_ids = quiz_ids[:limit]
+
+    quizzes = []
+    if quiz_ids:
+        db = get_read_db()
+        try:
+            with db.cursor() as cursor:
+                placeholders = ', '.join(['%s'] * len(quiz_ids))
+                cursor.execute(
+                    quiz_select(fields) + f" WHERE q.deleted_at IS NULL AND q.id IN ({placeholders}) ORDER BY q.id",
+                    quiz_ids
+                )
+                quizzes = prepare_quizzes(cursor.fetchall(), fields)
+        finally:
+            db.close()
+
+    return jsonify({
+        'quizzes': quizzes,
+        'total': total,
+        'next_after': quiz_ids[-1] if has_more else None
+    })
+
 @app.route('/quizzes', methods=['GET'])
 @require_login
 def get_quizzes():
+    # GET /quizzes?ids=1,2,3 fetches specific quizzes instead of the user's own
+    if 'ids' in request.args:
+        try:
+            quiz_ids = parse_id_list(request.args['ids'])
+            fields = parse_fields(DETAIL_FIELDS)
+            expand = parse_expand()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not quiz_ids:
+            return jsonify({'error': 'No quiz ids provided'}), 400
+        if len(quiz_ids) > MAX_BATCH_IDS:
+            return jsonify({'error': f'At most {MAX_BATCH_IDS} quiz ids can be requested at once'}), 400
+        return get_quizzes_by_ids(quiz_ids, fields, expand)
+
+    # GET /quizzes?tags=a,b&any=c,d&not=e filters all quizzes by tags
+    if 'tags' in request.args or 'any' in request.args:
+        return get_quizzes_by_tags()
+
     try:
-        db = get_db()
+        fields = parse_fields(SUMMARY_FIELDS)
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        db = get_read_db()
         with db.cursor() as cursor:
-            cursor.execute(
-                """SELECT q.id, q.user_id, q.quiz_type, q.question_text, q.answer_text, q.theme_id, 
-                          t.name as theme_name, q.created_at 
-                   FROM quizzes q
-                   LEFT JOIN themes t ON q.theme_id = t.id
-                   WHERE q.user_id = %s""",
-                (request.user_id,)
-            )
-            quizzes = cursor.fetchall()
-            
-            # For multiple choice quizzes, parse the answer_text as JSON
-            for quiz in quizzes:
-                if quiz['quiz_type'] == 'multiple_choice':
-                    try:
-                        quiz['answer_text'] = json.loads(quiz['answer_text'])
-                    except (json.JSONDecodeError, TypeError):
-                        # If JSON parsing fails, leave as is
-                        pass
-                    
+            cursor.execute(quiz_select(fields) + " WHERE q.deleted_at IS NULL AND q.user_id = %s", (request.user_id,))
+            quizzes = prepare_quizzes(cursor.fetchall(), fields)
+            if 'structure' in expand:
+                load_structures(cursor, quizzes)
             return jsonify(quizzes), 200
             
     except Exception as e:
@@ -466,67 +1123,809 @@ def get_quizzes():
 @require_login
 def get_quiz(quiz_id):
     """Get a specific quiz"""
+    try:
+        fields = parse_fields(DETAIL_FIELDS)
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # The default detail view of hot quizzes is served from memory, already encoded
+    default_view = not request.args.get('fields') and not expand
+    if default_view:
+        record = hot_quizzes.get(quiz_id)
+        if record is not None:
+            return app.response_class(record.encoded, mimetype='application/json')
+
+    rows = cached_rows(quiz_select(fields) + " WHERE q.deleted_at IS NULL AND q.id = %s", (quiz_id,), QUIZ_TABLES)
+    if not rows:
+        return jsonify({'error': 'Quiz not found'}), 404
+
+    quiz = rows[0]
+    prepare_quizzes([quiz], fields)
+    if 'structure' in expand:
+        db = get_read_db()
+        try:
+            with db.cursor() as cursor:
+                load_structures(cursor, [quiz])
+        finally:
+            db.close()
+    if default_view and hot_quizzes.wants(quiz_id):
+        encoded = app.json.dumpb(quiz) + b"\n"
+        hot_quizzes.put(quiz_id, encoded)
+        return app.response_class(encoded, mimetype='application/json')
+    return jsonify(quiz)
+
+@app.route('/quizzes/<int:quiz_id>/tags', methods=['PUT'])
+@require_login
+def set_quiz_tags(quiz_id):
+    """Replace a quiz's tags: {"tags": [...]} (owner or admin)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        tags = normalize_tags(data.get('tags'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT user_id FROM quizzes WHERE id = %s AND deleted_at IS NULL", (quiz_id,))
+            quiz = cursor.fetchone()
+            if not quiz:
+                return jsonify({'error': 'Quiz not found'}), 404
+            if quiz['user_id'] != request.user_id and not is_admin(cursor, request.user_id):
+                return jsonify({'error': 'Not allowed to tag this quiz'}), 403
+
+            cursor.execute("DELETE FROM quiz_tags WHERE quiz_id = %s", (quiz_id,))
+            if tags:
+                insert_quiz_tags(cursor, quiz_id, tags)
+            # A new change_seq carries the edit to /sync, /events and other processes
+            cursor.execute("UPDATE quizzes SET change_seq = %s WHERE id = %s", (next_change_seq(cursor), quiz_id))
+            db.commit()
+            quiz_updated({'id': quiz_id, 'tags': tags})
+            return jsonify({'id': quiz_id, 'tags': tags})
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error setting quiz tags: {str(e)}")
+        return jsonify({'error': 'Failed to set tags'}), 500
+    finally:
+        db.close()
+
+@app.route('/tags', methods=['GET'])
+@require_login
+def get_tags():
+    """All tags with the number of quizzes carrying each"""
+    counts = tag_index.counts()
+    return jsonify([{'name': name, 'quizzes': counts[name]} for name in sorted(counts)])
+
+@app.route('/quizzes/<int:quiz_id>', methods=['DELETE'])
+@require_login
+def delete_quiz(quiz_id):
+    """Delete a quiz, keeping a tombstone for GET /sync (owner or admin)"""
     db = get_db()
     try:
         with db.cursor() as cursor:
             cursor.execute(
-                """SELECT q.*, t.name as theme_name
-                   FROM quizzes q
-                   LEFT JOIN themes t ON q.theme_id = t.id
-                   WHERE q.id = %s""",
+                "SELECT user_id, theme_id, question_text FROM quizzes WHERE id = %s AND deleted_at IS NULL FOR UPDATE",
                 (quiz_id,)
             )
             quiz = cursor.fetchone()
-            
             if not quiz:
                 return jsonify({'error': 'Quiz not found'}), 404
-                
-            # For multiple choice quizzes, parse the answer_text as JSON
-            if quiz['quiz_type'] == 'multiple_choice':
-                try:
-                    quiz['answer_text'] = json.loads(quiz['answer_text'])
-                except (json.JSONDecodeError, TypeError):
-                    # If JSON parsing fails, leave as is
-                    pass
-                    
-            return jsonify(quiz)
+            if quiz['user_id'] != request.user_id and not is_admin(cursor, request.user_id):
+                return jsonify({'error': 'Not allowed to delete this quiz'}), 403
+
+            cursor.execute(
+                "UPDATE quizzes SET deleted_at = %s, change_seq = %s WHERE id = %s",
+                (utcnow(), next_change_seq(cursor), quiz_id)
+            )
+            db.commit()
+            quiz_deleted(dict(quiz, id=quiz_id))
+            return jsonify({'message': 'Quiz deleted successfully'})
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error deleting quiz: {str(e)}")
+        return jsonify({'error': 'Failed to delete quiz'}), 500
     finally:
         db.close()
 
+@app.route('/sync', methods=['GET'])
+@require_login
+def sync_quizzes():
+    """Quizzes changed after a change sequence number, for offline clients
+
+    Covers the same rows as /quiz/mine and /quizzes/default. Deleted quizzes
+    are returned as ids in 'deleted'; 'next' is the value to pass as since=
+    on the following call, and 'has_more' means another page is waiting.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', MAX_SYNC_BATCH))
+        fields = parse_fields(DETAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if since < 0:
+        return jsonify({'error': 'since must not be negative'}), 400
+    if not 1 <= limit <= MAX_SYNC_BATCH:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SYNC_BATCH}'}), 400
+
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            # Read the high-water mark first: the rest of the transaction sees the
+            # same snapshot, so nothing at or below it can still appear later
+            cursor.execute("SELECT value FROM change_sequence WHERE name = 'quizzes'")
+            row = cursor.fetchone()
+            high_water = row['value'] if row else 0
+
+            # Range scan on idx_quizzes_change_seq, already in sequence order
+            cursor.execute(
+                quiz_select(fields, join_users=True, extra_columns=('q.change_seq', 'q.deleted_at'))
+                + """ WHERE q.change_seq > %s AND q.change_seq <= %s
+                      AND (q.user_id = %s OR u.is_admin = TRUE)
+                      ORDER BY q.change_seq
+                      LIMIT %s""",
+                (since, high_water, request.user_id, limit + 1)
+            )
+            rows = cursor.fetchall()
+            db.commit()
+    finally:
+        db.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changed, deleted = [], []
+    for row in rows:
+        if row.pop('deleted_at') is not None:
+            deleted.append(row['id'])
+        else:
+            changed.append(row)
+    prepare_quizzes(changed, fields)
+
+    return jsonify({
+        'changed': changed,
+        'deleted': deleted,
+        'next': rows[-1]['change_seq'] if has_more else max(since, high_water),
+        'has_more': has_more
+    })
+
 @app.route('/themes/<int:theme_id>/quiz', methods=['GET'])
 @require_login
 def get_theme_quizzes(theme_id):
-    """Get all quizzes for a theme"""
-    db = get_db()
+    """Get all quizzes for a theme, optionally ordered by ?sort=difficulty (easiest first) or -difficulty"""
+    try:
+        fields = parse_fields(SUMMARY_FIELDS)
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    sort = request.args.get('sort')
+    if sort not in (None, 'difficulty', '-difficulty'):
+        return jsonify({'error': 'sort must be difficulty or -difficulty'}), 400
+    order = ""
+    if sort:
+        if 'difficulty' not in fields:
+            fields = fields + ('difficulty',)
+        # Quizzes not calibrated yet come last either way
+        order = f" ORDER BY qd.difficulty IS NULL, qd.difficulty {'DESC' if sort == '-difficulty' else 'ASC'}, q.id"
+
+    # The default deck view is served from a prebuilt snapshot file when one is current
+    default_view = not request.args.get('fields') and not expand and not sort
+    if default_view and snapshots.is_fresh(theme_id):
+        return snapshots.send_snapshot(theme_id)
+
+    db = get_read_db()
     try:
         with db.cursor() as cursor:
             # First check if theme exists
-            cursor.execute("SELECT id FROM themes WHERE id = %s", (theme_id,))
-            if not cursor.fetchone():
+            if not query_cache.fetchone(cursor, "SELECT id FROM themes WHERE id = %s", (theme_id,), ('themes',)):
                 return jsonify({'error': 'Theme not found'}), 404
             
             # Get quizzes for theme
+            cursor.execute(quiz_select(fields) + " WHERE q.deleted_at IS NULL AND q.theme_id = %s" + order, (theme_id,))
+            quizzes = prepare_quizzes(cursor.fetchall(), fields)
+            if 'structure' in expand:
+                load_structures(cursor, quizzes)
+            if default_view:
+                snapshots.request_build(theme_id)
+            return jsonify(quizzes)
+    finally:
+        db.close()
+
+@app.route('/events', methods=['GET'])
+@require_login
+def quiz_events():
+    """Server-Sent Events stream of quiz changes, optionally for one theme or user"""
+    try:
+        theme_id = request.args.get('theme_id')
+        theme_id = int(theme_id) if theme_id is not None else None
+        user_id = request.args.get('user_id', type=int)
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    if last_event_id is None:
+        # New subscribers get changes committed from now on
+        last_event_id = current_change_seq()
+
+    response = Response(
+        stream_with_context(events.stream(last_event_id, theme_id=theme_id, user_id=user_id,
+                                          replay=replay_quiz_events)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def utcnow():
+    """Current UTC time as a naive datetime, matching MySQL DATETIME columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# Memory-mapped output of the build_recommendations job
+recommendations = recommender.Recommendations()
+
+@app.route('/me/recommendations', methods=['GET'])
+@require_login
+def get_recommendations():
+    """Themes and quizzes to try next, from what users with a similar recent history went on to"""
+    try:
+        limit = int(request.args.get('limit', recommender.DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= recommender.MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {recommender.MAX_LIMIT}'}), 400
+
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            # Recent attempts and recently created quizzes, both index range scans
             cursor.execute(
-                """SELECT q.*, t.name as theme_name
-                   FROM quizzes q
-                   JOIN themes t ON q.theme_id = t.id
-                   WHERE t.id = %s""",
-                (theme_id,)
+                """SELECT q.id, q.theme_id FROM quiz_attempts a JOIN quizzes q ON q.id = a.quiz_id
+                   WHERE a.user_id = %s AND q.deleted_at IS NULL
+                   ORDER BY a.answered_at DESC
+                   LIMIT %s""",
+                (request.user_id, recommender.HISTORY_LIMIT)
             )
-            quizzes = cursor.fetchall()
-            
-            # For multiple choice quizzes, parse the answer_text as JSON
-            for quiz in quizzes:
-                if quiz['quiz_type'] == 'multiple_choice':
-                    try:
-                        quiz['answer_text'] = json.loads(quiz['answer_text'])
-                    except (json.JSONDecodeError, TypeError):
-                        # If JSON parsing fails, leave as is
-                        pass
-            
-            return jsonify(quizzes)
+            history = list(cursor.fetchall())
+            cursor.execute(
+                """SELECT id, theme_id FROM quizzes
+                   WHERE user_id = %s AND deleted_at IS NULL
+                   ORDER BY id DESC
+                   LIMIT %s""",
+                (request.user_id, recommender.HISTORY_LIMIT)
+            )
+            history.extend(cursor.fetchall())
+            seen_quizzes = {row['id'] for row in history}
+            seen_themes = {row['theme_id'] for row in history if row['theme_id'] is not None}
+
+            # Extra candidates make up for quizzes deleted since the last build
+            quiz_scores = dict(recommendations.similar('quiz', seen_quizzes, exclude=seen_quizzes, limit=2 * limit))
+            quizzes = []
+            if quiz_scores:
+                placeholders = ', '.join(['%s'] * len(quiz_scores))
+                cursor.execute(
+                    quiz_select(SUMMARY_FIELDS) + f" WHERE q.deleted_at IS NULL AND q.id IN ({placeholders})",
+                    list(quiz_scores)
+                )
+                quizzes = prepare_quizzes(cursor.fetchall(), SUMMARY_FIELDS)
+                for quiz in quizzes:
+                    quiz['score'] = quiz_scores[quiz['id']]
+                quizzes.sort(key=lambda quiz: -quiz['score'])
     finally:
         db.close()
 
+    theme_scores = recommendations.similar('theme', seen_themes, exclude=seen_themes, limit=2 * limit)
+    names = {row['id']: row['name'] for row in cached_rows("SELECT id, name FROM themes", (), ('themes',))}
+    themes = [{'id': theme_id, 'name': names[theme_id], 'score': score}
+              for theme_id, score in theme_scores if theme_id in names]
+    return jsonify({'themes': themes[:limit], 'quizzes': quizzes[:limit], 'version': recommendations.version})
+
+@app.route('/me/reviews/due', methods=['GET'])
+@require_login
+def get_due_reviews():
+    """Get the current user's cards that are due for review, most overdue first
+
+    With ?theme_id=, only that theme's cards are considered and a queue that
+    is not full is topped up with up to ?new= (default NEW_REVIEW_CARDS)
+    quizzes of the theme the user has never reviewed, in id order, so a
+    deck can be studied from scratch. New cards have no due_at.
+    """
+    try:
+        limit = int(request.args.get('limit', 20))
+        new = int(request.args.get('new', NEW_REVIEW_CARDS))
+        theme_id = request.args.get('theme_id')
+        theme_id = int(theme_id) if theme_id is not None else None
+        fields = parse_fields(DETAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not 1 <= limit <= MAX_DUE_REVIEWS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_DUE_REVIEWS}'}), 400
+    if not 0 <= new <= MAX_DUE_REVIEWS:
+        return jsonify({'error': f'new must be between 0 and {MAX_DUE_REVIEWS}'}), 400
+
+    theme_filter = " AND q.theme_id = %s" if theme_id is not None else ""
+    theme_params = (theme_id,) if theme_id is not None else ()
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            # Range scan on idx_review_state_due (user_id, due_at), already in due order
+            cursor.execute(
+                quiz_select(fields, extra_columns=('r.due_at', 'r.interval_days', 'r.repetitions'))
+                + f""" JOIN review_state r ON r.quiz_id = q.id
+                      WHERE r.user_id = %s AND r.due_at <= %s AND q.deleted_at IS NULL{theme_filter}
+                      ORDER BY r.due_at
+                      LIMIT %s""",
+                (request.user_id, utcnow(), *theme_params, limit)
+            )
+            quizzes = list(cursor.fetchall())
+
+            new = min(new, limit - len(quizzes))
+            if theme_id is not None and new > 0:
+                cursor.execute(
+                    quiz_select(fields, extra_columns=('NULL AS due_at', '0 AS interval_days', '0 AS repetitions'))
+                    + """ LEFT JOIN review_state r ON r.quiz_id = q.id AND r.user_id = %s
+                          WHERE q.theme_id = %s AND q.deleted_at IS NULL AND r.quiz_id IS NULL
+                          ORDER BY q.id
+                          LIMIT %s""",
+                    (request.user_id, theme_id, new)
+                )
+                quizzes.extend(cursor.fetchall())
+            return jsonify(prepare_quizzes(quizzes, fields))
+    finally:
+        db.close()
+
+@app.route('/me/reviews', methods=['POST'])
+@require_login
+@idempotent
+def record_reviews():
+    """Record a batch of review grades and reschedule the cards (SM-2)"""
+    data = request.get_json(silent=True) or {}
+    reviews = data.get('reviews')
+    if not isinstance(reviews, list) or not reviews:
+        return jsonify({'error': 'reviews must be a non-empty list'}), 400
+    if len(reviews) > MAX_REVIEW_BATCH:
+        return jsonify({'error': f'At most {MAX_REVIEW_BATCH} reviews can be recorded at once'}), 400
+    for review in reviews:
+        if (not isinstance(review, dict)
+                or not isinstance(review.get('quiz_id'), int)
+                or not isinstance(review.get('grade'), int)
+                or not srs.MIN_GRADE <= review['grade'] <= srs.MAX_GRADE):
+            return jsonify({'error': 'Each review needs an integer quiz_id and a grade from 0 to 5'}), 400
+
+    quiz_ids = list(dict.fromkeys(review['quiz_id'] for review in reviews))
+    placeholders = ', '.join(['%s'] * len(quiz_ids))
+    now = utcnow()
+
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM quizzes WHERE deleted_at IS NULL AND id IN ({placeholders})", quiz_ids)
+            known = {row['id'] for row in cursor.fetchall()}
+
+            cursor.execute(
+                f"""SELECT quiz_id, ease, interval_days, repetitions FROM review_state
+                    WHERE user_id = %s AND quiz_id IN ({placeholders})""",
+                [request.user_id] + quiz_ids
+            )
+            states = {row['quiz_id']: row for row in cursor.fetchall()}
+
+            # Grades for the same card are applied in the order they were sent
+            for review in reviews:
+                if review['quiz_id'] in known:
+                    state = states.get(review['quiz_id']) or srs.new_state()
+                    states[review['quiz_id']] = srs.apply_grade(state, review['grade'], now)
+
+            updated = [quiz_id for quiz_id in quiz_ids if quiz_id in known]
+            insert_attempts(cursor, request.user_id, [
+                (review['quiz_id'], review['grade'] >= srs.PASSING_GRADE)
+                for review in reviews if review['quiz_id'] in known
+            ], now)
+            cursor.executemany(
+                """INSERT INTO review_state
+                       (user_id, quiz_id, ease, interval_days, repetitions, due_at, last_reviewed_at)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE
+                       ease = VALUES(ease), interval_days = VALUES(interval_days),
+                       repetitions = VALUES(repetitions), due_at = VALUES(due_at),
+                       last_reviewed_at = VALUES(last_reviewed_at)""",
+                [(request.user_id, quiz_id, states[quiz_id]['ease'], states[quiz_id]['interval_days'],
+                  states[quiz_id]['repetitions'], states[quiz_id]['due_at'], now)
+                 for quiz_id in updated]
+            )
+            db.commit()
+
+            return jsonify({
+                'reviewed': len(updated),
+                'scheduled': [
+                    {'quiz_id': quiz_id, 'due_at': states[quiz_id]['due_at'],
+                     'interval_days': states[quiz_id]['interval_days']}
+                    for quiz_id in updated
+                ],
+                'unknown_quiz_ids': [quiz_id for quiz_id in quiz_ids if quiz_id not in known]
+            })
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error recording reviews: {str(e)}")
+        return jsonify({'error': 'Failed to record reviews'}), 500
+    finally:
+        db.close()
+
+def insert_attempts(cursor, user_id, outcomes, answered_at):
+    """Save (quiz_id, correct) outcomes as attempts, the input of the calibrate_difficulty job"""
+    cursor.executemany(
+        "INSERT INTO quiz_attempts (user_id, quiz_id, correct, answered_at) VALUES (%s, %s, %s, %s)",
+        [(user_id, quiz_id, correct, answered_at) for quiz_id, correct in outcomes]
+    )
+
+def record_attempts(user_id, outcomes):
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            insert_attempts(cursor, user_id, outcomes, utcnow())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@app.route('/quizzes/grade', methods=['POST'])
+@require_login
+def grade_answers():
+    """Grade a batch of submitted answers, forgiving case, accents, spacing and small typos
+
+    With "record": true the outcomes are saved as the caller's attempts.
+    """
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'error': 'answers must be a non-empty list'}), 400
+    if len(answers) > MAX_GRADE_BATCH:
+        return jsonify({'error': f'At most {MAX_GRADE_BATCH} answers can be graded at once'}), 400
+    for answer in answers:
+        if not isinstance(answer, dict) or not isinstance(answer.get('quiz_id'), int):
+            return jsonify({'error': 'Each answer needs an integer quiz_id'}), 400
+
+    quiz_ids = list(dict.fromkeys(answer['quiz_id'] for answer in answers))
+    placeholders = ', '.join(['%s'] * len(quiz_ids))
+    db = get_read_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"""SELECT id, quiz_type, answer_text, answer_tolerance FROM quizzes
+                    WHERE deleted_at IS NULL AND id IN ({placeholders})""",
+                quiz_ids
+            )
+            quizzes = {row['id']: row for row in cursor.fetchall()}
+    finally:
+        db.close()
+
+    results = []
+    for answer in answers:
+        quiz = quizzes.get(answer['quiz_id'])
+        if quiz is None:
+            continue
+        correct, distance = grading.grade(quiz['quiz_type'], quiz['answer_text'], answer.get('answer'),
+                                          quiz['answer_tolerance'])
+        results.append({'quiz_id': quiz['id'], 'correct': correct, 'distance': distance})
+
+    if data.get('record') and results:
+        record_attempts(request.user_id, [(result['quiz_id'], result['correct']) for result in results])
+    return jsonify({
+        'results': results,
+        'unknown_quiz_ids': [quiz_id for quiz_id in quiz_ids if quiz_id not in quizzes]
+    })
+
+@app.route('/admin/roster', methods=['POST'])
+@require_login
+def import_roster():
+    """Queue the creation of accounts for a class roster (admin only)
+
+    Accepts text/csv with a name,email[,password] header or JSON
+    {"users": [{"name", "email", "password"?}]}. Accounts are created by an
+    import_roster job; rows that fail are listed in its result without
+    stopping the rest. Passwords generated for rows without one are
+    returned here, once, and stored nowhere else in plain text: the job
+    payload holds every password encrypted with SECRET_KEY. Not
+    @idempotent, since a replayed response would keep them.
+    """
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            if not is_admin(cursor, request.user_id):
+                return jsonify({'error': 'Admin access required'}), 403
+        try:
+            rows = roster.parse_roster(request.get_data(), request.content_type)
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'error': f'Invalid roster: {e}'}), 400
+        if not rows:
+            return jsonify({'error': 'Roster is empty'}), 400
+        if len(rows) > roster.MAX_ROSTER_SIZE:
+            return jsonify({'error': f'At most {roster.MAX_ROSTER_SIZE} users can be imported at once'}), 400
+
+        generated = roster.generate_missing_passwords(rows)
+        roster.seal_passwords(rows, app.secret_key)
+        with db.cursor() as cursor:
+            job_id = jobs.enqueue(cursor, 'import_roster', {'users': rows}, created_by=request.user_id)
+        db.commit()
+        logger.info(f"Roster import queued as job {job_id}: {len(rows)} rows")
+        return jsonify({'id': job_id, 'status': jobs.QUEUED, 'generated_passwords': generated}), 202
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error queueing roster import: {str(e)}")
+        return jsonify({'error': 'Failed to import roster'}), 500
+    finally:
+        db.close()
+
+@app.route('/jobs', methods=['POST'])
+@require_login
+@idempotent
+def create_job():
+    """Queue a background job: {"type": ..., "payload": {...}}"""
+    data = request.get_json(silent=True) or {}
+    job = jobs.JOB_TYPES.get(data.get('type'))
+    if job is None:
+        return jsonify({'error': f"Unknown job type; expected one of: {', '.join(sorted(jobs.JOB_TYPES))}"}), 400
+    payload = data.get('payload', {})
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'payload must be a JSON object'}), 400
+
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            if job.admin_only and not is_admin(cursor, request.user_id):
+                return jsonify({'error': 'Admin access required'}), 403
+            job_id = jobs.enqueue(cursor, job.name, payload, created_by=request.user_id)
+            db.commit()
+            cursor.execute("SELECT * FROM jobs WHERE id = %s", (job_id,))
+            response = jsonify(jobs.job_status(cursor.fetchone()))
+            response.status_code = 202
+            response.headers['Location'] = f'/jobs/{job_id}'
+            return response
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error queueing job: {str(e)}")
+        return jsonify({'error': 'Failed to queue job'}), 500
+    finally:
+        db.close()
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+@require_login
+def get_job(job_id):
+    """Get a job's status, progress and result (creator or admin)"""
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT * FROM jobs WHERE id = %s", (job_id,))
+            job = cursor.fetchone()
+            if not job or (job['created_by'] != request.user_id and not is_admin(cursor, request.user_id)):
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(jobs.job_status(job))
+    finally:
+        db.close()
+
+# Rows per progress report in bulk quiz imports
+IMPORT_PROGRESS_EVERY = 100
+
+@jobs.job_type('import_quizzes', concurrency=2, admin_only=False)
+def import_quizzes_job(context, payload):
+    """Bulk-create quizzes: {"quizzes": [...]}, owned by the user who queued the job
+
+    All rows are inserted in one transaction so a retried job never imports
+    twice. Invalid rows are skipped and reported in the result, as are
+    near-duplicates (of existing quizzes or earlier rows) when
+    DUPLICATE_CHECK=reject; with DUPLICATE_CHECK=flag they are imported
+    and listed under "duplicates".
+    """
+    quizzes = payload.get('quizzes')
+    if not isinstance(quizzes, list):
+        raise ValueError('payload.quizzes must be a list')
+
+    user_id = context.created_by
+    imported, errors, flagged = [], [], []
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            for index, quiz in enumerate(quizzes):
+                error = validate_quiz(quiz) if isinstance(quiz, dict) else 'Quiz must be a JSON object'
+                if not error:
+                    quiz['signature'] = dedupe.signature(quiz['question_text'])
+                    similar = duplicates.find(quiz['signature'], user_id, quiz['theme_id'])
+                    if similar and duplicates.mode == 'reject' and not quiz.get('allow_duplicate'):
+                        error = f"Similar to quiz {similar[0][0]}"
+                if error:
+                    errors.append({'index': index, 'error': error})
+                else:
+                    quiz_id = insert_quiz(cursor, user_id, quiz, quiz.get('structure'))
+                    # Indexed right away so later rows are checked against this one
+                    duplicates.add(quiz_id, user_id, quiz['theme_id'], quiz['signature'])
+                    imported.append(dict(quiz, id=quiz_id, user_id=user_id))
+                    if similar:
+                        flagged.append({'index': index, 'id': quiz_id, 'duplicates': duplicate_list(similar)})
+                if (index + 1) % IMPORT_PROGRESS_EVERY == 0:
+                    context.report((index + 1) / len(quizzes), f"{index + 1} of {len(quizzes)} rows")
+            db.commit()
+    except Exception:
+        db.rollback()
+        for quiz in imported:
+            duplicates.remove(quiz['id'])
+        raise
+    finally:
+        db.close()
+
+    # Updates this process; API processes pick the rows up from the change feed
+    for quiz in imported:
+        quiz_created(quiz)
+    return {'imported': len(imported), 'ids': [quiz['id'] for quiz in imported], 'errors': errors,
+            'duplicates': flagged}
+
+@jobs.job_type('import_roster', concurrency=1, max_attempts=1, redact=roster.redact_payload)
+def import_roster_job(context, payload):
+    """Create the accounts of a roster queued by POST /admin/roster: {"users": [...]}
+
+    Runs once: a retry after a partial import would report the created rows
+    as already registered. Passwords arrive sealed and are dropped from the
+    stored payload when the job finishes.
+    """
+    rows = payload.get('users')
+    if not isinstance(rows, list):
+        raise ValueError('payload.users must be a list')
+    roster.open_passwords(rows, app.secret_key)
+    db = get_db()
+    try:
+        result = roster.import_roster(db, rows, progress=context.report)
+    finally:
+        db.close()
+    query_cache.invalidate('users')
+    logger.info(f"Roster import: {len(result['created'])} users created, {len(result['errors'])} rows failed")
+    return result
+
+# Rows written per statement when storing calibration results
+CALIBRATION_WRITE_CHUNK = 1000
+ATTEMPT_DTYPE = np.dtype([('user_id', np.int32), ('quiz_id', np.int32), ('correct', np.int8)])
+
+def load_attempts():
+    """All attempts at live quizzes as a structured NumPy array, streamed from MySQL"""
+    db = get_db()
+    try:
+        with db.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                """SELECT a.user_id, a.quiz_id, a.correct FROM quiz_attempts a
+                   JOIN quizzes q ON q.id = a.quiz_id
+                   WHERE q.deleted_at IS NULL"""
+            )
+            return np.fromiter(cursor, dtype=ATTEMPT_DTYPE)
+    finally:
+        db.close()
+
+@jobs.job_type('calibrate_difficulty', concurrency=1)
+def calibrate_difficulty_job(context, payload):
+    """Fit an IRT model to all attempts: {"model": "1pl"|"2pl", "iterations": 50}
+
+    Writes per-quiz difficulty and discrimination to quiz_difficulty and
+    per-user ability to user_ability, replacing earlier estimates.
+    """
+    model = payload.get('model', '2pl')
+    iterations = payload.get('iterations', irt.DEFAULT_ITERATIONS)
+    if model not in irt.MODELS:
+        raise ValueError(f"model must be one of: {', '.join(irt.MODELS)}")
+    if not isinstance(iterations, int) or not 1 <= iterations <= 500:
+        raise ValueError('iterations must be an integer from 1 to 500')
+
+    context.report(0.0, 'Loading attempts')
+    attempts = load_attempts()
+    if not attempts.size:
+        return {'attempts': 0, 'quizzes': 0, 'users': 0}
+    user_ids, users = irt.index_ids(attempts['user_id'])
+    quiz_ids, items = irt.index_ids(attempts['quiz_id'])
+
+    def progress(iteration, change):
+        context.report(0.1 + 0.8 * iteration / iterations, f"Iteration {iteration}, largest change {change:.4f}")
+    result = irt.fit(users, items, attempts['correct'], model=model, iterations=iterations, progress=progress)
+
+    context.report(0.9, 'Saving estimates')
+    now = utcnow()
+    quiz_rows = list(zip(quiz_ids.tolist(), result['difficulty'].tolist(), result['discrimination'].tolist(),
+                         result['item_attempts'].tolist(), [now] * len(quiz_ids)))
+    user_rows = list(zip(user_ids.tolist(), result['ability'].tolist(), result['user_attempts'].tolist(),
+                         [now] * len(user_ids)))
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            for start in range(0, len(quiz_rows), CALIBRATION_WRITE_CHUNK):
+                cursor.executemany(
+                    """INSERT INTO quiz_difficulty (quiz_id, difficulty, discrimination, attempts, calibrated_at)
+                       VALUES (%s, %s, %s, %s, %s)
+                       ON DUPLICATE KEY UPDATE difficulty = VALUES(difficulty),
+                           discrimination = VALUES(discrimination), attempts = VALUES(attempts),
+                           calibrated_at = VALUES(calibrated_at)""",
+                    quiz_rows[start:start + CALIBRATION_WRITE_CHUNK]
+                )
+            for start in range(0, len(user_rows), CALIBRATION_WRITE_CHUNK):
+                cursor.executemany(
+                    """INSERT INTO user_ability (user_id, ability, attempts, calibrated_at)
+                       VALUES (%s, %s, %s, %s)
+                       ON DUPLICATE KEY UPDATE ability = VALUES(ability), attempts = VALUES(attempts),
+                           calibrated_at = VALUES(calibrated_at)""",
+                    user_rows[start:start + CALIBRATION_WRITE_CHUNK]
+                )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    query_cache.invalidate('quizzes')
+    return {
+        'attempts': int(attempts.size),
+        'quizzes': len(quiz_rows),
+        'users': len(user_rows),
+        'iterations': result['iterations'],
+        'model': model,
+    }
+
+HISTORY_DTYPE = np.dtype([('user_id', np.int32), ('quiz_id', np.int32), ('theme_id', np.int32), ('at', np.int64)])
+
+def load_history():
+    """(user, quiz, theme) interactions with live quizzes, attempts and creations, oldest first"""
+    db = get_db()
+    try:
+        with db.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                """SELECT a.user_id, a.quiz_id, COALESCE(q.theme_id, 0), UNIX_TIMESTAMP(a.answered_at)
+                   FROM quiz_attempts a JOIN quizzes q ON q.id = a.quiz_id
+                   WHERE q.deleted_at IS NULL
+                   UNION ALL
+                   SELECT user_id, id, COALESCE(theme_id, 0), UNIX_TIMESTAMP(created_at)
+                   FROM quizzes WHERE deleted_at IS NULL"""
+            )
+            history = np.fromiter(cursor, dtype=HISTORY_DTYPE)
+    finally:
+        db.close()
+    return history[np.argsort(history['at'], kind='stable')]
+
+@jobs.job_type('build_recommendations', concurrency=1, every=recommender.REBUILD_EVERY or None)
+def build_recommendations_job(context, payload):
+    """Rebuild the theme and quiz co-occurrence tables behind GET /me/recommendations
+
+    Queued every RECOMMENDATIONS_EVERY seconds by the workers; admins can
+    also queue it by hand. Readers switch to the new version within
+    recommender.CHECK_INTERVAL seconds.
+    """
+    context.report(0.0, 'Loading history')
+    history = load_history()
+    themed = history[history['theme_id'] != 0]
+
+    context.report(0.2, 'Counting theme pairs')
+    tables = {'theme': recommender.cooccurrence(themed['user_id'], themed['theme_id'])}
+    context.report(0.4, 'Counting quiz pairs')
+    tables['quiz'] = recommender.cooccurrence(history['user_id'], history['quiz_id'])
+
+    context.report(0.9, 'Saving')
+    version = recommender.write_version(tables, recommendations.base_dir)
+    return {
+        'version': version,
+        'interactions': int(history.size),
+        'users': int(np.unique(history['user_id']).size),
+        'themes': int(tables['theme']['ids'].size),
+        'quizzes': int(tables['quiz']['ids'].size),
+    }
+
+def build_theme_snapshot(theme_id):
+    """Encode the default view of a theme deck for its snapshot file"""
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT id FROM themes WHERE id = %s", (theme_id,))
+            if not cursor.fetchone():
+                return None
+            cursor.execute(quiz_select(SUMMARY_FIELDS) + " WHERE q.deleted_at IS NULL AND q.theme_id = %s", (theme_id,))
+            quizzes = prepare_quizzes(cursor.fetchall(), SUMMARY_FIELDS)
+    finally:
+        db.close()
+    return app.json.dumpb(quizzes)
+
+snapshots.init_snapshots(build_theme_snapshot)
+init_idempotency(get_db)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5050, debug=True) 
\ No newline at end of file
@@ -0,0 +1,159 @@
+import bisect
+import heapq
+import os
+import threading
+import time
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Only this much of a question is indexed; nobody types further before picking
+MAX_KEY_LENGTH = 200
+# Rebuild from the database this often to pick up writes made by other processes
+AUTOCOMPLETE_TTL = float(os.environ.get('AUTOCOMPLETE_TTL', 60))
+# Prefixes matching more keys than this are answered by walking the keys in
+# usage order instead of ranking the whole matching range
+SCAN_LIMIT = 256
+# Loads retried when writes race them before the current indexes are kept
+REBUILD_ATTEMPTS = 3
+
+KINDS = ('theme', 'question')
+
+def normalize_key(text):
+    """Case-folded text with whitespace collapsed, as keys and prefixes are compared"""
+    return ' '.join(text.casefold().split())[:MAX_KEY_LENGTH]
+
+class PrefixIndex:
+    """Sorted array of normalized keys answering top-k prefix queries by usage
+
+    Keys matching a prefix form one contiguous range of the sorted array,
+    found with two binary searches. Narrow ranges are ranked directly; wide
+    ones (short prefixes) are answered from a second array ordered by usage,
+    where the first k matches are the answer and turn up early.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._by_usage = []
+        # key -> [label, usage, value]
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, items):
+        """Replace the contents with (label, usage, value) items; same keys add up"""
+        entries = {}
+        for label, usage, value in items:
+            key = normalize_key(label)
+            if not key:
+                continue
+            if key in entries:
+                entries[key][1] += usage
+            else:
+                entries[key] = [label, usage, value]
+        self._entries = entries
+        self._keys = sorted(entries)
+        self._by_usage = sorted((-entry[1], key) for key, entry in entries.items())
+
+    def update(self, label, delta, value=None, keep=False):
+        """Change a key's usage by delta, adding it if new and dropping it at zero unless keep"""
+        key = normalize_key(label)
+        if not key:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            if delta <= 0 and not keep:
+                return
+            entry = self._entries[key] = [label, 0, value]
+            bisect.insort(self._keys, key)
+        else:
+            self._by_usage.pop(bisect.bisect_left(self._by_usage, (-entry[1], key)))
+        entry[1] = max(0, entry[1] + delta)
+        if entry[1] == 0 and not keep:
+            del self._entries[key]
+            self._keys.pop(bisect.bisect_left(self._keys, key))
+            return
+        bisect.insort(self._by_usage, (-entry[1], key))
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Top keys starting with prefix, most used first, as (label, usage, value)"""
+        prefix = normalize_key(prefix)
+        low = bisect.bisect_left(self._keys, prefix)
+        high = bisect.bisect_left(self._keys, prefix + '\U0010ffff')
+        if high - low <= SCAN_LIMIT:
+            entries = self._entries
+            keys = heapq.nsmallest(limit, self._keys[low:high], key=lambda key: (-entries[key][1], key))
+        else:
+            keys = []
+            for _, key in self._by_usage:
+                if key.startswith(prefix):
+                    keys.append(key)
+                    if len(keys) == limit:
+                        break
+        return [tuple(self._entries[key]) for key in keys]
+
+class Autocomplete:
+    """Prefix indexes of theme names and question texts
+
+    Themes are ranked by how many live quizzes they hold and questions by how
+    many live quizzes share the text. Built from load() on first use and
+    every ttl seconds after; this process's writes are applied in between.
+    """
+
+    def __init__(self, load, ttl=AUTOCOMPLETE_TTL):
+        self._load = load
+        self.ttl = ttl
+        self._indexes = {kind: PrefixIndex() for kind in KINDS}
+        self._theme_names = {}
+        self._loaded_at = None
+        # Bumped by every write, so a load can tell it raced one
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        for attempt in range(REBUILD_ATTEMPTS):
+            with self._lock:
+                generation = self._generation
+            themes, questions = self._load()
+            indexes = {kind: PrefixIndex() for kind in KINDS}
+            indexes['theme'].load((name, quizzes, theme_id) for theme_id, name, quizzes in themes)
+            indexes['question'].load((text, 1, None) for text in questions)
+            with self._lock:
+                # A write applied during the load may be missing from it: load again rather than lose it
+                raced = self._generation != generation
+                if raced and attempt < REBUILD_ATTEMPTS - 1:
+                    continue
+                if not raced or self._loaded_at is None:
+                    self._indexes = indexes
+                    self._theme_names = {theme_id: name for theme_id, name, _ in themes}
+                # Writes that keep racing leave the current indexes, which have them, until the next ttl
+                self._loaded_at = time.monotonic()
+                return
+
+    def quiz_added(self, question_text, theme_id=None):
+        """Count a new quiz's question and theme"""
+        self._apply(question_text, theme_id, 1)
+
+    def quiz_removed(self, question_text, theme_id=None):
+        """Uncount a deleted quiz's question and theme"""
+        self._apply(question_text, theme_id, -1)
+
+    def _apply(self, question_text, theme_id, delta):
+        with self._lock:
+            self._generation += 1
+            self._indexes['question'].update(question_text, delta)
+            # Themes stay listed with no quizzes; unknown ones arrive with the next load
+            theme_name = self._theme_names.get(theme_id)
+            if theme_name is not None:
+                self._indexes['theme'].update(theme_name, delta, theme_id, keep=True)
+
+    def search(self, kind, prefix, limit=DEFAULT_LIMIT):
+        self._ensure_loaded()
+        with self._lock:
+            return self._indexes[kind].search(prefix, limit)
+
+    def stats(self):
+        with self._lock:
+            return {kind: len(index) for kind, index in self._indexes.items()}
@@ -0,0 +1,50 @@
+"""Benchmark JSON encoding of list-endpoint payloads with the stdlib and fast providers
+
+Usage: python bench_json.py [rows ...]
+"""
+import datetime
+import sys
+import timeit
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider, orjson
+
+def make_quizzes(count):
+    """Build rows shaped like the GET /quizzes result after answer decoding"""
+    created_at = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    quizzes = []
+    for i in range(count):
+        quiz = {
+            'id': i,
+            'user_id': 1,
+            'quiz_type': 'multiple_choice' if i % 2 else 'text',
+            'question_text': f'What does the built-in function number {i} return in Python?',
+            'answer_text': 'Paris',
+            'theme_id': i % 10,
+            'theme_name': 'Python Basics',
+            'created_at': created_at + datetime.timedelta(seconds=i),
+        }
+        if i % 2:
+            quiz['answer_text'] = {'options': ['A list', 'A tuple', 'A dict', 'None'], 'correct': ['A list']}
+        quizzes.append(quiz)
+    return quizzes
+
+def bench(provider_class, quizzes, number):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        return min(timeit.repeat(lambda: app.json.response(quizzes), number=number, repeat=5)) / number
+
+def main(sizes):
+    encoder = f"orjson {orjson.__version__}" if orjson else 'stdlib (orjson not installed)'
+    print(f"FastJSONProvider encoder: {encoder}")
+    print(f"{'rows':>8} {'stdlib ms':>10} {'fast ms':>10} {'speedup':>8}")
+    for size in sizes:
+        quizzes = make_quizzes(size)
+        number = max(1, 20000 // size)
+        stdlib = bench(DefaultJSONProvider, quizzes, number)
+        fast = bench(FastJSONProvider, quizzes, number)
+        print(f"{size:>8} {stdlib * 1000:>10.3f} {fast * 1000:>10.3f} {stdlib / fast:>7.1f}x")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 10000])
@@ -0,0 +1,103 @@
+"""Follow quiz writes made by other processes through quizzes.change_seq
+
+Every quiz write takes a change_seq (see app.next_change_seq), and rows
+become visible in sequence order. A ChangeFeed polls for rows above the
+last sequence number it has seen and hands them to a callback, so the
+in-memory state of an API process (deck snapshots, caches, indexes) also
+follows writes made by other API processes and by jobs in worker.py.
+Writes this process made itself are registered with mark_local() when
+their number is allocated and are flagged as local.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('quizbox-backend')
+
+CHANGE_FEED_INTERVAL = float(os.environ.get('CHANGE_FEED_INTERVAL', 1.0))
+# Rows read per query while catching up
+CHANGE_FEED_BATCH = 1000
+
+class ChangeFeed:
+    """Polls load(after_seq, limit) and passes new rows, oldest first, to apply(rows)
+
+    current_seq() returns the latest committed change_seq; a feed starts
+    from there, so only changes made after it started are delivered, and
+    on_start(seq) is told where. Each row handed to apply carries a 'local'
+    flag.
+    """
+
+    def __init__(self, current_seq, load, apply, interval=CHANGE_FEED_INTERVAL, batch=CHANGE_FEED_BATCH,
+                 on_start=None):
+        self._current_seq = current_seq
+        self._load = load
+        self._apply = apply
+        self._on_start = on_start
+        self.interval = interval
+        self.batch = batch
+        self.last_seq = None
+        self._local = set()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self.following = False
+        self._stats = {'polls': 0, 'remote': 0, 'errors': 0}
+
+    def mark_local(self, seq):
+        """Record a change_seq allocated by this process; call before the write commits"""
+        if not self.following:
+            return
+        with self._lock:
+            self._local.add(seq)
+
+    def poll(self):
+        """Deliver every change committed since the last poll; returns the number of rows"""
+        with self._poll_lock:
+            if self.last_seq is None:
+                self.last_seq = self._current_seq()
+                if self._on_start is not None:
+                    self._on_start(self.last_seq)
+                return 0
+            delivered = 0
+            while True:
+                rows = self._load(self.last_seq, self.batch)
+                if not rows:
+                    break
+                with self._lock:
+                    for row in rows:
+                        row['local'] = row['change_seq'] in self._local
+                    self.last_seq = rows[-1]['change_seq']
+                    # Numbers at or below last_seq never come back
+                    self._local = {seq for seq in self._local if seq > self.last_seq}
+                self._stats['remote'] += sum(not row['local'] for row in rows)
+                self._apply(rows)
+                delivered += len(rows)
+                if len(rows) < self.batch:
+                    break
+            self._stats['polls'] += 1
+            return delivered
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                self._stats['errors'] += 1
+                logger.error("Failed to follow quiz changes", exc_info=True)
+            time.sleep(self.interval)
+
+    def start(self, background=True):
+        """Start following changes, polling in a background thread unless the caller polls itself"""
+        if self.following:
+            return
+        with self._lock:
+            if self.following:
+                return
+            self.following = True
+            if background:
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        return dict(self._stats, last_seq=self.last_seq)
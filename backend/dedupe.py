@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+
+NUM_HASHES = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity usually share a band, and
+# pairs at 0.7 almost always do
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 4
+DEFAULT_THRESHOLD = 0.7
+# Pick up quizzes written by other processes from the change feed this often
+DEFAULT_REFRESH_INTERVAL = 5.0
+MODES = ('off', 'flag', 'reject')
+
+_SIGNATURE = struct.Struct(f'<{NUM_HASHES}I')
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_text(text):
+    """Lowercase, accent-free text with punctuation dropped and spacing collapsed"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+def shingles(text):
+    """Character shingles of the normalized text"""
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def signature(text):
+    """MinHash signature of a question, packed into NUM_HASHES * 4 bytes
+
+    One SHAKE digest per shingle supplies all NUM_HASHES hash values at
+    once; the signature is their column-wise minimum.
+    """
+    rows = [_SIGNATURE.unpack(hashlib.shake_128(shingle.encode('utf-8')).digest(_SIGNATURE.size))
+            for shingle in shingles(text)]
+    return _SIGNATURE.pack(*map(min, zip(*rows)))
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(_SIGNATURE.unpack(first), _SIGNATURE.unpack(second))) / NUM_HASHES
+
+def _bands(sig):
+    size = ROWS * 4
+    return [(band, sig[band * size:(band + 1) * size]) for band in range(BANDS)]
+
+class DuplicateIndex:
+    """LSH index of question signatures for near-duplicate checks
+
+    Each signature is split into bands; questions sharing any band are
+    candidates, confirmed by comparing whole signatures. A check costs
+    BANDS dict lookups plus one comparison per candidate, whatever the
+    number of quizzes. Built from the change feed on first use and
+    refreshed from it every refresh_interval seconds.
+
+    load(after_seq) returns rows (quiz_id, user_id, theme_id, deleted,
+    change_seq, signature) changed after after_seq, in change_seq order.
+    """
+
+    def __init__(self, load, mode='flag', threshold=DEFAULT_THRESHOLD, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Duplicate check mode must be one of: {', '.join(MODES)}")
+        self._load = load
+        self.mode = mode
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.enabled = mode != 'off'
+        self._buckets = {}
+        # quiz_id -> (user_id, theme_id, signature)
+        self._quizzes = {}
+        self._last_seq = 0
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stats = {'checks': 0, 'candidates': 0, 'duplicates': 0}
+
+    @classmethod
+    def from_env(cls, load):
+        return cls(
+            load,
+            mode=os.environ.get('DUPLICATE_CHECK', 'flag').lower(),
+            threshold=float(os.environ.get('DUPLICATE_THRESHOLD', DEFAULT_THRESHOLD)),
+            refresh_interval=float(os.environ.get('DUPLICATE_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL))
+        )
+
+    def _refresh(self):
+        if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        with self._refresh_lock:
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return
+            for quiz_id, user_id, theme_id, deleted, change_seq, sig in self._load(self._last_seq):
+                if deleted:
+                    self.remove(quiz_id)
+                else:
+                    self.add(quiz_id, user_id, theme_id, sig)
+                self._last_seq = max(self._last_seq, change_seq)
+            self._refreshed_at = time.monotonic()
+
+    def add(self, quiz_id, user_id, theme_id, sig):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remove(quiz_id)
+            self._quizzes[quiz_id] = (user_id, theme_id, sig)
+            for key in _bands(sig):
+                self._buckets.setdefault(key, set()).add(quiz_id)
+
+    def remove(self, quiz_id):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remove(quiz_id)
+
+    def _remove(self, quiz_id):
+        quiz = self._quizzes.pop(quiz_id, None)
+        if quiz is None:
+            return
+        for key in _bands(quiz[2]):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(quiz_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def find(self, sig, user_id, theme_id=None):
+        """Quizzes of the same user or theme at least threshold similar, as [(quiz_id, similarity)]"""
+        if not self.enabled:
+            return []
+        self._refresh()
+        with self._lock:
+            candidates = set()
+            for key in _bands(sig):
+                candidates.update(self._buckets.get(key, ()))
+            matches = []
+            for quiz_id in candidates:
+                owner, theme, other = self._quizzes[quiz_id]
+                if owner != user_id and (theme_id is None or theme != theme_id):
+                    continue
+                score = similarity(sig, other)
+                if score >= self.threshold:
+                    matches.append((quiz_id, round(score, 2)))
+            self._stats['checks'] += 1
+            self._stats['candidates'] += len(candidates)
+            self._stats['duplicates'] += bool(matches)
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, mode=self.mode, quizzes=len(self._quizzes), buckets=len(self._buckets))
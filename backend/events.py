@@ -0,0 +1,125 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# Recent events kept for Last-Event-ID resume
+EVENTS_BUFFER_SIZE = int(os.environ.get('EVENTS_BUFFER_SIZE', 1000))
+# Comment line sent to idle streams so proxies keep them open
+EVENTS_HEARTBEAT = 15
+# Streams are closed after this long; EventSource reconnects with Last-Event-ID
+EVENTS_STREAM_TIMEOUT = 300
+# Events read from storage per query when a client resumes from before the buffer
+EVENTS_REPLAY_BATCH = 500
+
+Event = collections.namedtuple('Event', 'id type theme_id user_id data')
+
+class MemoryBroker:
+    """In-process event broker with a bounded replay buffer
+
+    Event ids are quiz change_seq numbers, so they mean the same in every
+    process and across restarts; they increase but may have gaps. Every id
+    above floor is in the buffer. Readers block on a condition variable
+    until an event newer than the last one they saw is published.
+    """
+
+    def __init__(self, size=EVENTS_BUFFER_SIZE):
+        self._events = collections.deque(maxlen=size)
+        self._last_id = 0
+        self._floor = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def start_at(self, event_id):
+        """Declare that publishing starts after event_id; older ids must be replayed from elsewhere"""
+        with self._condition:
+            if not self._events:
+                self._floor = self._last_id = max(self._last_id, event_id)
+
+    def publish(self, event_type, data, theme_id=None, user_id=None, event_id=None):
+        """Record an event and wake every waiting stream; returns the event id
+
+        Without event_id the next number is used. Ids not above the last
+        one are ignored.
+        """
+        with self._condition:
+            if event_id is None:
+                event_id = self._last_id + 1
+            elif event_id <= self._last_id:
+                return event_id
+            if len(self._events) == self._events.maxlen:
+                self._floor = self._events[0].id
+            self._events.append(Event(event_id, event_type, theme_id, user_id, data))
+            self._last_id = event_id
+            self._condition.notify_all()
+            return event_id
+
+    def events_after(self, last_id):
+        """Events newer than last_id, or None if some have already left the buffer"""
+        with self._condition:
+            return self._events_after(last_id)
+
+    def _events_after(self, last_id):
+        if last_id < self._floor:
+            return None
+        # An id ahead of this broker (another process got there first) waits for it
+        return [event for event in self._events if event.id > last_id]
+
+    def wait(self, last_id, timeout):
+        """Block until there are events newer than last_id or the timeout expires"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id > last_id or last_id < self._floor, timeout)
+            return self._events_after(last_id)
+
+_broker = MemoryBroker()
+
+def get_broker():
+    return _broker
+
+def set_broker(broker):
+    """Replace the broker, e.g. with one backed by an external message bus"""
+    global _broker
+    _broker = broker
+
+def publish(event_type, data, theme_id=None, user_id=None, event_id=None):
+    return _broker.publish(event_type, data, theme_id=theme_id, user_id=user_id, event_id=event_id)
+
+def format_event(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+def stream(last_id=None, theme_id=None, user_id=None, replay=None):
+    """Generate an SSE stream of matching events published after last_id
+
+    Without a last_id only new events are sent. Events no longer buffered
+    are read from replay(last_id, limit), which returns the next events
+    after last_id from durable storage; without it, or if it has nothing,
+    a reset event tells the client to reload its data.
+    """
+    broker = _broker
+    if last_id is None:
+        last_id = broker.last_id
+    yield "retry: 3000\n\n"
+
+    deadline = time.monotonic() + EVENTS_STREAM_TIMEOUT
+    while time.monotonic() < deadline:
+        events = broker.wait(last_id, EVENTS_HEARTBEAT)
+        if events is None and replay is not None:
+            events = replay(last_id, EVENTS_REPLAY_BATCH) or None
+        if events is None:
+            last_id = broker.last_id
+            yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+            continue
+        if not events:
+            yield ": ping\n\n"
+            continue
+        for event in events:
+            last_id = event.id
+            if theme_id is not None and event.theme_id != theme_id:
+                continue
+            if user_id is not None and event.user_id != user_id:
+                continue
+            yield format_event(event)
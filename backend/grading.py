@@ -0,0 +1,132 @@
+import functools
+import json
+import re
+import unicodedata
+
+# Alternate accepted answers are separated by "|", e.g. "Paris|paris, France"
+ALTERNATE_SEPARATOR = '|'
+MAX_TOLERANCE = 5
+# Parsed answer keys kept in memory, keyed by the stored answer and tolerance
+ANSWER_KEY_CACHE_SIZE = 10000
+
+_NON_WORD = re.compile(r'[\W_]+')
+_TRUE_FALSE = {'true': 'true', 't': 'true', 'yes': 'true', 'false': 'false', 'f': 'false', 'no': 'false'}
+
+def normalize_answer(text):
+    """Case-folded, accent-free answer with punctuation dropped and spacing collapsed"""
+    text = str(text).casefold()
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+def default_tolerance(length):
+    """Typos forgiven when a quiz sets no tolerance: none up to 3 characters, 1 up to 8, then 2"""
+    if length <= 3:
+        return 0
+    return 1 if length <= 8 else 2
+
+def bounded_distance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance between a and b
+
+    Only the diagonal band of width 2 * limit + 1 is computed, and the scan
+    stops as soon as a whole row exceeds limit; any distance above limit is
+    returned as limit + 1.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Common prefixes and suffixes never change the distance
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(len(a) + len(b), limit + 1)
+
+    over = limit + 1
+    width = len(b)
+    before = None
+    previous = [min(j, over) for j in range(width + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (width + 1)
+        current[0] = min(i, over)
+        char = a[i - 1]
+        low, high = max(1, i - limit), min(width, i + limit)
+        for j in range(low, high + 1):
+            cost = char != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if cost and i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = min(value, over)
+        if min(current) > limit:
+            return over
+        before, previous = previous, current
+    return previous[width]
+
+class AnswerKey:
+    """The normalized accepted answers of one text quiz"""
+    __slots__ = ('accepted', 'alternates', 'tolerance')
+
+    def __init__(self, answer_text, tolerance=None):
+        alternates = [normalize_answer(part) for part in str(answer_text or '').split(ALTERNATE_SEPARATOR)]
+        self.alternates = tuple(dict.fromkeys(alternate for alternate in alternates if alternate))
+        self.accepted = frozenset(self.alternates)
+        self.tolerance = tolerance
+
+    def distance(self, answer):
+        """Smallest edit distance from a normalized answer to an alternate, or None if none is within tolerance"""
+        if answer in self.accepted:
+            return 0
+        best = None
+        for alternate in self.alternates:
+            limit = self.tolerance if self.tolerance is not None else default_tolerance(len(alternate))
+            if best is not None:
+                limit = min(limit, best - 1)
+            if limit <= 0:
+                continue
+            distance = bounded_distance(answer, alternate, limit)
+            if distance <= limit:
+                best = distance
+        return best
+
+@functools.lru_cache(maxsize=ANSWER_KEY_CACHE_SIZE)
+def answer_key(answer_text, tolerance=None):
+    """Parsed answer key, built once per distinct stored answer and tolerance"""
+    return AnswerKey(answer_text, tolerance)
+
+def grade(quiz_type, answer_text, answer, tolerance=None):
+    """Grade a submitted answer; returns (correct, distance)
+
+    answer_text is the stored answer: JSON text or a decoded dict for
+    multiple choice, "true"/"false" for true/false, and "|"-separated
+    alternates for text quizzes, matched with typo tolerance.
+    """
+    if answer is None:
+        return False, None
+    if quiz_type == 'multiple_choice':
+        if isinstance(answer_text, str):
+            try:
+                answer_text = json.loads(answer_text)
+            except (json.JSONDecodeError, TypeError):
+                return False, None
+        correct = answer_text.get('correct') if isinstance(answer_text, dict) else None
+        if correct is None:
+            return False, None
+        correct = {normalize_answer(option) for option in (correct if isinstance(correct, list) else [correct])}
+        if isinstance(answer, list):
+            # Every correct option, and nothing else, must be chosen
+            matched = {normalize_answer(option) for option in answer} == correct
+        else:
+            matched = normalize_answer(answer) in correct
+        return matched, 0 if matched else None
+    if quiz_type == 'true_false':
+        expected = _TRUE_FALSE.get(normalize_answer(answer_text))
+        matched = expected is not None and _TRUE_FALSE.get(normalize_answer(answer)) == expected
+        return matched, 0 if matched else None
+    distance = answer_key(answer_text, tolerance).distance(normalize_answer(answer))
+    return distance is not None, distance
@@ -0,0 +1,107 @@
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger('quizbox-backend')
+
+GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 32))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.environ.get('GROUP_COMMIT_MAX_WAIT_MS', 5))
+
+class GroupCommitter:
+    """Runs concurrent small writes in shared transactions to amortize commit cost
+
+    Callers submit a function taking a cursor. A worker thread gathers the
+    writes arriving within max_wait_ms (up to max_batch), runs each one
+    behind its own savepoint and commits them together. A write that raises
+    is rolled back to its savepoint and only its caller sees the error.
+    """
+
+    def __init__(self, get_db, max_batch=GROUP_COMMIT_MAX_BATCH, max_wait_ms=GROUP_COMMIT_MAX_WAIT_MS):
+        self._get_db = get_db
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = collections.Counter()
+        self._commit_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name='group-commit', daemon=True)
+        self._worker.start()
+
+    def submit(self, work):
+        """Queue work(cursor); returns a Future with its result once committed"""
+        future = Future()
+        self._queue.put((work, future))
+        return future
+
+    def run(self, work):
+        """Run work(cursor) in the next group commit and return its result"""
+        return self.submit(work).result()
+
+    def _gather(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._gather()
+            try:
+                self._commit(batch)
+            except Exception as e:
+                logger.error(f"Group commit of {len(batch)} writes failed", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        results = []
+        db = self._get_db()
+        try:
+            with db.cursor() as cursor:
+                for index, (work, future) in enumerate(batch):
+                    cursor.execute(f"SAVEPOINT write_{index}")
+                    try:
+                        results.append((future, work(cursor)))
+                    except Exception as e:
+                        cursor.execute(f"ROLLBACK TO SAVEPOINT write_{index}")
+                        future.set_exception(e)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self._batch_sizes[len(batch)] += 1
+            self._commit_seconds += time.perf_counter() - started
+        for future, result in results:
+            future.set_result(result)
+
+    def stats(self):
+        """Batch size distribution and commit timing for /metrics"""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            writes = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                'batches': batches,
+                'writes': writes,
+                'mean_batch_size': round(writes / batches, 2) if batches else 0,
+                'max_batch_size': max(self._batch_sizes, default=0),
+                'batch_sizes': dict(sorted(self._batch_sizes.items())),
+                'mean_commit_ms': round(self._commit_seconds / batches * 1000, 3) if batches else 0,
+            }
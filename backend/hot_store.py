@@ -0,0 +1,116 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# A quiz is admitted once it has been read this many times while tracked
+DEFAULT_ADMIT_AFTER = 3
+# Records expire, which bounds staleness from writes made by other processes
+DEFAULT_TTL = 60.0
+# Access counts are halved after this many reads so old popularity fades
+FREQUENCY_WINDOW = 10000
+MAX_TRACKED = 50000
+
+class QuizRecord:
+    """A hot quiz: its encoded detail response, the only form it is served in"""
+    __slots__ = ('id', 'encoded', 'size', 'expires')
+
+    def __init__(self, quiz_id, encoded, expires):
+        self.id = quiz_id
+        self.encoded = encoded
+        self.expires = expires
+        self.size = sys.getsizeof(self) + sys.getsizeof(encoded)
+
+class HotQuizStore:
+    """Size-capped LRU of the most read quizzes, with frequency-based admission
+
+    A quiz only takes space after it has been read admit_after times, so a
+    scan over many cold quizzes cannot flush the hot ones.
+    """
+
+    def __init__(self, enabled=True, max_bytes=DEFAULT_MAX_BYTES, admit_after=DEFAULT_ADMIT_AFTER, ttl=DEFAULT_TTL):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.admit_after = admit_after
+        self.ttl = ttl
+        self._records = collections.OrderedDict()
+        self._frequency = collections.Counter()
+        self._accesses = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'admitted': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get('HOT_STORE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+            max_bytes=int(os.environ.get('HOT_STORE_MAX_MB', DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+            admit_after=int(os.environ.get('HOT_STORE_ADMIT_AFTER', DEFAULT_ADMIT_AFTER)),
+            ttl=float(os.environ.get('HOT_STORE_TTL', DEFAULT_TTL))
+        )
+
+    def get(self, quiz_id):
+        """Return the live record for a quiz, or None (and count the access)"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            record = self._records.get(quiz_id)
+            if record is not None:
+                if record.expires > now:
+                    self._records.move_to_end(quiz_id)
+                    self._stats['hits'] += 1
+                    return record
+                self._remove(quiz_id)
+            self._stats['misses'] += 1
+            self._count(quiz_id)
+            return None
+
+    def _count(self, quiz_id):
+        self._frequency[quiz_id] += 1
+        self._accesses += 1
+        if self._accesses >= FREQUENCY_WINDOW or len(self._frequency) > MAX_TRACKED:
+            self._frequency = collections.Counter(
+                {key: count // 2 for key, count in self._frequency.items() if count > 1}
+            )
+            self._accesses = 0
+
+    def wants(self, quiz_id):
+        """Check whether a quiz just loaded from the database should be admitted"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            return self._frequency.get(quiz_id, 0) >= self.admit_after and quiz_id not in self._records
+
+    def put(self, quiz_id, encoded):
+        """Store the encoded JSON detail body of a quiz"""
+        record = QuizRecord(quiz_id, encoded, time.monotonic() + self.ttl)
+        if record.size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(record.id)
+            self._records[record.id] = record
+            self._bytes += record.size
+            self._stats['admitted'] += 1
+            while self._bytes > self.max_bytes:
+                _, evicted = self._records.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats['evictions'] += 1
+
+    def _remove(self, quiz_id):
+        record = self._records.pop(quiz_id, None)
+        if record is not None:
+            self._bytes -= record.size
+
+    def discard(self, quiz_id):
+        """Drop a quiz after it changed"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remove(quiz_id)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, records=len(self._records), bytes=self._bytes, max_bytes=self.max_bytes)
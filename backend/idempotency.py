@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import pymysql
+from flask import current_app, jsonify, request
+
+logger = logging.getLogger('quizbox-backend')
+
+# Stored responses are replayed for this long after the first request
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 3600))
+# How long a duplicate waits for the in-flight request before giving up with 409
+IDEMPOTENCY_WAIT = 10.0
+POLL_INTERVAL = 0.05
+MAX_KEY_LENGTH = 255
+
+_get_db = None
+_lock = threading.Lock()
+# Keys being handled by this process; duplicates wait on the event
+_in_flight = {}
+
+def init_idempotency(get_db):
+    """Register the callable returning a new database connection"""
+    global _get_db
+    _get_db = get_db
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _scope(key):
+    """Keys are per endpoint and per caller, so clients cannot collide with each other"""
+    caller = getattr(request, 'user_id', '')
+    return hashlib.sha256(f"{request.endpoint}\0{caller}\0{key}".encode('utf-8')).hexdigest()
+
+def _claim(db, scope, fingerprint):
+    """Insert an in-flight row for the key; returns the existing row if there is one"""
+    with db.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE created_at < %s LIMIT 100",
+            (_utcnow() - timedelta(seconds=IDEMPOTENCY_TTL),)
+        )
+        try:
+            cursor.execute(
+                """INSERT INTO idempotency_keys (scope_hash, request_hash, created_at)
+                   VALUES (%s, %s, %s)""",
+                (scope, fingerprint, _utcnow())
+            )
+            return None
+        except pymysql.err.IntegrityError:
+            return _load(db, scope) or {'request_hash': fingerprint, 'status_code': None}
+
+def _load(db, scope):
+    with db.cursor() as cursor:
+        cursor.execute(
+            """SELECT request_hash, status_code, content_type, response_body
+               FROM idempotency_keys WHERE scope_hash = %s""",
+            (scope,)
+        )
+        return cursor.fetchone()
+
+def _wait_for(db, scope):
+    """Wait until another request finishes with the key; returns its row or None"""
+    with _lock:
+        done = _in_flight.get(scope)
+    if done is not None:
+        done.wait(IDEMPOTENCY_WAIT)
+        return _load(db, scope)
+
+    # The request is running in another process
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        row = _load(db, scope)
+        if row is None or row['status_code'] is not None:
+            return row
+    return _load(db, scope)
+
+def _replay(row):
+    response = current_app.response_class(row['response_body'], status=row['status_code'],
+                                          content_type=row['content_type'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(f):
+    """Decorator replaying the stored response when an Idempotency-Key header is repeated
+
+    The first request with a key runs the handler and stores its response;
+    later requests with the same key and body get that response back without
+    running the handler. A duplicate arriving while the first is still running
+    waits for it. Server errors are not stored, so those requests can be
+    retried. Only the response is replayed, not session changes.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        scope = _scope(key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        db = _get_db()
+        db.autocommit(True)
+        try:
+            row = _claim(db, scope, fingerprint)
+            if row is not None:
+                if row['request_hash'] != fingerprint:
+                    return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+                if row['status_code'] is None:
+                    row = _wait_for(db, scope)
+                if row is None:
+                    # The first request failed and released the key; run this one instead
+                    if _claim(db, scope, fingerprint) is not None:
+                        return jsonify({'error': 'A request with this Idempotency-Key is in progress'}), 409
+                elif row['status_code'] is None:
+                    return jsonify({'error': 'A request with this Idempotency-Key is in progress'}), 409
+                else:
+                    return _replay(row)
+
+            done = threading.Event()
+            with _lock:
+                _in_flight[scope] = done
+            stored = False
+            try:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code < 500 and not response.is_streamed:
+                    with db.cursor() as cursor:
+                        cursor.execute(
+                            """UPDATE idempotency_keys
+                               SET status_code = %s, content_type = %s, response_body = %s
+                               WHERE scope_hash = %s""",
+                            (response.status_code, response.content_type, response.get_data(), scope)
+                        )
+                    stored = True
+                return response
+            finally:
+                if not stored:
+                    with db.cursor() as cursor:
+                        cursor.execute("DELETE FROM idempotency_keys WHERE scope_hash = %s", (scope,))
+                with _lock:
+                    _in_flight.pop(scope, None)
+                done.set()
+        finally:
+            db.close()
+    return decorated_function
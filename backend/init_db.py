@@ -32,6 +32,30 @@ def wait_for_mysql(max_retries=30, delay=1):
             time.sleep(delay)
     return False
 
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table; returns True if it was added"""
+    cursor.execute(
+        """SELECT 1 FROM information_schema.COLUMNS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s""",
+        (table, column)
+    )
+    if cursor.fetchone():
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+def add_index_if_missing(cursor, table, index, columns):
+    """Add an index to an existing table; returns True if it was added"""
+    cursor.execute(
+        """SELECT 1 FROM information_schema.STATISTICS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s""",
+        (table, index)
+    )
+    if cursor.fetchone():
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} {columns}")
+    return True
+
 def init_db():
     """Initialize the database"""
     # Wait for MySQL to be ready
@@ -77,13 +101,46 @@ def init_db():
                     quiz_type VARCHAR(50) NOT NULL,
                     question_text TEXT NOT NULL,
                     answer_text TEXT,
+                    answer_tolerance TINYINT NULL,
                     theme_id INT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    change_seq BIGINT NOT NULL DEFAULT 0,
+                    created_seq BIGINT NOT NULL DEFAULT 0,
+                    deleted_at DATETIME NULL,
+                    KEY idx_quizzes_change_seq (change_seq),
                     FOREIGN KEY (user_id) REFERENCES users(id),
                     FOREIGN KEY (theme_id) REFERENCES themes(id)
                 )
             """)
             
+            # Sync columns for databases created before GET /sync existed;
+            # existing rows are numbered by id so a first sync returns them
+            if add_column_if_missing(cursor, 'quizzes', 'change_seq', "BIGINT NOT NULL DEFAULT 0"):
+                cursor.execute("UPDATE quizzes SET change_seq = id")
+            add_column_if_missing(
+                cursor, 'quizzes', 'updated_at',
+                "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+            )
+            add_column_if_missing(cursor, 'quizzes', 'deleted_at', "DATETIME NULL")
+            # change_seq of the insert, telling created quizzes from edited ones in the change feed
+            if add_column_if_missing(cursor, 'quizzes', 'created_seq', "BIGINT NOT NULL DEFAULT 0"):
+                cursor.execute("UPDATE quizzes SET created_seq = change_seq")
+            add_column_if_missing(cursor, 'quizzes', 'answer_tolerance', "TINYINT NULL")
+            add_index_if_missing(cursor, 'quizzes', 'idx_quizzes_change_seq', "(change_seq)")
+            
+            # Create change_sequence table: counters handing out change_seq values
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS change_sequence (
+                    name VARCHAR(50) PRIMARY KEY,
+                    value BIGINT NOT NULL
+                )
+            """)
+            cursor.execute(
+                """INSERT IGNORE INTO change_sequence (name, value)
+                   SELECT 'quizzes', COALESCE(MAX(change_seq), 0) FROM quizzes"""
+            )
+            
             # Create api_keys table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS api_keys (
@@ -95,6 +152,145 @@ def init_db():
                 )
             """)
             
+            # Create quiz_structures table: nested quiz payloads (hints, code
+            # examples, ...), only read when a client asks for ?expand=structure
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_structures (
+                    quiz_id INT PRIMARY KEY,
+                    structure JSON NOT NULL,
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Create review_state table: spaced repetition schedule per user and quiz
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS review_state (
+                    user_id INT NOT NULL,
+                    quiz_id INT NOT NULL,
+                    ease FLOAT NOT NULL DEFAULT 2.5,
+                    interval_days INT NOT NULL DEFAULT 0,
+                    repetitions INT NOT NULL DEFAULT 0,
+                    due_at DATETIME NOT NULL,
+                    last_reviewed_at DATETIME,
+                    PRIMARY KEY (user_id, quiz_id),
+                    KEY idx_review_state_due (user_id, due_at),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Create idempotency_keys table: stored responses replayed for
+            # requests repeating an Idempotency-Key header
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    scope_hash CHAR(64) PRIMARY KEY,
+                    request_hash CHAR(64) NOT NULL,
+                    status_code INT,
+                    content_type VARCHAR(255),
+                    response_body MEDIUMBLOB,
+                    created_at DATETIME NOT NULL,
+                    KEY idx_idempotency_keys_created (created_at)
+                )
+            """)
+            
+            # Create jobs table: durable queue for worker.py
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    job_type VARCHAR(50) NOT NULL,
+                    payload JSON NOT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    progress FLOAT NOT NULL DEFAULT 0,
+                    progress_message VARCHAR(255),
+                    result JSON,
+                    error TEXT,
+                    attempts INT NOT NULL DEFAULT 0,
+                    max_attempts INT NOT NULL DEFAULT 3,
+                    run_after DATETIME NOT NULL,
+                    locked_by VARCHAR(100),
+                    created_by INT,
+                    created_at DATETIME NOT NULL,
+                    updated_at DATETIME NOT NULL,
+                    finished_at DATETIME,
+                    KEY idx_jobs_claim (status, run_after),
+                    KEY idx_jobs_type_created (job_type, created_at),
+                    FOREIGN KEY (created_by) REFERENCES users(id)
+                )
+            """)
+            # Periodic job types look up their latest run by type
+            add_index_if_missing(cursor, 'jobs', 'idx_jobs_type_created', "(job_type, created_at)")
+            
+            # Create tags and quiz_tags tables: many-to-many quiz tags, loaded
+            # into in-memory bitmaps for GET /quizzes?tags=...
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(50) NOT NULL,
+                    UNIQUE KEY unique_tag_name (name)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_tags (
+                    quiz_id INT NOT NULL,
+                    tag_id INT NOT NULL,
+                    PRIMARY KEY (quiz_id, tag_id),
+                    KEY idx_quiz_tags_tag (tag_id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE,
+                    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Create quiz_signatures table: MinHash signatures of questions,
+            # loaded into the near-duplicate index
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_signatures (
+                    quiz_id INT PRIMARY KEY,
+                    signature VARBINARY(256) NOT NULL,
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Create quiz_attempts table: graded answers, the input of the
+            # difficulty calibration job
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_attempts (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    user_id INT NOT NULL,
+                    quiz_id INT NOT NULL,
+                    correct BOOLEAN NOT NULL,
+                    answered_at DATETIME NOT NULL,
+                    KEY idx_quiz_attempts_quiz (quiz_id),
+                    KEY idx_quiz_attempts_user (user_id, answered_at),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Create quiz_difficulty and user_ability tables: IRT estimates
+            # written by the calibrate_difficulty job
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_difficulty (
+                    quiz_id INT PRIMARY KEY,
+                    difficulty DOUBLE NOT NULL,
+                    discrimination DOUBLE NOT NULL,
+                    attempts INT NOT NULL,
+                    calibrated_at DATETIME NOT NULL,
+                    KEY idx_quiz_difficulty_difficulty (difficulty),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_ability (
+                    user_id INT PRIMARY KEY,
+                    ability DOUBLE NOT NULL,
+                    attempts INT NOT NULL,
+                    calibrated_at DATETIME NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            
             conn.commit()
             print("Database initialized successfully!")
             
@@ -0,0 +1,243 @@
+"""Durable background jobs stored in the jobs table
+
+Handlers are registered with @job_type and run by worker processes
+(worker.py). A job is retried with exponential backoff until it succeeds
+or runs out of attempts, and each job type has a limit on how many of its
+jobs run at the same time across all workers. Job types registered with
+every=seconds are also queued by the workers themselves on that schedule.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger('quizbox-jobs')
+
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+# Running jobs whose worker has not reported for this long are handed to another worker
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 300))
+JOB_BACKOFF_BASE = 5
+JOB_BACKOFF_MAX = 600
+# Serializes claims so per-type concurrency limits hold across worker processes
+CLAIM_LOCK = 'quizbox-jobs-claim'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+class JobType:
+    def __init__(self, name, handler, concurrency, max_attempts, admin_only, every=None, redact=None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.admin_only = admin_only
+        self.every = every
+        self.redact = redact
+
+JOB_TYPES = {}
+
+def job_type(name, concurrency=1, max_attempts=3, admin_only=True, every=None, redact=None):
+    """Register a job handler taking (context, payload) and returning a JSON-serializable result
+
+    With every (seconds), a job with an empty payload is queued whenever the
+    type's latest job was created that long ago, or never. redact(payload),
+    if given, returns the payload to keep once the job has finished, so
+    secrets a job needs are not stored after it stops retrying.
+    """
+    def register(handler):
+        JOB_TYPES[name] = JobType(name, handler, concurrency, max_attempts, admin_only, every, redact)
+        return handler
+    return register
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts`, with jitter"""
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def enqueue(cursor, name, payload=None, created_by=None):
+    """Queue a job in the caller's transaction; returns the job id"""
+    job = JOB_TYPES[name]
+    now = utcnow()
+    cursor.execute(
+        """INSERT INTO jobs (job_type, payload, status, max_attempts, run_after, created_by, created_at, updated_at)
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+        (name, json.dumps(payload or {}), QUEUED, job.max_attempts, now, created_by, now, now)
+    )
+    return cursor.lastrowid
+
+def job_status(row):
+    """Public representation of a jobs row"""
+    return {
+        'id': row['id'],
+        'type': row['job_type'],
+        'status': row['status'],
+        'progress': row['progress'],
+        'message': row['progress_message'],
+        'attempts': row['attempts'],
+        'max_attempts': row['max_attempts'],
+        'result': json.loads(row['result']) if row['result'] is not None else None,
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'finished_at': row['finished_at'],
+    }
+
+class JobContext:
+    """Handed to handlers for progress reporting"""
+
+    def __init__(self, db, job, worker_id):
+        self._db = db
+        self.job_id = job['id']
+        self.created_by = job['created_by']
+        self.worker_id = worker_id
+
+    def report(self, progress, message=None):
+        """Record progress (0.0-1.0) and an optional message; also serves as a heartbeat"""
+        with self._db.cursor() as cursor:
+            cursor.execute(
+                """UPDATE jobs SET progress = %s, progress_message = %s, updated_at = %s
+                   WHERE id = %s AND locked_by = %s""",
+                (round(min(max(progress, 0.0), 1.0), 4), message, utcnow(), self.job_id, self.worker_id)
+            )
+        self._db.commit()
+
+def _requeue_stale(cursor):
+    cutoff = utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    redacted = [job.name for job in JOB_TYPES.values() if job.redact is not None]
+    if redacted:
+        # Stale jobs out of attempts fail below; their payloads are redacted first
+        placeholders = ', '.join(['%s'] * len(redacted))
+        cursor.execute(
+            f"""SELECT id, job_type, payload FROM jobs
+                WHERE status = %s AND updated_at < %s AND attempts >= max_attempts AND job_type IN ({placeholders})""",
+            (RUNNING, cutoff, *redacted)
+        )
+        for job in cursor.fetchall():
+            _redact_payload(cursor, job)
+    cursor.execute(
+        """UPDATE jobs SET status = IF(attempts >= max_attempts, %s, %s),
+                  finished_at = IF(attempts >= max_attempts, %s, NULL),
+                  error = 'Worker stopped responding', locked_by = NULL, updated_at = %s
+           WHERE status = %s AND updated_at < %s""",
+        (FAILED, QUEUED, utcnow(), utcnow(), RUNNING, cutoff)
+    )
+
+def _enqueue_periodic(cursor):
+    for job in JOB_TYPES.values():
+        if not job.every:
+            continue
+        cursor.execute("SELECT MAX(created_at) AS latest FROM jobs WHERE job_type = %s", (job.name,))
+        latest = cursor.fetchone()['latest']
+        if latest is None or latest <= utcnow() - timedelta(seconds=job.every):
+            enqueue(cursor, job.name)
+
+def claim_job(db, worker_id):
+    """Mark the next runnable job as running for this worker; returns its row or None"""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, 10) AS locked", (CLAIM_LOCK,))
+        if not cursor.fetchone()['locked']:
+            return None
+        try:
+            _requeue_stale(cursor)
+            _enqueue_periodic(cursor)
+            cursor.execute("SELECT job_type, COUNT(*) AS running FROM jobs WHERE status = %s GROUP BY job_type",
+                           (RUNNING,))
+            running = {row['job_type']: row['running'] for row in cursor.fetchall()}
+            available = [job.name for job in JOB_TYPES.values() if running.get(job.name, 0) < job.concurrency]
+            if not available:
+                db.commit()
+                return None
+
+            placeholders = ', '.join(['%s'] * len(available))
+            cursor.execute(
+                f"""SELECT * FROM jobs
+                    WHERE status = %s AND run_after <= %s AND job_type IN ({placeholders})
+                    ORDER BY run_after, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED""",
+                (QUEUED, utcnow(), *available)
+            )
+            job = cursor.fetchone()
+            if job:
+                cursor.execute(
+                    """UPDATE jobs SET status = %s, attempts = attempts + 1, locked_by = %s, updated_at = %s
+                       WHERE id = %s""",
+                    (RUNNING, worker_id, utcnow(), job['id'])
+                )
+                job['attempts'] += 1
+            db.commit()
+            return job
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (CLAIM_LOCK,))
+
+def _redact_payload(cursor, job):
+    redact = JOB_TYPES[job['job_type']].redact
+    if redact is not None:
+        cursor.execute("UPDATE jobs SET payload = %s WHERE id = %s",
+                       (json.dumps(redact(json.loads(job['payload']))), job['id']))
+
+def run_job(db, job, worker_id):
+    """Run a claimed job and record its outcome"""
+    context = JobContext(db, job, worker_id)
+    try:
+        result = JOB_TYPES[job['job_type']].handler(context, json.loads(job['payload']))
+    except Exception as e:
+        logger.error(f"Job {job['id']} ({job['job_type']}) failed on attempt {job['attempts']}", exc_info=True)
+        db.rollback()
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        with db.cursor() as cursor:
+            if job['attempts'] < job['max_attempts']:
+                cursor.execute(
+                    """UPDATE jobs SET status = %s, error = %s, locked_by = NULL, run_after = %s, updated_at = %s
+                       WHERE id = %s AND locked_by = %s""",
+                    (QUEUED, error, utcnow() + timedelta(seconds=backoff_delay(job['attempts'])), utcnow(),
+                     job['id'], worker_id)
+                )
+            else:
+                cursor.execute(
+                    """UPDATE jobs SET status = %s, error = %s, locked_by = NULL, finished_at = %s, updated_at = %s
+                       WHERE id = %s AND locked_by = %s""",
+                    (FAILED, error, utcnow(), utcnow(), job['id'], worker_id)
+                )
+                _redact_payload(cursor, job)
+        db.commit()
+        return False
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            """UPDATE jobs SET status = %s, progress = 1, result = %s, error = NULL, locked_by = NULL,
+                              finished_at = %s, updated_at = %s
+               WHERE id = %s AND locked_by = %s""",
+            (SUCCEEDED, json.dumps(result, default=str), utcnow(), utcnow(), job['id'], worker_id)
+        )
+        _redact_payload(cursor, job)
+    db.commit()
+    logger.info(f"Job {job['id']} ({job['job_type']}) succeeded")
+    return True
+
+def run_worker(get_db, stop=None):
+    """Claim and run jobs until stop (a threading/multiprocessing Event) is set"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job worker {worker_id} started for {', '.join(sorted(JOB_TYPES))}")
+    while stop is None or not stop.is_set():
+        try:
+            db = get_db()
+            try:
+                job = claim_job(db, worker_id)
+                if job:
+                    run_job(db, job, worker_id)
+            finally:
+                db.close()
+        except Exception:
+            logger.error("Job worker error", exc_info=True)
+            job = None
+        if not job:
+            time.sleep(JOB_POLL_INTERVAL)
@@ -0,0 +1,114 @@
+import dataclasses
+import datetime
+import decimal
+import functools
+import json
+import uuid
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is used instead
+    orjson = None
+
+# orjson.Fragment (orjson >= 3.9) embeds pre-encoded JSON without re-parsing it
+_Fragment = getattr(orjson, 'Fragment', None)
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+@functools.lru_cache(maxsize=4096)
+def http_date(value):
+    """Format a date/datetime as an RFC 822 HTTP date, like werkzeug.http.http_date
+
+    Rows inserted together share timestamps, so formatted values are cached.
+    """
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    elif value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return (f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT")
+
+class JSONFragment:
+    """Already-encoded JSON (e.g. a stored answer_text) to embed in a response as-is
+
+    The text must be valid JSON. With orjson >= 3.9 it is copied into the
+    output verbatim; other encoders decode it first, so the output is the
+    same either way.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode('utf-8') if isinstance(data, str) else data
+
+    def __repr__(self):
+        return f"JSONFragment({self.data!r})"
+
+def _default(obj):
+    """Serialize the types DB rows contain that JSON has no native type for"""
+    if isinstance(obj, JSONFragment):
+        if _Fragment is not None:
+            return _Fragment(obj.data)
+        return json.loads(obj.data)
+    if isinstance(obj, datetime.date):
+        # Same RFC 822 format as Flask's default provider
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed
+
+    Falls back to the stdlib encoder otherwise. Both paths produce the same
+    document: datetimes as HTTP dates, Decimal/UUID as strings and
+    JSONFragment values inlined.
+    """
+    default = staticmethod(_default)
+    # Key sorting and ASCII escaping cost time and no client relies on them
+    sort_keys = False
+    ensure_ascii = False
+
+    def _orjson_options(self, indent=False):
+        # Datetimes go through _default so both encoders format them the same
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string"""
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('separators', None)
+        if orjson is None or kwargs:
+            # Unknown json.dumps options are only supported by the stdlib
+            if indent is not None:
+                kwargs['indent'] = indent
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options(bool(indent))).decode('utf-8')
+
+    def dumpb(self, obj):
+        """Serialize obj to UTF-8 JSON bytes, skipping the str round trip where possible"""
+        if orjson is None:
+            return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON text or bytes"""
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments and wrap them in an application/json response"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
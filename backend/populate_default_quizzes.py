@@ -51,6 +51,14 @@ def get_theme_id(theme_name):
     finally:
         conn.close()
 
+def next_change_seq(cursor):
+    """Allocate a quiz change sequence number the way app.next_change_seq does"""
+    cursor.execute(
+        "UPDATE change_sequence SET value = LAST_INSERT_ID(value + 1) WHERE name = 'quizzes'"
+    )
+    cursor.execute("SELECT LAST_INSERT_ID() AS seq")
+    return cursor.fetchone()['seq']
+
 def populate_default_quizzes():
     """Populate default quizzes for the admin user"""
     admin_id = get_admin_id()
@@ -103,13 +111,14 @@ def populate_default_quizzes():
                 if quiz['quiz_type'] == 'multiple_choice':
                     answer_text = json.dumps(answer_text)
                 
-                # Insert quiz
+                # Insert quiz; a change_seq makes it visible to GET /sync and the change feed
+                seq = next_change_seq(cursor)
                 cursor.execute(
                     """INSERT INTO quizzes 
-                       (user_id, quiz_type, question_text, answer_text, theme_id)
-                       VALUES (%s, %s, %s, %s, %s)""",
+                       (user_id, quiz_type, question_text, answer_text, theme_id, change_seq, created_seq)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
                     (admin_id, quiz['quiz_type'], quiz['question_text'], 
-                     answer_text, theme_id)
+                     answer_text, theme_id, seq, seq)
                 )
             
             conn.commit()
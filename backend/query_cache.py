@@ -0,0 +1,103 @@
+import collections
+import os
+import re
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 1024
+# Entries also expire, which bounds staleness from writes made by other processes
+DEFAULT_TTL = 30.0
+# Larger results are not cached, so an entry's size stays bounded
+MAX_CACHED_ROWS = 1000
+
+_WHITESPACE = re.compile(r'\s+')
+
+class QueryCache:
+    """Read-through LRU cache of query results, invalidated by table tags
+
+    Each entry remembers the version of every table it reads. Writes call
+    invalidate() with the tables they changed, which bumps those versions
+    and makes every dependent entry stale. Versions are read before the query
+    runs, so a result racing with a write is never stored as current.
+    Rows are copied on the way out, so callers may modify them.
+    """
+
+    def __init__(self, enabled=True, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._versions = collections.defaultdict(int)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0, 'invalidations': 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get('QUERY_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+            max_entries=int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.environ.get('QUERY_CACHE_TTL', DEFAULT_TTL))
+        )
+
+    def get_or_load(self, sql, params, tables, load):
+        """Return cached rows for (sql, params), calling load() to fetch them on a miss"""
+        if not self.enabled:
+            return load()
+        key = (_WHITESPACE.sub(' ', sql).strip(), tuple(params or ()))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                rows, versions, expires = entry
+                if expires > now and all(self._versions[table] == version for table, version in versions):
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return [dict(row) for row in rows]
+                del self._entries[key]
+                self._stats['stale'] += 1
+            self._stats['misses'] += 1
+            versions = tuple((table, self._versions[table]) for table in tables)
+
+        rows = load()
+        if len(rows) > MAX_CACHED_ROWS:
+            return rows
+        stored = tuple(dict(row) for row in rows)
+        with self._lock:
+            self._entries[key] = (stored, versions, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return rows
+
+    def fetchall(self, cursor, sql, params=(), tables=()):
+        """cursor.execute + fetchall through the cache"""
+        def load():
+            cursor.execute(sql, params)
+            return list(cursor.fetchall())
+        return self.get_or_load(sql, params, tables, load)
+
+    def fetchone(self, cursor, sql, params=(), tables=()):
+        """cursor.execute + fetchone through the cache"""
+        def load():
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            return [row] if row else []
+        rows = self.get_or_load(sql, params, tables, load)
+        return rows[0] if rows else None
+
+    def invalidate(self, *tables):
+        """Mark every cached result reading any of these tables as stale"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), enabled=self.enabled)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0
+        return stats
@@ -0,0 +1,236 @@
+import collections
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from flask import request, session, jsonify, current_app
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the shared store needs it
+    fcntl = None
+
+# A client may burst up to DEFAULT_CAPACITY tokens, refilled at DEFAULT_REFILL_RATE per second
+DEFAULT_CAPACITY = 60
+DEFAULT_REFILL_RATE = 10.0
+DEFAULT_SHARED_SLOTS = 8192
+# API keys confirmed by a lookup are remembered per process for this long
+API_KEY_CACHE_SIZE = 10000
+API_KEY_CACHE_TTL = 60.0
+# Unknown keys are remembered separately, fewer and for less time
+UNKNOWN_API_KEY_CACHE_SIZE = 1000
+UNKNOWN_API_KEY_CACHE_TTL = 5.0
+
+# Token cost per endpoint; anything not listed costs 1. Full-list reads and
+# bulk writes cost more because they cost the database more.
+ROUTE_COSTS = {
+    'get_quizzes': 2,
+    'get_default_quizzes': 2,
+    'get_my_quizzes': 2,
+    'get_theme_quizzes': 2,
+    'sync_quizzes': 2,
+    'grade_answers': 2,
+    'register': 5,
+    'login': 5,
+    'create_job': 5,
+    'import_roster': 20,
+}
+# Endpoints never limited
+EXEMPT_ENDPOINTS = {'health_check', 'metrics', 'static'}
+
+_stats_lock = threading.Lock()
+_stats = {'checked': 0, 'limited': 0, 'seconds': 0.0}
+
+class MemoryStore:
+    """Buckets in a dict; limits are per process"""
+
+    def __init__(self, max_keys=100000):
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key, cost, capacity, rate, now):
+        """Take cost tokens from key's bucket; returns (allowed, seconds until allowed)"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [capacity, now]
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return True, 0.0
+            bucket[0] = tokens
+            return False, (cost - tokens) / rate
+
+class SharedStore:
+    """Buckets in a memory-mapped file, shared by every worker process on the host
+
+    The file is a fixed table of slots (key hash, tokens, last update). A
+    key maps to one slot; when two keys collide the newer one takes the slot
+    over with a full bucket. Each slot is guarded by a byte-range lock, so
+    checks for different clients do not contend.
+    """
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, path, slots=DEFAULT_SHARED_SLOTS):
+        if fcntl is None:
+            raise RuntimeError('The shared rate limit store needs fcntl (POSIX)')
+        self.slots = slots
+        size = slots * self.SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # fcntl locks only exclude other processes; threads take a striped lock too
+        self._thread_locks = [threading.Lock() for _ in range(64)]
+
+    def take(self, key, cost, capacity, rate, now):
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+        slot = key_hash % self.slots
+        offset = slot * self.SLOT.size
+        with self._thread_locks[slot % len(self._thread_locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                stored_hash, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+                if stored_hash != key_hash:
+                    tokens, updated = capacity, now
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self.SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+class ApiKeyCache:
+    """Answers of an API key lookup, remembered for a short while
+
+    Real and unknown keys are kept in separate bounded caches, so callers
+    inventing keys can only push out other unknown keys.
+    """
+
+    def __init__(self, lookup, max_keys=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL,
+                 max_unknown=UNKNOWN_API_KEY_CACHE_SIZE, unknown_ttl=UNKNOWN_API_KEY_CACHE_TTL):
+        self._lookup = lookup
+        self._caches = {
+            True: (collections.OrderedDict(), max_keys, ttl),
+            False: (collections.OrderedDict(), max_unknown, unknown_ttl),
+        }
+        self._lock = threading.Lock()
+
+    def cached(self, api_key, now):
+        """True or False if the answer for api_key is cached, None if it needs a lookup"""
+        with self._lock:
+            for valid, (keys, _, _) in self._caches.items():
+                expires = keys.get(api_key)
+                if expires is not None and expires > now:
+                    keys.move_to_end(api_key)
+                    return valid
+        return None
+
+    def is_valid(self, api_key, now):
+        valid = self.cached(api_key, now)
+        if valid is not None:
+            return valid
+        try:
+            valid = bool(self._lookup(api_key))
+        except Exception:
+            # Not cached: a failed lookup says nothing about the key
+            return False
+        with self._lock:
+            keys, max_keys, ttl = self._caches[valid]
+            keys[api_key] = now + ttl
+            keys.move_to_end(api_key)
+            if len(keys) > max_keys:
+                keys.popitem(last=False)
+            self._caches[not valid][0].pop(api_key, None)
+        return valid
+
+def fallback_key():
+    """Identify a caller without a known API key by session user, then IP address"""
+    user_id = session.get('user_id')
+    if user_id is not None:
+        return f"u:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+def check_rate_limit():
+    """before_request hook answering 429 once the caller's bucket is empty"""
+    endpoint = request.endpoint
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+        return None
+    started = time.perf_counter()
+    config = current_app.config
+    store = current_app.extensions['rate_limit']
+    now = time.monotonic()
+    bucket = (ROUTE_COSTS.get(endpoint, 1), config['RATE_LIMIT_CAPACITY'], config['RATE_LIMIT_REFILL_RATE'], now)
+
+    # An API key gets its own bucket only once it is known to be real;
+    # otherwise a caller could get a fresh bucket by inventing keys
+    api_key = request.headers.get('x-api-key')
+    api_keys = current_app.extensions.get('rate_limit_api_keys')
+    known = api_keys.cached(api_key, now) if api_key and api_keys is not None else False
+    if known is None:
+        # Charge the fallback bucket before the lookup, so invented keys are
+        # limited before they reach the database
+        allowed, retry_after = store.take(fallback_key(), *bucket)
+        if allowed:
+            api_keys.is_valid(api_key, now)
+    else:
+        allowed, retry_after = store.take(f"k:{api_key}" if known else fallback_key(), *bucket)
+    with _stats_lock:
+        _stats['checked'] += 1
+        _stats['seconds'] += time.perf_counter() - started
+        if not allowed:
+            _stats['limited'] += 1
+    if allowed:
+        return None
+    response = jsonify({'error': 'Rate limit exceeded'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def rate_limit_stats():
+    """Return rate limit counters and the mean time per check"""
+    with _stats_lock:
+        stats = dict(_stats)
+    seconds = stats.pop('seconds')
+    stats['mean_check_us'] = round(seconds / stats['checked'] * 1e6, 2) if stats['checked'] else 0
+    return stats
+
+def init_rate_limit(app, api_key_lookup=None):
+    """Register opt-in rate limiting on app (enable with RATE_LIMIT_ENABLED=true)
+
+    RATE_LIMIT_STORE=shared keeps buckets in a memory-mapped file so the
+    limits hold across worker processes on one host; the default memory
+    store is per process. api_key_lookup(key) tells whether an x-api-key is
+    real; without it callers are limited by session user or IP address only.
+    """
+    app.config.setdefault('RATE_LIMIT_ENABLED',
+                          os.environ.get('RATE_LIMIT_ENABLED', 'false').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('RATE_LIMIT_CAPACITY', float(os.environ.get('RATE_LIMIT_CAPACITY', DEFAULT_CAPACITY)))
+    app.config.setdefault('RATE_LIMIT_REFILL_RATE',
+                          float(os.environ.get('RATE_LIMIT_REFILL_RATE', DEFAULT_REFILL_RATE)))
+    app.config.setdefault('RATE_LIMIT_STORE', os.environ.get('RATE_LIMIT_STORE', 'memory'))
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+
+    if app.config['RATE_LIMIT_STORE'] == 'shared':
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path = os.environ.get('RATE_LIMIT_SHARED_PATH', os.path.join(shm_dir, 'quizbox-rate-limit'))
+        store = SharedStore(path)
+    else:
+        store = MemoryStore()
+    app.extensions['rate_limit'] = store
+    if api_key_lookup is not None:
+        app.extensions['rate_limit_api_keys'] = ApiKeyCache(api_key_lookup)
+    app.before_request(check_rate_limit)
@@ -0,0 +1,228 @@
+"""Item-to-item recommendations from a precomputed co-occurrence matrix
+
+A build (the build_recommendations job) turns (user, item) history into,
+for every theme and every quiz, its most similar items: those most often
+seen by the same users, scored by cosine similarity. The result is stored
+as CSR-style .npy arrays in a new version directory, and a CURRENT file is
+switched to it atomically. Readers memory-map the current version, so a
+lookup is a binary search and a few array slices.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+import numpy as np
+
+logger = logging.getLogger('quizbox-backend')
+
+RECOMMENDATIONS_DIR = os.environ.get(
+    'RECOMMENDATIONS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommendations')
+)
+# Seconds between scheduled rebuilds; 0 only builds when a job is queued by hand
+REBUILD_EVERY = int(os.environ.get('RECOMMENDATIONS_EVERY', 3600))
+NEIGHBORS_PER_ITEM = 50
+# Only each user's most recent items count, which bounds the pairs per user
+MAX_ITEMS_PER_USER = 100
+# Item pairs expanded at once; bounds the memory a build needs
+PAIR_CHUNK = 2_000_000
+KEEP_VERSIONS = 2
+# GET /me/recommendations: results per kind, and how much of a user's recent history seeds them
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+HISTORY_LIMIT = 50
+# How often readers look for a new version
+CHECK_INTERVAL = 10.0
+KINDS = ('theme', 'quiz')
+ARRAYS = ('ids', 'offsets', 'neighbors', 'scores')
+
+def _groups(sorted_keys):
+    """Start and length of each run of equal values in a sorted array"""
+    if not len(sorted_keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return starts, np.diff(np.r_[starts, len(sorted_keys)])
+
+def _item_blocks(sorted_items, pair_sizes, budget):
+    """Slices of item-sorted entries holding about budget pairs each
+
+    Blocks end on item boundaries where they can; an item with more than
+    budget pairs of its own is split across blocks.
+    """
+    totals = np.cumsum(pair_sizes)
+    item_ends = np.flatnonzero(np.r_[sorted_items[1:] != sorted_items[:-1], True]) + 1
+    start = 0
+    while start < len(sorted_items):
+        done = totals[start - 1] if start else 0
+        candidate = max(int(np.searchsorted(totals, done + budget, side='right')), start + 1)
+        last_whole = int(np.searchsorted(item_ends, candidate, side='right')) - 1
+        end = int(item_ends[last_whole]) if last_whole >= 0 and item_ends[last_whole] > start else candidate
+        yield slice(start, end)
+        start = end
+
+def _top_per_row(rows, cols, scores, limit):
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    starts, lengths = _groups(rows)
+    keep = (np.arange(len(rows)) - np.repeat(starts, lengths)) < limit
+    return rows[keep], cols[keep], scores[keep]
+
+def cooccurrence(users, items, neighbors=NEIGHBORS_PER_ITEM, max_items_per_user=MAX_ITEMS_PER_USER,
+                 pair_chunk=PAIR_CHUNK):
+    """Top co-occurring items of every item, as CSR arrays
+
+    users and items are parallel arrays with one element per interaction,
+    oldest first; repeats are ignored. Returns a dict: item ids (sorted),
+    offsets, and neighbors and scores, where the neighbours of ids[r] are
+    neighbors[offsets[r]:offsets[r + 1]], best first.
+
+    Rows of the item x item matrix are built a block of items at a time:
+    each (item, user) entry expands into the user's other items, the block
+    is counted with np.unique and cut to its top neighbours before the next
+    one. An item too popular for one block is split, and the counts of its
+    row are carried into the next block, so memory stays bounded by
+    pair_chunk plus one row rather than by all pairs.
+    """
+    users = np.asarray(users, dtype=np.int64)
+    items = np.asarray(items, dtype=np.int64)
+    # Unique over the reversed history: each pair's index is its last occurrence, counted from the end
+    keys, age = np.unique(((users << 32) | items)[::-1], return_index=True)
+    users, items = keys >> 32, keys & 0xFFFFFFFF
+
+    # Keep each user's most recently seen items
+    order = np.lexsort((age, users))
+    users, items = users[order], items[order]
+    starts, lengths = _groups(users)
+    rank = np.arange(len(users)) - np.repeat(starts, lengths)
+    keep = rank < max_items_per_user
+    users, items = users[keep], items[keep]
+    starts, lengths = _groups(users)
+
+    ids, item_index = np.unique(items, return_inverse=True)
+    item_index = item_index.astype(np.int64)
+    n_items = len(ids)
+    popularity = np.bincount(item_index, minlength=n_items).astype(np.float64)
+    # Per entry: where its user's items start, and how many there are
+    user_starts = np.repeat(starts, lengths)
+    user_lengths = np.repeat(lengths, lengths)
+    by_item = np.argsort(item_index, kind='stable')
+
+    sorted_items = item_index[by_item]
+    carried_keys, carried_counts = np.zeros(0, np.int64), np.zeros(0, np.int64)
+    blocks = []
+    for block in _item_blocks(sorted_items, user_lengths[by_item], pair_chunk):
+        entries = by_item[block]
+        sizes = user_lengths[entries]
+        left = np.repeat(item_index[entries], sizes)
+        within = np.arange(len(left)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        right = item_index[np.repeat(user_starts[entries], sizes) + within]
+        mask = left != right
+        pair_keys, counts = np.unique(left[mask] * n_items + right[mask], return_counts=True)
+        if len(carried_keys):
+            pair_keys, inverse = np.unique(np.r_[carried_keys, pair_keys], return_inverse=True)
+            counts = np.bincount(inverse, weights=np.r_[carried_counts, counts]).astype(np.int64)
+        # A row is only cut to its top neighbours once all of its item's entries are counted
+        if block.stop < len(sorted_items) and sorted_items[block.stop] == sorted_items[block.stop - 1]:
+            carried = pair_keys // n_items == sorted_items[block.stop]
+            carried_keys, carried_counts = pair_keys[carried], counts[carried]
+            pair_keys, counts = pair_keys[~carried], counts[~carried]
+        else:
+            carried_keys, carried_counts = carried_keys[:0], carried_counts[:0]
+        rows, cols = np.divmod(pair_keys, n_items)
+        scores = counts / np.sqrt(popularity[rows] * popularity[cols])
+        blocks.append(_top_per_row(rows, cols, scores, neighbors))
+
+    rows, cols, scores = (np.concatenate([block[part] for block in blocks]) if blocks else np.zeros(0, np.int64)
+                          for part in range(3))
+    return {
+        'ids': ids.astype(np.int32),
+        'offsets': np.searchsorted(rows, np.arange(n_items + 1)).astype(np.int64),
+        'neighbors': ids[cols.astype(np.int64)].astype(np.int32),
+        'scores': scores.astype(np.float32),
+    }
+
+def write_version(tables, base_dir=RECOMMENDATIONS_DIR, keep=KEEP_VERSIONS):
+    """Save {kind: cooccurrence() result} as a new version and make it current; returns its name"""
+    os.makedirs(base_dir, exist_ok=True)
+    # Names sort in creation order, which pruning relies on
+    version = f"{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = os.path.join(base_dir, f'.tmp-{version}')
+    os.makedirs(tmp_dir)
+    for kind, table in tables.items():
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_dir, f'{kind}_{name}.npy'), table[name])
+    os.rename(tmp_dir, os.path.join(base_dir, version))
+
+    current = os.path.join(base_dir, 'CURRENT')
+    tmp_current = f'{current}.{version}.tmp'
+    with open(tmp_current, 'w') as f:
+        f.write(version)
+    os.replace(tmp_current, current)
+
+    # Old versions stay mapped by readers that opened them; unlinking is safe
+    older = sorted(name for name in os.listdir(base_dir) if not name.startswith('.') and name != version
+                   and os.path.isdir(os.path.join(base_dir, name)))
+    for name in older[:max(len(older) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+    return version
+
+def read_current(base_dir=RECOMMENDATIONS_DIR):
+    try:
+        with open(os.path.join(base_dir, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+class Recommendations:
+    """Read side: the current version's arrays, memory-mapped and reloaded when CURRENT changes"""
+
+    def __init__(self, base_dir=RECOMMENDATIONS_DIR, check_interval=CHECK_INTERVAL):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self.version = None
+        self._tables = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = read_current(self.base_dir)
+            if version is None or version == self.version:
+                return
+            directory = os.path.join(self.base_dir, version)
+            try:
+                self._tables = {
+                    kind: {name: np.load(os.path.join(directory, f'{kind}_{name}.npy'), mmap_mode='r')
+                           for name in ARRAYS}
+                    for kind in KINDS
+                }
+                self.version = version
+            except (OSError, ValueError):
+                logger.warning(f"Could not load recommendations version {version}", exc_info=True)
+
+    def similar(self, kind, item_ids, exclude=(), limit=10):
+        """Items most similar to any of item_ids (scores summed), best first, as [(item_id, score)]"""
+        self._refresh()
+        table = self._tables.get(kind)
+        if table is None or not len(item_ids) or not len(table['ids']):
+            return []
+        ids, offsets = table['ids'], table['offsets']
+        wanted = np.asarray(list(item_ids), dtype=np.int64)
+        rows = np.searchsorted(ids, wanted)
+        rows = rows[(rows < len(ids)) & (ids[np.minimum(rows, len(ids) - 1)] == wanted)]
+        if not len(rows):
+            return []
+        slices = [np.arange(offsets[row], offsets[row + 1]) for row in rows]
+        positions = np.concatenate(slices)
+        neighbors, inverse = np.unique(table['neighbors'][positions], return_inverse=True)
+        scores = np.bincount(inverse, weights=table['scores'][positions], minlength=len(neighbors))
+        skip = np.isin(neighbors, np.asarray(list(exclude), dtype=np.int64))
+        order = [index for index in np.argsort(-scores, kind='stable') if not skip[index]][:limit]
+        return [(int(neighbors[index]), round(float(scores[index]), 4)) for index in order]
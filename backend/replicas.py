@@ -0,0 +1,123 @@
+import logging
+import os
+import random
+import threading
+import time
+import pymysql
+
+logger = logging.getLogger('quizbox-backend')
+
+# Replicas further behind the primary than this are skipped
+DEFAULT_MAX_LAG = 5
+DEFAULT_CHECK_INTERVAL = 2.0
+
+def parse_hosts(value, default_port=3306):
+    """Parse DB_REPLICA_HOSTS ("host[:port],host[:port]") into (host, port) pairs"""
+    hosts = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
+def replica_lag(db):
+    """Seconds the replica is behind its source, or None if it is not replicating"""
+    with db.cursor() as cursor:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+            key = 'Seconds_Behind_Source'
+        except pymysql.err.ProgrammingError:
+            # MySQL before 8.0.22
+            cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            key = 'Seconds_Behind_Master'
+    if not status:
+        return None
+    return status.get(key)
+
+class ReplicaPool:
+    """Read replicas and their health, refreshed by a background thread
+
+    A replica is used for reads while it answers the lag check and is at
+    most max_lag seconds behind. With no healthy replica, reads go to the
+    primary.
+    """
+
+    def __init__(self, configs, max_lag=DEFAULT_MAX_LAG, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.configs = configs
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._healthy = []
+        self._lag = {}
+        self._lock = threading.Lock()
+        self._checker = None
+
+    @classmethod
+    def from_env(cls, primary_config):
+        """Build the pool from DB_REPLICA_HOSTS; returns None if no replicas are configured"""
+        hosts = parse_hosts(os.environ.get('DB_REPLICA_HOSTS', ''))
+        if not hosts:
+            return None
+        configs = [dict(primary_config, host=host, port=port, connect_timeout=2) for host, port in hosts]
+        return cls(
+            configs,
+            max_lag=float(os.environ.get('DB_REPLICA_MAX_LAG', DEFAULT_MAX_LAG)),
+            check_interval=float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+        )
+
+    def check(self):
+        """Measure every replica's lag and update the healthy list"""
+        healthy, lags = [], {}
+        for config in self.configs:
+            name = f"{config['host']}:{config['port']}"
+            try:
+                db = pymysql.connect(**config)
+                try:
+                    lag = replica_lag(db)
+                finally:
+                    db.close()
+            except pymysql.err.MySQLError as e:
+                logger.warning(f"Replica {name} unavailable: {e}")
+                lag = None
+            lags[name] = lag
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(config)
+        with self._lock:
+            self._healthy = healthy
+            self._lag = lags
+
+    def _run_checker(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.error("Replica health check failed", exc_info=True)
+            time.sleep(self.check_interval)
+
+    def start(self):
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run_checker, name='replica-check', daemon=True)
+                self._checker.start()
+
+    def choose(self):
+        """Config of a healthy replica, or None to use the primary"""
+        self.start()
+        with self._lock:
+            return random.choice(self._healthy) if self._healthy else None
+
+    def mark_down(self, config):
+        """Stop using a replica that failed to connect until the next check"""
+        with self._lock:
+            self._healthy = [healthy for healthy in self._healthy if healthy is not config]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'replicas': len(self.configs),
+                'healthy': len(self._healthy),
+                'lag_seconds': dict(self._lag),
+            }
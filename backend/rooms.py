@@ -0,0 +1,421 @@
+"""Live quiz rooms: an asyncio service that runs instructor-led rounds
+
+The instructor creates a room from a theme and advances through its
+quizzes; students join over Server-Sent Events or WebSockets. All room
+state lives in memory in this process, and every broadcast is encoded
+once and handed to per-connection queues, so one process can fan out to
+hundreds of students.
+
+Run with: python rooms.py (listens on ROOMS_PORT, default 5060)
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+import pymysql
+from aiohttp import web, WSMsgType
+from dotenv import load_dotenv
+import grading
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('quizbox-rooms')
+
+# Database configuration
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'mysql'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', 'password'),
+    'db': os.environ.get('DB_NAME', 'quizbox'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'charset': 'utf8mb4',
+    'cursorclass': pymysql.cursors.DictCursor
+}
+
+ROOMS_PORT = int(os.environ.get('ROOMS_PORT', 5060))
+# Messages queued per connection before a slow client is disconnected
+SUBSCRIBER_QUEUE_SIZE = 64
+# Leaderboard updates are coalesced to at most one per interval
+LEADERBOARD_INTERVAL = 0.25
+HEARTBEAT_INTERVAL = 15
+ROOM_IDLE_TIMEOUT = 2 * 3600
+BASE_POINTS = 100
+SPEED_BONUS = 50
+SPEED_WINDOW = 20.0
+
+def get_db():
+    """Get database connection"""
+    return pymysql.connect(**DB_CONFIG)
+
+def lookup_api_key(api_key):
+    """Return the user id owning an API key, or None"""
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT user_id FROM api_keys WHERE api_key = %s", (api_key,))
+            result = cursor.fetchone()
+            return result['user_id'] if result else None
+    finally:
+        db.close()
+
+def load_theme_quizzes(theme_id):
+    """Load the quizzes of a theme with their answers, or None if the theme does not exist"""
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT id FROM themes WHERE id = %s", (theme_id,))
+            if not cursor.fetchone():
+                return None
+            cursor.execute(
+                """SELECT id, quiz_type, question_text, answer_text, answer_tolerance FROM quizzes
+                   WHERE theme_id = %s AND deleted_at IS NULL ORDER BY id""",
+                (theme_id,)
+            )
+            quizzes = cursor.fetchall()
+    finally:
+        db.close()
+
+    for quiz in quizzes:
+        if quiz['quiz_type'] == 'multiple_choice':
+            try:
+                quiz['answer_text'] = json.loads(quiz['answer_text'])
+            except (json.JSONDecodeError, TypeError):
+                pass
+    return quizzes
+
+def is_correct(quiz, answer):
+    """Grade a submitted answer against a quiz row"""
+    correct, _ = grading.grade(quiz['quiz_type'], quiz['answer_text'], answer, quiz.get('answer_tolerance'))
+    return correct
+
+def public_question(quiz, index, total):
+    """Question payload broadcast to students (without the answer)"""
+    question = {
+        'index': index,
+        'total': total,
+        'quiz_id': quiz['id'],
+        'quiz_type': quiz['quiz_type'],
+        'question_text': quiz['question_text'],
+    }
+    if quiz['quiz_type'] == 'multiple_choice' and isinstance(quiz['answer_text'], dict):
+        question['options'] = quiz['answer_text'].get('options', [])
+    return question
+
+class Message:
+    """A broadcast event, encoded once for every transport"""
+    __slots__ = ('text', 'sse')
+
+    def __init__(self, event, data):
+        self.text = json.dumps({'event': event, 'data': data}, separators=(',', ':'))
+        self.sse = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+class Subscriber:
+    """One connected client and its outgoing message queue"""
+
+    def __init__(self, player_id=None):
+        self.player_id = player_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+
+class Room:
+    """In-memory state of one live round"""
+
+    def __init__(self, code, owner_id, theme_id, quizzes):
+        self.code = code
+        self.owner_id = owner_id
+        self.theme_id = theme_id
+        self.quizzes = quizzes
+        self.players = {}
+        self.subscribers = set()
+        self.current = -1
+        self.question_started = None
+        self.answers = {}
+        self.revealed = False
+        self.finished = False
+        self.last_activity = time.monotonic()
+        self._leaderboard_pending = False
+
+    @property
+    def question(self):
+        if 0 <= self.current < len(self.quizzes):
+            return self.quizzes[self.current]
+        return None
+
+    def add_player(self, name):
+        player_id = secrets.token_urlsafe(8)
+        self.players[player_id] = {'name': name[:50], 'score': 0}
+        return player_id
+
+    def subscribe(self, player_id=None):
+        subscriber = Subscriber(player_id)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def broadcast(self, event, data):
+        """Queue one encoded message on every connection; clients that fall behind are dropped"""
+        message = Message(event, data)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self.subscribers.discard(subscriber)
+        self.last_activity = time.monotonic()
+
+    def leaderboard(self, limit=10):
+        ranked = sorted(self.players.values(), key=lambda player: player['score'], reverse=True)
+        return [{'name': player['name'], 'score': player['score']} for player in ranked[:limit]]
+
+    def state(self):
+        return {
+            'code': self.code,
+            'theme_id': self.theme_id,
+            'players': len(self.players),
+            'connections': len(self.subscribers),
+            'question': public_question(self.question, self.current, len(self.quizzes)) if self.question else None,
+            'finished': self.finished,
+        }
+
+    def advance(self):
+        """Move to the next question, or finish the round"""
+        self.current += 1
+        self.answers = {}
+        self.revealed = False
+        if self.question is None:
+            self.finished = True
+            self.broadcast('finished', {'leaderboard': self.leaderboard(limit=len(self.players))})
+            return None
+        self.question_started = time.monotonic()
+        question = public_question(self.question, self.current, len(self.quizzes))
+        self.broadcast('question', question)
+        return question
+
+    def reveal(self):
+        quiz = self.question
+        if quiz is None:
+            return None
+        self.revealed = True
+        answer = quiz['answer_text']
+        if quiz['quiz_type'] == 'multiple_choice' and isinstance(answer, dict):
+            answer = answer.get('correct')
+        self.broadcast('reveal', {'index': self.current, 'answer': answer})
+        return answer
+
+    def submit(self, player_id, answer):
+        """Grade a player's answer to the current question; each player answers once"""
+        quiz = self.question
+        if quiz is None or self.revealed:
+            raise ValueError('No question is open')
+        if player_id not in self.players:
+            raise KeyError('Unknown player')
+        if player_id in self.answers:
+            raise ValueError('Already answered')
+
+        correct = is_correct(quiz, answer)
+        points = 0
+        if correct:
+            elapsed = time.monotonic() - self.question_started
+            points = BASE_POINTS + round(SPEED_BONUS * max(0.0, 1 - elapsed / SPEED_WINDOW))
+            self.players[player_id]['score'] += points
+        self.answers[player_id] = correct
+        self.last_activity = time.monotonic()
+        self.schedule_leaderboard()
+        return {'correct': correct, 'points': points, 'score': self.players[player_id]['score']}
+
+    def schedule_leaderboard(self):
+        """Coalesce leaderboard broadcasts while answers stream in"""
+        if self._leaderboard_pending:
+            return
+        self._leaderboard_pending = True
+        asyncio.get_running_loop().call_later(LEADERBOARD_INTERVAL, self._send_leaderboard)
+
+    def _send_leaderboard(self):
+        self._leaderboard_pending = False
+        self.broadcast('leaderboard', {
+            'index': self.current,
+            'answered': len(self.answers),
+            'leaderboard': self.leaderboard()
+        })
+
+rooms = {}
+
+def json_error(message, status):
+    return web.json_response({'error': message}, status=status)
+
+async def run_blocking(func, *args):
+    """Run blocking database work off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+async def require_owner(request, room):
+    api_key = request.headers.get('x-api-key')
+    if not api_key:
+        raise web.HTTPUnauthorized(text=json.dumps({'error': 'API key required'}), content_type='application/json')
+    user_id = await run_blocking(lookup_api_key, api_key)
+    if user_id is None or user_id != room.owner_id:
+        raise web.HTTPForbidden(text=json.dumps({'error': 'Only the room owner can do this'}),
+                                content_type='application/json')
+
+def get_room(request):
+    room = rooms.get(request.match_info['code'])
+    if room is None:
+        raise web.HTTPNotFound(text=json.dumps({'error': 'Room not found'}), content_type='application/json')
+    return room
+
+async def create_room(request):
+    """Create a room from a theme (instructor, x-api-key)"""
+    api_key = request.headers.get('x-api-key')
+    if not api_key:
+        return json_error('API key required', 401)
+    user_id = await run_blocking(lookup_api_key, api_key)
+    if user_id is None:
+        return json_error('Invalid API key', 401)
+
+    data = await request.json()
+    theme_id = data.get('theme_id') if isinstance(data, dict) else None
+    if not isinstance(theme_id, int):
+        return json_error('theme_id is required', 400)
+    quizzes = await run_blocking(load_theme_quizzes, theme_id)
+    if quizzes is None:
+        return json_error('Theme not found', 404)
+    if not quizzes:
+        return json_error('Theme has no quizzes', 400)
+
+    code = secrets.token_hex(3).upper()
+    while code in rooms:
+        code = secrets.token_hex(3).upper()
+    rooms[code] = Room(code, user_id, theme_id, quizzes)
+    logger.info(f"Room {code} created by user {user_id} with {len(quizzes)} questions")
+    return web.json_response({'code': code, 'questions': len(quizzes)}, status=201)
+
+async def room_state(request):
+    """Get a room's public state"""
+    return web.json_response(get_room(request).state())
+
+async def next_question(request):
+    """Broadcast the next question (room owner)"""
+    room = get_room(request)
+    await require_owner(request, room)
+    question = room.advance()
+    return web.json_response({'question': question, 'finished': room.finished})
+
+async def reveal_answer(request):
+    """Broadcast the current question's answer (room owner)"""
+    room = get_room(request)
+    await require_owner(request, room)
+    if room.question is None:
+        return json_error('No question is open', 400)
+    return web.json_response({'answer': room.reveal()})
+
+async def submit_answer(request):
+    """Submit an answer for SSE clients"""
+    room = get_room(request)
+    data = await request.json()
+    if not isinstance(data, dict):
+        return json_error('Invalid request body', 400)
+    try:
+        return web.json_response(room.submit(data.get('player_id'), data.get('answer')))
+    except KeyError as e:
+        return json_error(str(e.args[0]), 404)
+    except ValueError as e:
+        return json_error(str(e), 409)
+
+def join(room, request):
+    name = request.query.get('name', '').strip()
+    player_id = room.add_player(name) if name else None
+    subscriber = room.subscribe(player_id)
+    welcome = {'player_id': player_id, 'room': room.state()}
+    return subscriber, welcome
+
+async def room_events(request):
+    """Join a room over Server-Sent Events (?name=... to play, omit to watch)"""
+    room = get_room(request)
+    subscriber, welcome = join(room, request)
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    try:
+        await response.write(Message('welcome', welcome).sse)
+        while not subscriber.dropped:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                await response.write(b": ping\n\n")
+                continue
+            await response.write(message.sse)
+    except (ConnectionResetError, asyncio.CancelledError):
+        pass
+    finally:
+        room.unsubscribe(subscriber)
+    return response
+
+async def room_socket(request):
+    """Join a room over a WebSocket; answers are sent as {"answer": ...} messages"""
+    room = get_room(request)
+    ws = web.WebSocketResponse(heartbeat=HEARTBEAT_INTERVAL)
+    await ws.prepare(request)
+    subscriber, welcome = join(room, request)
+
+    async def send_messages():
+        await ws.send_str(Message('welcome', welcome).text)
+        while not subscriber.dropped:
+            message = await subscriber.queue.get()
+            await ws.send_str(message.text)
+        await ws.close()
+
+    sender = asyncio.create_task(send_messages())
+    try:
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                data = json.loads(msg.data)
+                result = room.submit(subscriber.player_id, data.get('answer'))
+                await ws.send_str(json.dumps({'event': 'result', 'data': result}))
+            except (ValueError, KeyError, AttributeError) as e:
+                await ws.send_str(json.dumps({'event': 'error', 'data': {'error': str(e)}}))
+    finally:
+        sender.cancel()
+        room.unsubscribe(subscriber)
+    return ws
+
+async def expire_rooms(app):
+    """Drop rooms nobody has used for ROOM_IDLE_TIMEOUT"""
+    async def loop():
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - ROOM_IDLE_TIMEOUT
+            for code, room in list(rooms.items()):
+                if room.last_activity < cutoff and not room.subscribers:
+                    del rooms[code]
+                    logger.info(f"Room {code} expired")
+    task = asyncio.create_task(loop())
+    yield
+    task.cancel()
+
+def create_app():
+    app = web.Application()
+    app.router.add_post('/rooms', create_room)
+    app.router.add_get('/rooms/{code}', room_state)
+    app.router.add_post('/rooms/{code}/next', next_question)
+    app.router.add_post('/rooms/{code}/reveal', reveal_answer)
+    app.router.add_post('/rooms/{code}/answer', submit_answer)
+    app.router.add_get('/rooms/{code}/events', room_events)
+    app.router.add_get('/rooms/{code}/ws', room_socket)
+    app.cleanup_ctx.append(expire_rooms)
+    return app
+
+if __name__ == '__main__':
+    web.run_app(create_app(), host='0.0.0.0', port=ROOMS_PORT)
@@ -0,0 +1,209 @@
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pymysql
+from cryptography.fernet import Fernet, InvalidToken
+from werkzeug.security import generate_password_hash
+
+# Users inserted per transaction
+ROSTER_CHUNK_SIZE = int(os.environ.get('ROSTER_CHUNK_SIZE', 100))
+ROSTER_HASH_WORKERS = int(os.environ.get('ROSTER_HASH_WORKERS', os.cpu_count() or 2))
+MAX_ROSTER_SIZE = 5000
+# Length passed to secrets.token_urlsafe for generated initial passwords
+GENERATED_PASSWORD_BYTES = 9
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ROSTER_HASH_WORKERS)
+        return _pool
+
+def hash_passwords(passwords):
+    """Hash passwords in parallel; the KDF is CPU-bound, so threads would not help"""
+    if len(passwords) <= 1:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (ROSTER_HASH_WORKERS * 4))
+    return list(_get_pool().map(generate_password_hash, passwords, chunksize=chunksize))
+
+def parse_roster(body, content_type):
+    """Read roster rows from a CSV body (name,email[,password] header) or JSON {"users": [...]}"""
+    if content_type and content_type.startswith('application/json'):
+        data = json.loads(body)
+        rows = data.get('users') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('JSON roster must be a list of users')
+        return rows
+    if content_type and content_type.startswith('text/csv'):
+        reader = csv.DictReader(io.StringIO(body.decode('utf-8-sig')))
+        if not reader.fieldnames or not {'name', 'email'} <= {field.strip() for field in reader.fieldnames}:
+            raise ValueError('CSV roster needs a header with name and email columns')
+        return [{key.strip(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+    raise ValueError('Roster must be text/csv or application/json')
+
+def validate_rows(rows):
+    """Split roster rows into valid users and per-row errors (by row index)"""
+    users, errors, seen = [], [], set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        name = str(row.get('name') or '').strip()
+        email = str(row.get('email') or '').strip().lower()
+        password = row.get('password') or None
+        if password is not None and not isinstance(password, str):
+            errors.append({'row': index, 'email': email or None, 'error': 'Password must be a string'})
+        elif not name or not email:
+            errors.append({'row': index, 'email': email or None, 'error': 'Missing name or email'})
+        elif not EMAIL_PATTERN.match(email):
+            errors.append({'row': index, 'email': email, 'error': 'Invalid email'})
+        elif email in seen:
+            errors.append({'row': index, 'email': email, 'error': 'Duplicate email in roster'})
+        else:
+            seen.add(email)
+            users.append({'row': index, 'name': name, 'email': email, 'password': password})
+    return users, errors
+
+def generate_missing_passwords(rows):
+    """Give valid rows without a password a generated one, in place; returns [{row, email, password}]"""
+    users, _ = validate_rows(rows)
+    generated = []
+    for user in users:
+        if not user['password']:
+            password = secrets.token_urlsafe(GENERATED_PASSWORD_BYTES)
+            rows[user['row']]['password'] = password
+            generated.append({'row': user['row'], 'email': user['email'], 'password': password})
+    return generated
+
+def _fernet(secret):
+    """Fernet keyed by the app's SECRET_KEY, which the API and worker.py share"""
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(b'quizbox-roster:' + secret.encode()).digest()))
+
+def seal_passwords(rows, secret):
+    """Encrypt the passwords of roster rows in place, so a queued payload holds none in plain text"""
+    fernet = _fernet(secret)
+    for row in rows:
+        if isinstance(row, dict) and row.get('password') is not None:
+            row['password'] = fernet.encrypt(json.dumps(row['password']).encode()).decode()
+
+def open_passwords(rows, secret):
+    """Decrypt passwords sealed by seal_passwords, in place"""
+    fernet = _fernet(secret)
+    for row in rows:
+        if isinstance(row, dict) and row.get('password') is not None:
+            try:
+                row['password'] = json.loads(fernet.decrypt(str(row['password']).encode()))
+            except InvalidToken:
+                raise ValueError('Roster passwords were sealed with a different SECRET_KEY')
+
+def redact_payload(payload):
+    """An import_roster job payload with the passwords removed, kept once the job has finished"""
+    rows = payload.get('users')
+    if not isinstance(rows, list):
+        return payload
+    return dict(payload, users=[
+        {key: value for key, value in row.items() if key != 'password'} if isinstance(row, dict) else row
+        for row in rows
+    ])
+
+def _existing_emails(cursor, emails):
+    if not emails:
+        return set()
+    placeholders = ', '.join(['%s'] * len(emails))
+    cursor.execute(f"SELECT email FROM users WHERE email IN ({placeholders})", emails)
+    return {row['email'].lower() for row in cursor.fetchall()}
+
+def _insert_chunk(cursor, chunk):
+    cursor.executemany(
+        "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)",
+        [(user['name'], user['email'], user['password_hash']) for user in chunk]
+    )
+    placeholders = ', '.join(['%s'] * len(chunk))
+    cursor.execute(f"SELECT id, email FROM users WHERE email IN ({placeholders})",
+                   [user['email'] for user in chunk])
+    ids = {row['email'].lower(): row['id'] for row in cursor.fetchall()}
+    for user in chunk:
+        user['id'] = ids[user['email']]
+        user['api_key'] = secrets.token_urlsafe(32)
+    cursor.executemany(
+        "INSERT INTO api_keys (user_id, api_key) VALUES (%s, %s)",
+        [(user['id'], user['api_key']) for user in chunk]
+    )
+
+def import_roster(db, rows, progress=None):
+    """Create users and API keys for a roster
+
+    Rows whose email is already registered are reported as duplicates and
+    the rest of the batch carries on. Every row needs a password (see
+    generate_missing_passwords); the result holds no credentials. Students
+    read their API key with GET /me/api-key after logging in.
+    progress(fraction, message), if given, is called after every batch of
+    passwords hashed and every chunk committed, so it can serve as a
+    heartbeat for long imports.
+    """
+    users, errors = validate_rows(rows)
+
+    with db.cursor() as cursor:
+        existing = _existing_emails(cursor, [user['email'] for user in users])
+    duplicates = [user for user in users if user['email'] in existing]
+    users = [user for user in users if user['email'] not in existing]
+    errors.extend({'row': user['row'], 'email': user['email'], 'error': 'Email already registered'}
+                  for user in duplicates)
+
+    missing = [user for user in users if not user['password']]
+    users = [user for user in users if user['password']]
+    errors.extend({'row': user['row'], 'email': user['email'], 'error': 'Missing password'} for user in missing)
+    # Hashing takes the first half of the progress bar, inserting the second
+    batch = ROSTER_CHUNK_SIZE * ROSTER_HASH_WORKERS
+    for start in range(0, len(users), batch):
+        chunk = users[start:start + batch]
+        for user, password_hash in zip(chunk, hash_passwords([user['password'] for user in chunk])):
+            user['password_hash'] = password_hash
+        if progress is not None:
+            done = start + len(chunk)
+            progress(done / len(users) / 2, f"{done} of {len(users)} passwords hashed")
+
+    created = []
+    for start in range(0, len(users), ROSTER_CHUNK_SIZE):
+        chunk = users[start:start + ROSTER_CHUNK_SIZE]
+        try:
+            with db.cursor() as cursor:
+                _insert_chunk(cursor, chunk)
+            db.commit()
+            created.extend(chunk)
+        except pymysql.err.IntegrityError as e:
+            db.rollback()
+            if e.args[0] != 1062:
+                raise
+            # Someone registered one of these emails meanwhile; insert one by one to find it
+            for user in chunk:
+                try:
+                    with db.cursor() as cursor:
+                        _insert_chunk(cursor, [user])
+                    db.commit()
+                    created.append(user)
+                except pymysql.err.IntegrityError as e:
+                    db.rollback()
+                    if e.args[0] != 1062:  # MySQL duplicate entry error code
+                        raise
+                    errors.append({'row': user['row'], 'email': user['email'], 'error': 'Email already registered'})
+        if progress is not None:
+            done = start + len(chunk)
+            progress(0.5 + done / len(users) / 2, f"{done} of {len(users)} users created")
+
+    return {
+        'created': [{'row': user['row'], 'id': user['id'], 'email': user['email']} for user in created],
+        'errors': sorted(errors, key=lambda error: error['row']),
+    }
@@ -0,0 +1,130 @@
+import gzip
+import logging
+import os
+import threading
+from flask import request, send_file
+
+logger = logging.getLogger('quizbox-backend')
+
+SNAPSHOTS_ENABLED = os.environ.get('DECK_SNAPSHOTS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SNAPSHOT_DIR = os.environ.get(
+    'DECK_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+)
+SNAPSHOT_GZIP = os.environ.get('DECK_SNAPSHOT_GZIP', 'true').lower() in ('1', 'true', 'yes')
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+_build_snapshot = None
+# Themes whose snapshot on disk was written by this process after the last change
+_fresh = set()
+_pending = set()
+_building = set()
+# Bumped on every change so a rebuild racing with a write is not marked fresh
+_generations = {}
+
+def snapshot_path(theme_id, gzipped=False):
+    """Path of the snapshot file for a theme deck"""
+    return os.path.join(SNAPSHOT_DIR, f"theme-{theme_id}.json" + ('.gz' if gzipped else ''))
+
+def is_fresh(theme_id):
+    """Check whether the theme's snapshot can be served instead of querying MySQL"""
+    return SNAPSHOTS_ENABLED and theme_id in _fresh
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def rebuild_snapshot(theme_id):
+    """Write the snapshot files for one theme; returns False if the theme no longer exists"""
+    with _lock:
+        generation = _generations.get(theme_id, 0)
+
+    data = _build_snapshot(theme_id)
+    if data is None:
+        _remove(snapshot_path(theme_id))
+        _remove(snapshot_path(theme_id, gzipped=True))
+        return False
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    # Write the gzip variant first so a fresh plain file always has a matching .gz
+    if SNAPSHOT_GZIP:
+        _write_atomic(snapshot_path(theme_id, gzipped=True), gzip.compress(data, compresslevel=9, mtime=0))
+    _write_atomic(snapshot_path(theme_id), data)
+
+    with _lock:
+        if _generations.get(theme_id, 0) == generation:
+            _fresh.add(theme_id)
+    logger.debug(f"Rebuilt deck snapshot for theme {theme_id} ({len(data)} bytes)")
+    return True
+
+def _run_worker():
+    while True:
+        _wakeup.wait()
+        with _lock:
+            if not _pending:
+                _wakeup.clear()
+                continue
+            theme_id = _pending.pop()
+            _building.add(theme_id)
+        try:
+            rebuild_snapshot(theme_id)
+        except Exception:
+            logger.error(f"Failed to rebuild deck snapshot for theme {theme_id}", exc_info=True)
+        finally:
+            with _lock:
+                _building.discard(theme_id)
+
+def _enqueue(theme_id):
+    global _worker
+    _pending.add(theme_id)
+    if _worker is None:
+        _worker = threading.Thread(target=_run_worker, name='deck-snapshots', daemon=True)
+        _worker.start()
+
+def schedule_rebuild(theme_id):
+    """Invalidate a theme's snapshot and queue it for a background rebuild; for writes"""
+    if not SNAPSHOTS_ENABLED or theme_id is None:
+        return
+    with _lock:
+        _fresh.discard(theme_id)
+        _generations[theme_id] = _generations.get(theme_id, 0) + 1
+        _enqueue(theme_id)
+    _wakeup.set()
+
+def request_build(theme_id):
+    """Queue a build of a theme's missing snapshot without invalidating one in progress; for reads"""
+    if not SNAPSHOTS_ENABLED or theme_id is None:
+        return
+    with _lock:
+        if theme_id in _fresh or theme_id in _pending or theme_id in _building:
+            return
+        _enqueue(theme_id)
+    _wakeup.set()
+
+def send_snapshot(theme_id):
+    """Serve a theme snapshot from disk, with conditional and range request support"""
+    path = snapshot_path(theme_id)
+    gzipped = snapshot_path(theme_id, gzipped=True)
+    if SNAPSHOT_GZIP and request.accept_encodings['gzip'] and os.path.exists(gzipped):
+        response = send_file(gzipped, mimetype='application/json', conditional=True, etag=True)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(path, mimetype='application/json', conditional=True, etag=True)
+    del response.headers['Content-Disposition']
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_snapshots(build_snapshot):
+    """Register the callable returning a theme deck as JSON bytes (None if the theme is gone)"""
+    global _build_snapshot
+    _build_snapshot = build_snapshot
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+# SM-2 defaults: every card starts at ease 2.5 and never drops below 1.3
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MIN_GRADE = 0
+MAX_GRADE = 5
+# Grades below this count as a lapse and restart the card
+PASSING_GRADE = 3
+
+def new_state():
+    """Scheduling state of a card that has never been reviewed"""
+    return {'ease': DEFAULT_EASE, 'interval_days': 0, 'repetitions': 0}
+
+def apply_grade(state, grade, now):
+    """Apply one SM-2 review grade (0-5) to a card's state
+
+    Returns a new dict with ease, interval_days, repetitions, due_at and
+    last_reviewed_at.
+    """
+    ease = state['ease']
+    repetitions = state['repetitions']
+
+    if grade < PASSING_GRADE:
+        repetitions = 0
+        interval_days = 1
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = max(1, round(state['interval_days'] * ease))
+        repetitions += 1
+
+    ease = max(MIN_EASE, ease + 0.1 - (MAX_GRADE - grade) * (0.08 + (MAX_GRADE - grade) * 0.02))
+
+    return {
+        'ease': round(ease, 4),
+        'interval_days': interval_days,
+        'repetitions': repetitions,
+        'due_at': now + timedelta(days=interval_days),
+        'last_reviewed_at': now,
+    }
@@ -0,0 +1,119 @@
+import os
+import re
+import threading
+import time
+
+MAX_TAGS_PER_QUIZ = 20
+MAX_TAG_LENGTH = 50
+# Rebuild from quiz_tags this often to pick up writes made by other processes
+TAG_INDEX_TTL = float(os.environ.get('TAG_INDEX_TTL', 60))
+# Loads retried when writes race them before the current bitmaps are kept
+REBUILD_ATTEMPTS = 3
+
+_TAG_PATTERN = re.compile(r'^[a-z0-9][a-z0-9 _+#.-]*$')
+
+def normalize_tags(tags):
+    """Validate a list of tag names; returns them lowercased and deduplicated"""
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError('Tags must be a list of strings')
+    names = list(dict.fromkeys(' '.join(tag.lower().split()) for tag in tags if tag.strip()))
+    if len(names) > MAX_TAGS_PER_QUIZ:
+        raise ValueError(f'A quiz can have at most {MAX_TAGS_PER_QUIZ} tags')
+    for name in names:
+        if len(name) > MAX_TAG_LENGTH or not _TAG_PATTERN.match(name):
+            raise ValueError(f'Invalid tag: {name}')
+    return names
+
+def bit_positions(bitmap, limit=None):
+    """Set bit positions (quiz ids) of a bitmap in ascending order"""
+    positions = []
+    # One linear conversion instead of repeated big-int shifts per result
+    bits = bin(bitmap)[:1:-1]
+    index = bits.find('1')
+    while index != -1 and (limit is None or len(positions) < limit):
+        positions.append(index)
+        index = bits.find('1', index + 1)
+    return positions
+
+class TagIndex:
+    """Per-tag bitmaps of quiz ids, as plain Python int bitsets
+
+    Bit n of a tag's bitmap is set when quiz n carries the tag, so boolean
+    tag queries are a few big-int AND/OR/AND-NOT operations.
+    """
+
+    def __init__(self, load, ttl=TAG_INDEX_TTL):
+        self._load = load
+        self.ttl = ttl
+        self._bitmaps = {}
+        self._loaded_at = None
+        # Bumped by every add() and remove(), so a load can tell it raced a write
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        for attempt in range(REBUILD_ATTEMPTS):
+            with self._lock:
+                generation = self._generation
+            bitmaps = {}
+            for quiz_id, tag in self._load():
+                bitmaps[tag] = bitmaps.get(tag, 0) | (1 << quiz_id)
+            with self._lock:
+                # A write applied during the load may be missing from it: load again rather than lose it
+                raced = self._generation != generation
+                if raced and attempt < REBUILD_ATTEMPTS - 1:
+                    continue
+                if not raced or self._loaded_at is None:
+                    self._bitmaps = bitmaps
+                # Writes that keep racing leave the current bitmaps, which have them, until the next ttl
+                self._loaded_at = time.monotonic()
+                return
+
+    def add(self, quiz_id, tags):
+        """Set a quiz's bit in each tag's bitmap"""
+        bit = 1 << quiz_id
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                self._bitmaps[tag] = self._bitmaps.get(tag, 0) | bit
+
+    def remove(self, quiz_id, tags=None):
+        """Clear a quiz's bit from the given tags (all tags if None)"""
+        mask = ~(1 << quiz_id)
+        with self._lock:
+            self._generation += 1
+            for tag in list(self._bitmaps if tags is None else tags):
+                if tag in self._bitmaps:
+                    bitmap = self._bitmaps[tag] & mask
+                    if bitmap:
+                        self._bitmaps[tag] = bitmap
+                    else:
+                        del self._bitmaps[tag]
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Bitmap of quizzes having every tag in all_of, at least one of any_of and none of none_of"""
+        self._ensure_loaded()
+        with self._lock:
+            bitmaps = self._bitmaps
+            result = None
+            for tag in all_of:
+                bitmap = bitmaps.get(tag, 0)
+                result = bitmap if result is None else result & bitmap
+            if any_of:
+                union = 0
+                for tag in any_of:
+                    union |= bitmaps.get(tag, 0)
+                result = union if result is None else result & union
+            if result is None:
+                return 0
+            for tag in none_of:
+                result &= ~bitmaps.get(tag, 0)
+            return result
+
+    def counts(self):
+        """Number of quizzes per tag"""
+        self._ensure_loaded()
+        with self._lock:
+            return {tag: bitmap.bit_count() for tag, bitmap in self._bitmaps.items()}
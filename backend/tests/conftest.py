@@ -95,13 +95,150 @@ def test_db():
                     quiz_type VARCHAR(20) NOT NULL,
                     question_text TEXT NOT NULL,
                     answer_text TEXT NOT NULL,
+                    answer_tolerance TINYINT NULL,
                     theme_id INT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    change_seq BIGINT NOT NULL DEFAULT 0,
+                    created_seq BIGINT NOT NULL DEFAULT 0,
+                    deleted_at DATETIME NULL,
+                    KEY idx_quizzes_change_seq (change_seq),
                     FOREIGN KEY (user_id) REFERENCES users(id),
                     FOREIGN KEY (theme_id) REFERENCES themes(id)
                 )
             """)
             
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS change_sequence (
+                    name VARCHAR(50) PRIMARY KEY,
+                    value BIGINT NOT NULL
+                )
+            """)
+            cursor.execute("INSERT INTO change_sequence (name, value) VALUES ('quizzes', 0)")
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_structures (
+                    quiz_id INT PRIMARY KEY,
+                    structure JSON NOT NULL,
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS review_state (
+                    user_id INT NOT NULL,
+                    quiz_id INT NOT NULL,
+                    ease FLOAT NOT NULL DEFAULT 2.5,
+                    interval_days INT NOT NULL DEFAULT 0,
+                    repetitions INT NOT NULL DEFAULT 0,
+                    due_at DATETIME NOT NULL,
+                    last_reviewed_at DATETIME,
+                    PRIMARY KEY (user_id, quiz_id),
+                    KEY idx_review_state_due (user_id, due_at),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    scope_hash CHAR(64) PRIMARY KEY,
+                    request_hash CHAR(64) NOT NULL,
+                    status_code INT,
+                    content_type VARCHAR(255),
+                    response_body MEDIUMBLOB,
+                    created_at DATETIME NOT NULL,
+                    KEY idx_idempotency_keys_created (created_at)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    job_type VARCHAR(50) NOT NULL,
+                    payload JSON NOT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    progress FLOAT NOT NULL DEFAULT 0,
+                    progress_message VARCHAR(255),
+                    result JSON,
+                    error TEXT,
+                    attempts INT NOT NULL DEFAULT 0,
+                    max_attempts INT NOT NULL DEFAULT 3,
+                    run_after DATETIME NOT NULL,
+                    locked_by VARCHAR(100),
+                    created_by INT,
+                    created_at DATETIME NOT NULL,
+                    updated_at DATETIME NOT NULL,
+                    finished_at DATETIME,
+                    KEY idx_jobs_claim (status, run_after),
+                    KEY idx_jobs_type_created (job_type, created_at),
+                    FOREIGN KEY (created_by) REFERENCES users(id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(50) NOT NULL,
+                    UNIQUE KEY unique_tag_name (name)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_tags (
+                    quiz_id INT NOT NULL,
+                    tag_id INT NOT NULL,
+                    PRIMARY KEY (quiz_id, tag_id),
+                    KEY idx_quiz_tags_tag (tag_id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE,
+                    FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_signatures (
+                    quiz_id INT PRIMARY KEY,
+                    signature VARBINARY(256) NOT NULL,
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_attempts (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    user_id INT NOT NULL,
+                    quiz_id INT NOT NULL,
+                    correct BOOLEAN NOT NULL,
+                    answered_at DATETIME NOT NULL,
+                    KEY idx_quiz_attempts_quiz (quiz_id),
+                    KEY idx_quiz_attempts_user (user_id, answered_at),
+                    FOREIGN KEY (user_id) REFERENCES users(id),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_difficulty (
+                    quiz_id INT PRIMARY KEY,
+                    difficulty DOUBLE NOT NULL,
+                    discrimination DOUBLE NOT NULL,
+                    attempts INT NOT NULL,
+                    calibrated_at DATETIME NOT NULL,
+                    KEY idx_quiz_difficulty_difficulty (difficulty),
+                    FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_ability (
+                    user_id INT PRIMARY KEY,
+                    ability DOUBLE NOT NULL,
+                    attempts INT NOT NULL,
+                    calibrated_at DATETIME NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            
             conn.commit()
     finally:
         conn.close()
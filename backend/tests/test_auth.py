@@ -38,6 +38,23 @@ def test_setup_admin(client, test_db):
     assert response.status_code == 400
     assert 'error' in response.json
 
+def test_setup_ignores_cached_status(client, test_db):
+    """Test that setup checks the database even when a cached status says no admin exists"""
+    assert client.get('/setup/status').json == {'needs_setup': True}
+    with test_db.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (name, email, password_hash, is_admin) VALUES (%s, %s, %s, %s)",
+            ("Admin", "admin@example.com", "hashed_password", True)
+        )
+        test_db.commit()
+
+    data = {'name': 'Second Admin', 'email': 'second@example.com', 'password': 'password123'}
+    response = client.post('/setup', json=data)
+    assert response.status_code == 400
+    with test_db.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) AS admins FROM users WHERE is_admin = TRUE")
+        assert cursor.fetchone()['admins'] == 1
+
 def test_register(client, test_db):
     """Test user registration"""
     # Test successful registration
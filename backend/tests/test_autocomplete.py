@@ -0,0 +1,68 @@
+import time
+from autocomplete import Autocomplete, PrefixIndex, SCAN_LIMIT
+
+THEMES = [(1, 'Python', 12), (2, 'PyTest', 3), (3, 'SQL', 7), (4, 'Python Internals', 0)]
+QUESTIONS = ['What is a list?', 'What is a  LIST?', 'What is a tuple?', 'Why use SQL?']
+
+def load():
+    return THEMES, QUESTIONS
+
+def test_theme_prefix_ranked_by_usage():
+    """Test that themes matching a prefix come back most used first"""
+    completions = Autocomplete(load)
+    assert completions.search('theme', 'py') == [('Python', 12, 1), ('PyTest', 3, 2), ('Python Internals', 0, 4)]
+    assert completions.search('theme', 'PYTH', limit=1) == [('Python', 12, 1)]
+    assert completions.search('theme', 'java') == []
+
+def test_questions_grouped_by_text():
+    """Test that questions differing only in case and spacing count as one"""
+    completions = Autocomplete(load)
+    assert completions.search('question', 'what is a') == [('What is a list?', 2, None), ('What is a tuple?', 1, None)]
+
+def test_writes_update_index():
+    """Test that added and removed quizzes change suggestions without a reload"""
+    completions = Autocomplete(load)
+    completions.search('theme', '')
+    completions.quiz_added('What is a tuple?', 3)
+    completions.quiz_added('What is a tuple?', 3)
+    completions.quiz_removed('Why use SQL?', 4)
+    assert completions.search('question', 'what')[0] == ('What is a tuple?', 3, None)
+    assert completions.search('question', 'why') == []
+    assert completions.search('theme', 's') == [('SQL', 9, 3)]
+    # Themes stay listed when their last quiz is removed
+    assert completions.search('theme', 'python i') == [('Python Internals', 0, 4)]
+
+def test_writes_during_rebuild_are_kept():
+    """Test that a quiz added while the index reloads is not lost when the load is swapped in"""
+    questions = list(QUESTIONS)
+    loads = []
+    def racing_load():
+        loads.append(1)
+        snapshot = THEMES, list(questions)
+        if len(loads) == 2:
+            # Another request commits a question after this load has read quizzes
+            questions.append('Where is Rome?')
+            completions.quiz_added('Where is Rome?')
+        return snapshot
+    completions = Autocomplete(racing_load, ttl=0)
+    completions.search('question', 'where')
+    assert completions.search('question', 'where') == [('Where is Rome?', 1, None)]
+    assert len(loads) == 3
+
+def test_wide_prefix_uses_usage_order():
+    """Test that a prefix matching many keys still returns the most used ones"""
+    index = PrefixIndex()
+    index.load([(f'question {n}', n, n) for n in range(SCAN_LIMIT * 4)])
+    top = index.search('q', limit=3)
+    assert [value for _, _, value in top] == [SCAN_LIMIT * 4 - 1, SCAN_LIMIT * 4 - 2, SCAN_LIMIT * 4 - 3]
+    assert [value for _, _, value in index.search('question 1', limit=2)] == [1023, 1022]
+
+def test_lookup_is_fast():
+    """Test that a lookup over 100k keys takes well under a millisecond"""
+    index = PrefixIndex()
+    index.load([(f'question number {n:06d}', n % 97, n) for n in range(100000)])
+    started = time.perf_counter()
+    for prefix in ('q', 'question number 0', 'question number 01234'):
+        for _ in range(100):
+            index.search(prefix)
+    assert (time.perf_counter() - started) / 300 < 0.001
@@ -0,0 +1,48 @@
+from change_feed import ChangeFeed
+
+class FakeQuizzes:
+    """A quizzes table reduced to rows ordered by change_seq"""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, quiz_id, deleted=False):
+        seq = len(self.rows) + 1
+        self.rows.append({'id': quiz_id, 'deleted_at': 'now' if deleted else None, 'change_seq': seq})
+        return seq
+
+    def current_seq(self):
+        return len(self.rows)
+
+    def load(self, after_seq, limit):
+        return [dict(row) for row in self.rows if row['change_seq'] > after_seq][:limit]
+
+def test_delivers_changes_from_other_processes():
+    """Test that rows written elsewhere are delivered in order and local ones are flagged"""
+    quizzes, applied = FakeQuizzes(), []
+    quizzes.write(1)
+    feed = ChangeFeed(quizzes.current_seq, quizzes.load, applied.extend, batch=2)
+    feed.start(background=False)
+
+    # The first poll only records where the feed starts
+    assert feed.poll() == 0
+    assert feed.last_seq == 1
+
+    quizzes.write(2)
+    feed.mark_local(quizzes.write(3))
+    quizzes.write(4)
+    quizzes.write(2, deleted=True)
+    assert feed.poll() == 4
+    assert [(row['id'], row['local']) for row in applied] == [(2, False), (3, True), (4, False), (2, False)]
+    assert applied[-1]['deleted_at'] is not None
+    assert feed.poll() == 0
+    assert feed.stats()['remote'] == 3
+
+def test_marks_ignored_until_started():
+    """Test that processes not following the feed (job workers) keep no local marks"""
+    quizzes = FakeQuizzes()
+    feed = ChangeFeed(quizzes.current_seq, quizzes.load, lambda rows: None)
+    feed.mark_local(quizzes.write(1))
+    assert not feed.following
+    feed.start(background=False)
+    assert feed.poll() == 0 and feed.last_seq == 1
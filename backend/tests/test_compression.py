@@ -0,0 +1,69 @@
+import gzip
+import pytest
+from flask import Flask, Response, jsonify
+from compression import init_compression, choose_encoding, compression_stats
+
+@pytest.fixture
+def compressed_app():
+    """Create a small app with compression enabled"""
+    app = Flask(__name__)
+    app.config.update({'COMPRESSION_ENABLED': True, 'COMPRESSION_MIN_SIZE': 100})
+    init_compression(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify([{'question_text': 'What is Python?'}] * 100)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' * 1000, mimetype='image/png')
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'data: {i}\n\n' for i in range(50)), mimetype='text/event-stream')
+
+    return app
+
+def test_compresses_large_json(compressed_app):
+    """Test that large JSON bodies are gzip-compressed when accepted"""
+    client = compressed_app.test_client()
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'What is Python?' in gzip.decompress(response.data)
+    assert compression_stats()['compressed'] > 0
+
+def test_skips_small_and_binary_responses(compressed_app):
+    """Test the size threshold and already-compressed content types"""
+    client = compressed_app.test_client()
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/image', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/big').headers
+
+def test_compresses_streamed_responses(compressed_app):
+    """Test that generator responses are compressed incrementally"""
+    client = compressed_app.test_client()
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode().count('data: ') == 50
+
+def test_disabled_by_default():
+    """Test that compression is opt-in"""
+    app = Flask(__name__)
+    init_compression(app)
+    app.route('/big')(lambda: 'x' * 5000)
+    response = app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_choose_encoding_respects_quality(compressed_app):
+    """Test Accept-Encoding negotiation"""
+    with compressed_app.test_request_context(headers={'Accept-Encoding': 'br;q=0.5, gzip'}):
+        from flask import request
+        assert choose_encoding(request.accept_encodings) == 'gzip'
+    with compressed_app.test_request_context(headers={'Accept-Encoding': 'identity'}):
+        from flask import request
+        assert choose_encoding(request.accept_encodings) is None
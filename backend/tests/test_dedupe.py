@@ -0,0 +1,65 @@
+import time
+import pytest
+from dedupe import DuplicateIndex, normalize_text, signature, similarity
+
+def make_index(rows=(), **kwargs):
+    calls = []
+    def load(after_seq):
+        calls.append(after_seq)
+        return [row for row in rows if row[4] > after_seq]
+    index = DuplicateIndex(load, refresh_interval=kwargs.pop('refresh_interval', 60), **kwargs)
+    return index, calls
+
+def test_normalize_text():
+    """Test that case, accents, punctuation and spacing are ignored"""
+    assert normalize_text("  Qu'est-ce   que  PARÍS? ") == 'qu est ce que paris'
+    assert signature('What is the capital of France?') == signature('what is the  capital of france')
+
+def test_similarity_separates_near_and_different_questions():
+    """Test signature similarity for a typo versus a different question"""
+    original = signature('What is the capital of France?')
+    assert similarity(original, signature('What is the capitol of France?')) >= 0.7
+    assert similarity(original, signature('Name three sorting algorithms')) < 0.3
+
+def test_find_within_user_or_theme():
+    """Test that duplicates are only reported for the same user or theme"""
+    sig = signature('What is the capital of France?')
+    rows = [(1, 10, None, False, 1, sig), (2, 20, 5, False, 2, sig), (3, 30, 6, False, 3, sig)]
+    index, _ = make_index(rows)
+    probe = signature('What is the capital of France')
+    assert [quiz_id for quiz_id, _ in index.find(probe, user_id=10)] == [1]
+    assert [quiz_id for quiz_id, _ in index.find(probe, user_id=99, theme_id=5)] == [2]
+    assert index.find(probe, user_id=99, theme_id=7) == []
+    assert index.find(signature('Explain recursion'), user_id=10) == []
+
+def test_refresh_follows_change_feed():
+    """Test that refreshes apply rows after the last seen change_seq, including deletions"""
+    sig = signature('What does HTTP stand for?')
+    rows = [(1, 10, None, False, 1, sig)]
+    index, calls = make_index(rows, refresh_interval=0)
+    assert index.find(sig, user_id=10)[0][0] == 1
+    rows.append((1, 10, None, True, 2, sig))
+    assert index.find(sig, user_id=10) == []
+    assert calls == [0, 1]
+    index.add(4, 10, None, sig)
+    assert index.find(sig, user_id=10) == [(4, 1.0)]
+
+def test_off_mode():
+    """Test that a disabled index never loads or reports anything"""
+    index, calls = make_index([], mode='off')
+    index.add(1, 10, None, signature('Anything'))
+    assert index.find(signature('Anything'), user_id=10) == []
+    assert calls == []
+    with pytest.raises(ValueError):
+        DuplicateIndex(lambda after_seq: [], mode='maybe')
+
+def test_check_cost_is_constant():
+    """Test that a check stays fast with many indexed questions"""
+    rows = [(n, n % 50, None, False, n, signature(f'Question number {n} about topic {n * 7919 % 1000}'))
+            for n in range(1, 5001)]
+    index, _ = make_index(rows)
+    index.find(signature('warm up'), user_id=1)
+    started = time.perf_counter()
+    for n in range(100):
+        index.find(signature(f'Another question {n}'), user_id=n % 50)
+    assert (time.perf_counter() - started) / 100 < 0.005
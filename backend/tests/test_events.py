@@ -0,0 +1,64 @@
+import pytest
+import events
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Install a fresh in-memory broker with a small replay buffer"""
+    broker = events.MemoryBroker(size=3)
+    monkeypatch.setattr(events, '_broker', broker)
+    return broker
+
+def test_broker_resume(broker):
+    """Test replaying events after a Last-Event-ID and detecting gaps"""
+    for i in range(1, 5):
+        assert events.publish('quiz.created', {'id': i}, theme_id=1) == i
+    assert [event.id for event in broker.events_after(2)] == [3, 4]
+    assert broker.events_after(4) == []
+    # Event 1 has left the buffer, so resuming from 0 is not possible
+    assert broker.events_after(0) is None
+    assert broker.wait(4, timeout=0.01) == []
+
+def test_stream_filters_and_resets(broker):
+    """Test that a stream sends matching events and a reset when it cannot resume"""
+    events.publish('quiz.created', {'id': 1}, theme_id=1, user_id=1)
+    events.publish('quiz.created', {'id': 2}, theme_id=2, user_id=1)
+
+    stream = events.stream(0, theme_id=2)
+    assert next(stream).startswith('retry:')
+    assert next(stream) == 'id: 2\nevent: quiz.created\ndata: {"id": 2}\n\n'
+
+    for i in range(3, 7):
+        events.publish('quiz.created', {'id': i}, theme_id=1)
+    stream = events.stream(1)
+    next(stream)
+    assert next(stream) == 'id: 6\nevent: reset\ndata: {}\n\n'
+
+def test_ids_are_change_sequence_numbers(broker):
+    """Test publishing with given ids, gaps included, and an id from another process"""
+    broker.start_at(10)
+    assert events.publish('quiz.created', {'id': 1}, event_id=12) == 12
+    assert events.publish('quiz.deleted', {'id': 1}, event_id=15) == 15
+    assert [event.id for event in broker.events_after(10)] == [12, 15]
+    # Ids from before this broker started are not buffered
+    assert broker.events_after(9) is None
+    # A client ahead of this broker waits instead of being reset
+    assert broker.events_after(20) == []
+    assert broker.wait(20, timeout=0.01) == []
+
+def test_stream_replays_from_storage(broker):
+    """Test that a client resuming from before the buffer gets stored events, then buffered ones"""
+    broker.start_at(5)
+    events.publish('quiz.created', {'id': 7}, theme_id=1, event_id=7)
+    stored = {3: events.Event(3, 'quiz.created', 1, 1, {'id': 3}),
+              5: events.Event(5, 'quiz.deleted', 1, 1, {'id': 2})}
+    calls = []
+    def replay(last_id, limit):
+        calls.append(last_id)
+        return [event for event_id, event in sorted(stored.items()) if event_id > last_id][:1]
+
+    stream = events.stream(2, replay=replay)
+    next(stream)
+    assert next(stream).startswith('id: 3\nevent: quiz.created')
+    assert next(stream).startswith('id: 5\nevent: quiz.deleted')
+    assert next(stream).startswith('id: 7\nevent: quiz.created')
+    assert calls == [2, 3]
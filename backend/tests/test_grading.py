@@ -0,0 +1,51 @@
+import time
+from grading import AnswerKey, bounded_distance, grade, normalize_answer
+
+def test_normalize_answer():
+    """Test that case, accents, punctuation and spacing are ignored"""
+    assert normalize_answer('  São   Paulo! ') == 'sao paulo'
+    assert normalize_answer('Île-de-France') == 'ile de france'
+
+def test_bounded_distance():
+    """Test edit distances, transpositions and the early exit above the limit"""
+    assert bounded_distance('paris', 'paris', 2) == 0
+    assert bounded_distance('paris', 'pairs', 2) == 1
+    assert bounded_distance('paris', 'parris', 2) == 1
+    assert bounded_distance('kitten', 'sitting', 3) == 3
+    assert bounded_distance('kitten', 'sitting', 2) == 3
+    assert bounded_distance('paris', 'london', 1) == 2
+
+def test_text_answers_with_alternates_and_typos():
+    """Test grading text quizzes against "|" alternates with the default tolerance"""
+    assert grade('text', 'Paris|paris, France', 'PARIS') == (True, 0)
+    assert grade('text', 'Paris|paris, France', 'Paris France') == (True, 0)
+    assert grade('text', 'Paris|paris, France', 'Pairs') == (True, 1)
+    assert grade('text', 'Paris|paris, France', 'Lyon') == (False, None)
+    # Short answers must be exact
+    assert grade('text', 'Cat', 'Car') == (False, None)
+    assert grade('text', 'Photosynthesis', 'Fotosynthesis') == (True, 2)
+
+def test_quiz_tolerance():
+    """Test that a quiz's own tolerance replaces the default"""
+    assert grade('text', 'Photosynthesis', 'Photosynthesys', tolerance=0) == (False, None)
+    assert grade('text', 'Cat', 'Car', tolerance=1) == (True, 1)
+
+def test_choice_answers():
+    """Test multiple choice and true/false grading"""
+    answer = '{"options": ["Red", "Blue", "Green"], "correct": ["Blue", "Green"]}'
+    assert grade('multiple_choice', answer, 'blue')[0]
+    assert grade('multiple_choice', answer, ['Green', 'Blue'])[0]
+    assert not grade('multiple_choice', answer, ['Blue'])[0]
+    assert not grade('multiple_choice', {'options': ['A']}, 'None')[0]
+    assert grade('true_false', 'True', ' yes ')[0]
+    assert not grade('true_false', 'False', 'true')[0]
+    assert not grade('text', 'Paris', None)[0]
+
+def test_batch_grading_speed():
+    """Test that thousands of answers grade in milliseconds"""
+    key = AnswerKey('Mitochondria|the mitochondria')
+    answers = ['mitochondria', 'Mitocondria', 'the mitochondira', 'ribosome', 'Mitochondria!'] * 1000
+    started = time.perf_counter()
+    results = [key.distance(normalize_answer(answer)) for answer in answers]
+    assert time.perf_counter() - started < 0.5
+    assert results[:5] == [0, 1, 1, None, 0]
@@ -0,0 +1,72 @@
+import threading
+import pytest
+from group_commit import GroupCommitter
+
+class RecordingConnection:
+    """Stand-in connection recording the statements and commits it receives"""
+    commits = []
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def commit(self):
+        RecordingConnection.commits.append(self.statements)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_group_commit_batches_writes():
+    """Test that concurrent writes share a commit and errors stay per caller"""
+    RecordingConnection.commits = []
+    writer = GroupCommitter(RecordingConnection, max_batch=8, max_wait_ms=200)
+
+    def work(n):
+        def write(cursor):
+            if n == 3:
+                raise ValueError('bad row')
+            cursor.execute(f"INSERT {n}")
+            return n
+        return write
+
+    futures = [writer.submit(work(n)) for n in range(5)]
+    with pytest.raises(ValueError):
+        futures[3].result(timeout=5)
+    assert [futures[n].result() for n in (0, 1, 2, 4)] == [0, 1, 2, 4]
+
+    assert len(RecordingConnection.commits) == 1
+    assert 'ROLLBACK TO SAVEPOINT write_3' in RecordingConnection.commits[0]
+    stats = writer.stats()
+    assert stats['batches'] == 1 and stats['writes'] == 5
+
+def test_group_commit_respects_max_batch():
+    """Test that a burst is split into batches of at most max_batch writes"""
+    RecordingConnection.commits = []
+    writer = GroupCommitter(RecordingConnection, max_batch=2, max_wait_ms=200)
+    barrier = threading.Barrier(5)
+
+    def submit():
+        barrier.wait()
+        writer.run(lambda cursor: cursor.execute("INSERT"))
+
+    threads = [threading.Thread(target=submit) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert writer.stats()['writes'] == 5
+    assert writer.stats()['max_batch_size'] == 2
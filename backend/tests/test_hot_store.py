@@ -0,0 +1,27 @@
+from hot_store import HotQuizStore
+
+def test_admission_after_repeated_reads():
+    """Test that only quizzes read admit_after times are stored"""
+    store = HotQuizStore(admit_after=2)
+    assert store.get(1) is None
+    assert not store.wants(1)
+    assert store.get(1) is None
+    assert store.wants(1)
+    store.put(1, b'{"id":1}\n')
+    record = store.get(1)
+    assert record.encoded == b'{"id":1}\n'
+    store.discard(1)
+    assert store.get(1) is None
+
+def test_size_cap_evicts_least_recent():
+    """Test that the byte budget holds by evicting the least recently read quiz"""
+    store = HotQuizStore(admit_after=0)
+    store.put(1, b'x' * 100)
+    store.max_bytes = store.stats()['bytes'] * 2
+    store.put(2, b'x' * 100)
+    store.get(1)
+    store.put(3, b'x' * 100)
+    assert store.get(2) is None
+    assert store.get(1) is not None and store.get(3) is not None
+    stats = store.stats()
+    assert stats['bytes'] <= stats['max_bytes'] and stats['evictions'] == 1
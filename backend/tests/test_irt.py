@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import irt
+
+def simulate(n_users, n_items, n_attempts, seed=0):
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(0, 1, n_users)
+    difficulty = rng.normal(0, 1, n_items)
+    discrimination = rng.uniform(0.5, 2.0, n_items)
+    users = rng.integers(0, n_users, n_attempts)
+    items = rng.integers(0, n_items, n_attempts)
+    p = 1 / (1 + np.exp(-discrimination[items] * (ability[users] - difficulty[items])))
+    correct = (rng.random(n_attempts) < p).astype(np.int8)
+    return users, items, correct, ability, difficulty, discrimination
+
+def test_recovers_simulated_parameters():
+    """Test that the 2PL fit recovers the parameters attempts were drawn from"""
+    users, items, correct, ability, difficulty, discrimination = simulate(2000, 200, 200000)
+    result = irt.fit(users, items, correct, model='2pl')
+    assert np.corrcoef(difficulty, result['difficulty'])[0, 1] > 0.95
+    assert np.corrcoef(discrimination, result['discrimination'])[0, 1] > 0.8
+    assert np.corrcoef(ability, result['ability'])[0, 1] > 0.9
+    assert result['item_attempts'].sum() == 200000
+
+def test_rasch_orders_items_by_success_rate():
+    """Test that with 1PL a quiz everyone fails is harder than one everyone passes"""
+    users = [0, 1, 2, 0, 1, 2, 0, 1, 2]
+    items = [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    correct = [1, 1, 1, 1, 0, 1, 0, 0, 0]
+    result = irt.fit(users, items, correct, model='1pl')
+    assert result['difficulty'][0] < result['difficulty'][1] < result['difficulty'][2]
+    assert np.all(np.isfinite(result['difficulty']))
+    assert np.allclose(result['discrimination'], 1.0)
+
+def test_index_ids():
+    """Test mapping sparse ids to dense indexes"""
+    unique, index = irt.index_ids(np.array([42, 7, 42, 1000]))
+    assert unique.tolist() == [7, 42, 1000]
+    assert index.tolist() == [1, 0, 1, 2]
+
+def test_invalid_model():
+    """Test that unknown models are rejected"""
+    with pytest.raises(ValueError):
+        irt.fit([0], [0], [1], model='3pl')
+
+def test_one_million_attempts():
+    """Test that a million attempts over sparse users and items fit to finite parameters"""
+    users, items, correct, *_ = simulate(50000, 5000, 1000000, seed=1)
+    result = irt.fit(users, items, correct, model='2pl', iterations=5)
+    assert result['iterations'] <= 5
+    assert result['user_attempts'].sum() == result['item_attempts'].sum() == 1000000
+    assert np.all(np.isfinite(result['ability'])) and np.all(np.isfinite(result['difficulty']))
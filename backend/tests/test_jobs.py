@@ -0,0 +1,165 @@
+import pytest
+import jobs
+from app import get_db
+
+def test_backoff_delay():
+    """Test that retry delays grow exponentially up to the cap"""
+    assert jobs.JOB_BACKOFF_BASE / 2 <= jobs.backoff_delay(1) <= jobs.JOB_BACKOFF_BASE
+    assert jobs.backoff_delay(3) > jobs.JOB_BACKOFF_BASE
+    assert jobs.backoff_delay(50) <= jobs.JOB_BACKOFF_MAX
+
+def test_import_quizzes_job(client, test_db, test_user):
+    """Test queueing a bulk import, running it in a worker and reading the result"""
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.post('/jobs', json={
+        'type': 'import_quizzes',
+        'payload': {'quizzes': [
+            {'quiz_type': 'text', 'question_text': 'Imported', 'answer_text': 'Yes', 'theme_id': None},
+            {'quiz_type': 'essay', 'question_text': 'Bad', 'answer_text': 'No', 'theme_id': None},
+        ]}
+    }, headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    assert response.get_json()['status'] == jobs.QUEUED
+
+    db = get_db()
+    try:
+        job = jobs.claim_job(db, 'test-worker')
+        assert job['id'] == job_id
+        assert jobs.run_job(db, job, 'test-worker')
+    finally:
+        db.close()
+
+    job = client.get(f'/jobs/{job_id}', headers=headers).get_json()
+    assert job['status'] == jobs.SUCCEEDED
+    assert job['result']['imported'] == 1
+    assert job['result']['errors'] == [{'index': 1, 'error': 'Invalid quiz type'}]
+
+    response = client.post('/jobs', json={'type': 'unknown'}, headers=headers)
+    assert response.status_code == 400
+
+def test_imports_reach_other_processes(client, test_db, test_user, test_theme, monkeypatch, tmp_path):
+    """Test that an API process follows quizzes imported by a worker through the change feed"""
+    import app as app_module
+    import snapshots
+    from change_feed import ChangeFeed
+    delivered = []
+    def apply(rows):
+        delivered.extend(rows)
+        app_module.apply_quiz_changes(rows)
+    # Stands in for another API process; writes in this one are not local to it
+    api_feed = ChangeFeed(app_module.current_change_seq, app_module.load_quiz_changes, apply)
+    api_feed.start(background=False)
+    api_feed.poll()
+    monkeypatch.setattr(snapshots, 'SNAPSHOTS_ENABLED', True)
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path))
+
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.post('/jobs', json={'type': 'import_quizzes', 'payload': {'quizzes': [
+        {'quiz_type': 'text', 'question_text': 'Imported elsewhere', 'answer_text': 'Yes',
+         'theme_id': test_theme['id'], 'tags': ['bulk']},
+    ]}}, headers=headers)
+    db = get_db()
+    try:
+        job = jobs.claim_job(db, 'test-worker')
+        assert job['id'] == response.get_json()['id']
+        assert jobs.run_job(db, job, 'test-worker')
+    finally:
+        db.close()
+    generation = snapshots._generations.get(test_theme['id'], 0)
+
+    assert api_feed.poll() == 1
+    assert delivered[0]['question_text'] == 'Imported elsewhere'
+    assert delivered[0]['tags'] == ['bulk'] and not delivered[0]['local']
+    # The theme's snapshot was invalidated again, this time by the feed
+    assert snapshots._generations[test_theme['id']] == generation + 1
+    data = client.get('/quizzes?tags=bulk', headers=headers).get_json()
+    assert [quiz['id'] for quiz in data['quizzes']] == [delivered[0]['id']]
+
+def test_calibrate_difficulty_job(client, test_db, test_admin, test_theme):
+    """Test calibrating quiz difficulty from recorded attempts and sorting a theme by it"""
+    headers = {'x-api-key': test_admin['api_key']}
+    quiz_ids = []
+    for question in ('Easy', 'Hard'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': f'{question} question',
+            'answer_text': 'Answer',
+            'theme_id': test_theme['id']
+        }, headers=headers)
+        quiz_ids.append(response.get_json()['id'])
+    easy, hard = quiz_ids
+
+    response = client.post('/quizzes/grade', json={'record': True, 'answers': [
+        {'quiz_id': easy, 'answer': 'answer'},
+        {'quiz_id': easy, 'answer': 'Answer'},
+        {'quiz_id': hard, 'answer': 'wrong'},
+        {'quiz_id': hard, 'answer': 'answer'},
+        {'quiz_id': hard, 'answer': 'nope'},
+    ]}, headers=headers)
+    assert response.status_code == 200
+
+    response = client.post('/jobs', json={'type': 'calibrate_difficulty', 'payload': {'model': '1pl'}},
+                           headers=headers)
+    assert response.status_code == 202
+    db = get_db()
+    try:
+        job = jobs.claim_job(db, 'test-worker')
+        assert jobs.run_job(db, job, 'test-worker')
+    finally:
+        db.close()
+    result = client.get(f"/jobs/{response.get_json()['id']}", headers=headers).get_json()['result']
+    assert result['attempts'] == 5 and result['quizzes'] == 2
+
+    response = client.get(f"/themes/{test_theme['id']}/quiz?sort=-difficulty", headers=headers)
+    quizzes = response.get_json()
+    assert [quiz['id'] for quiz in quizzes] == [hard, easy]
+    assert quizzes[0]['difficulty'] > quizzes[1]['difficulty']
+    assert client.get(f"/themes/{test_theme['id']}/quiz?sort=name", headers=headers).status_code == 400
+
+def test_build_recommendations_job(client, test_db, test_user, test_admin, test_theme, tmp_path, monkeypatch):
+    """Test building co-occurrence tables from attempts and creations, then recommending from them"""
+    import app as app_module
+    import recommender
+    monkeypatch.setattr(app_module, 'recommendations', recommender.Recommendations(str(tmp_path), check_interval=0))
+    admin_headers = {'x-api-key': test_admin['api_key']}
+    user_headers = {'x-api-key': test_user['api_key']}
+    quiz_ids = []
+    for question in ('First', 'Second', 'Third'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': f'{question} recommended question',
+            'answer_text': 'Answer',
+            'theme_id': test_theme['id']
+        }, headers=admin_headers)
+        quiz_ids.append(response.get_json()['id'])
+    response = client.post('/quizzes/grade', json={'record': True, 'answers': [
+        {'quiz_id': quiz_ids[0], 'answer': 'answer'},
+        {'quiz_id': quiz_ids[1], 'answer': 'wrong'},
+    ]}, headers=user_headers)
+    assert response.status_code == 200
+
+    # Nothing is built yet
+    response = client.get('/me/recommendations', headers=user_headers)
+    assert response.get_json() == {'themes': [], 'quizzes': [], 'version': None}
+
+    response = client.post('/jobs', json={'type': 'build_recommendations'}, headers=admin_headers)
+    assert response.status_code == 202
+    db = get_db()
+    try:
+        job = jobs.claim_job(db, 'test-worker')
+        assert job['job_type'] == 'build_recommendations'
+        assert jobs.run_job(db, job, 'test-worker')
+    finally:
+        db.close()
+    result = client.get(f"/jobs/{response.get_json()['id']}", headers=admin_headers).get_json()['result']
+    assert result['interactions'] == 5 and result['quizzes'] == 3
+
+    # The admin created all three quizzes, so the user's two lead to the third
+    response = client.get('/me/recommendations', headers=user_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [quiz['id'] for quiz in body['quizzes']] == [quiz_ids[2]]
+    assert body['quizzes'][0]['score'] > 0
+    assert body['version'] == result['version']
+    assert client.get('/me/recommendations?limit=0', headers=user_headers).status_code == 400
@@ -0,0 +1,60 @@
+import datetime
+import decimal
+import json
+import pytest
+from flask import Flask
+from werkzeug.http import http_date as werkzeug_http_date
+import json_provider
+from json_provider import FastJSONProvider, JSONFragment, http_date
+
+ROW = {
+    'id': 1,
+    'question_text': 'Où est Paris?',
+    'answer_text': JSONFragment('{"options":["A","B"],"correct":["A"]}'),
+    'score': decimal.Decimal('1.50'),
+    'created_at': datetime.datetime(2024, 3, 5, 14, 7, 9),
+}
+
+EXPECTED = {
+    'id': 1,
+    'question_text': 'Où est Paris?',
+    'answer_text': {'options': ['A', 'B'], 'correct': ['A']},
+    'score': '1.50',
+    'created_at': 'Tue, 05 Mar 2024 14:07:09 GMT',
+}
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def json_app(request, monkeypatch):
+    """Create an app using the fast provider, with and without orjson"""
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+        monkeypatch.setattr(json_provider, '_Fragment', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson not installed')
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+def test_response_encodes_rows(json_app):
+    """Test that both encoder paths produce the same document"""
+    with json_app.app_context():
+        response = json_app.json.response([ROW])
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == [EXPECTED]
+
+def test_dumps_and_loads_round_trip(json_app):
+    """Test dumps/loads used by request.get_json and jsonify"""
+    with json_app.app_context():
+        text = json_app.json.dumps(ROW)
+        assert json_app.json.loads(text) == EXPECTED
+        assert json.loads(json_app.json.dumpb(ROW)) == EXPECTED
+
+def test_http_date_matches_werkzeug():
+    """Test the cached date formatter against Werkzeug's"""
+    values = [
+        datetime.datetime(2024, 12, 31, 23, 59, 59),
+        datetime.datetime(2024, 1, 1, 0, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+        datetime.date(2023, 7, 4),
+    ]
+    for value in values:
+        assert http_date(value) == werkzeug_http_date(value)
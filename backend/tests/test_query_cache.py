@@ -0,0 +1,50 @@
+from query_cache import QueryCache
+
+class CountingLoader:
+    """Loader returning fixed rows and counting how often the database is hit"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(row) for row in self.rows]
+
+def test_cache_hits_and_invalidation():
+    """Test read-through caching, copies on hit and table tag invalidation"""
+    cache = QueryCache(max_entries=10)
+    load = CountingLoader([{'id': 1, 'name': 'Science'}])
+
+    assert cache.get_or_load("SELECT id, name FROM themes", (), ('themes',), load) == load.rows
+    rows = cache.get_or_load("SELECT  id, name\n FROM themes", (), ('themes',), load)
+    assert load.calls == 1
+    rows[0]['name'] = 'changed'
+    assert cache.get_or_load("SELECT id, name FROM themes", (), ('themes',), load)[0]['name'] == 'Science'
+
+    cache.invalidate('quizzes')
+    cache.get_or_load("SELECT id, name FROM themes", (), ('themes',), load)
+    assert load.calls == 1
+    cache.invalidate('themes')
+    cache.get_or_load("SELECT id, name FROM themes", (), ('themes',), load)
+    assert load.calls == 2
+    assert cache.stats()['stale'] == 1
+
+def test_cache_lru_eviction():
+    """Test that the least recently used entry is evicted first"""
+    cache = QueryCache(max_entries=2)
+    load = CountingLoader([{'id': 1}])
+    for quiz_id in (1, 2, 1, 3):
+        cache.get_or_load("SELECT id FROM quizzes WHERE id = %s", (quiz_id,), ('quizzes',), load)
+    assert load.calls == 3
+    cache.get_or_load("SELECT id FROM quizzes WHERE id = %s", (1,), ('quizzes',), load)
+    assert load.calls == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_disabled_cache_passes_through():
+    """Test that a disabled cache always loads"""
+    cache = QueryCache(enabled=False)
+    load = CountingLoader([])
+    cache.get_or_load("SELECT 1", (), (), load)
+    cache.get_or_load("SELECT 1", (), (), load)
+    assert load.calls == 2
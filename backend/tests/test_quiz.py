@@ -1,5 +1,6 @@
 import pytest
 import json
+from app import load_quiz_changes, quiz_event
 
 def test_create_quiz(client, test_db, test_user):
     """Test creating a new quiz"""
@@ -136,4 +137,252 @@ def test_get_themes(client, test_user):
     response = client.get('/themes')
     assert response.status_code == 200
     data = response.get_json()
-    assert isinstance(data, list)  # Themes are returned as an array 
\ No newline at end of file
+    assert isinstance(data, list)  # Themes are returned as an array 
+
+def test_get_quizzes_by_ids(client, test_db, test_user):
+    """Test fetching several quizzes in one request"""
+    headers = {'x-api-key': test_user['api_key']}
+    quiz_ids = []
+    for question in ('First Question', 'Second Question'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'multiple_choice',
+            'question_text': question,
+            'answer_text': {'options': ['A', 'B'], 'correct': ['A']},
+            'theme_id': None
+        }, headers=headers)
+        assert response.status_code == 201
+        quiz_ids.append(response.get_json()['id'])
+
+    # Requested order is kept and unknown ids are reported
+    ids = f'{quiz_ids[1]},999,{quiz_ids[0]}'
+    response = client.get(f'/quizzes?ids={ids}', headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [quiz['id'] for quiz in data['quizzes']] == [quiz_ids[1], quiz_ids[0]]
+    assert data['quizzes'][0]['answer_text'] == {'options': ['A', 'B'], 'correct': ['A']}
+    assert data['missing'] == [999]
+
+    # Invalid ids are rejected
+    response = client.get('/quizzes?ids=1,abc', headers=headers)
+    assert response.status_code == 400
+
+def test_quiz_fields(client, test_db, test_user):
+    """Test sparse fieldsets on quiz endpoints"""
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.post('/quizzes', json={
+        'quiz_type': 'multiple_choice',
+        'question_text': 'Fields Question',
+        'answer_text': {'options': ['A', 'B'], 'correct': ['B']},
+        'theme_id': None
+    }, headers=headers)
+    assert response.status_code == 201
+    quiz_id = response.get_json()['id']
+
+    # List views default to a summary without answer bodies
+    response = client.get('/quizzes', headers=headers)
+    assert response.status_code == 200
+    quiz = response.get_json()[0]
+    assert quiz['question_text'] == 'Fields Question'
+    assert 'answer_text' not in quiz
+
+    # Answers are decoded even when quiz_type is not requested
+    response = client.get(f'/quizzes/{quiz_id}?fields=answer_text', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {'id': quiz_id, 'answer_text': {'options': ['A', 'B'], 'correct': ['B']}}
+
+    # Full bodies on request
+    response = client.get('/quizzes?fields=all', headers=headers)
+    assert response.get_json()[0]['answer_text'] == {'options': ['A', 'B'], 'correct': ['B']}
+
+    # Fields outside the allow-list are rejected
+    response = client.get('/quizzes?fields=password_hash', headers=headers)
+    assert response.status_code == 400
+
+def test_quiz_structure_expand(client, test_db, test_user):
+    """Test storing a structured payload and loading it with ?expand=structure"""
+    headers = {'x-api-key': test_user['api_key']}
+    structure = {'hints': ['It is a builtin'], 'code_example': 'len([1, 2, 3])'}
+    response = client.post('/quizzes', json={
+        'quiz_type': 'text',
+        'question_text': 'What does len() return?',
+        'answer_text': 'The number of items',
+        'theme_id': None,
+        'structure': structure
+    }, headers=headers)
+    assert response.status_code == 201
+    quiz_id = response.get_json()['id']
+
+    # Not loaded unless asked for
+    response = client.get(f'/quizzes/{quiz_id}', headers=headers)
+    assert 'structure' not in response.get_json()
+
+    response = client.get(f'/quizzes/{quiz_id}?expand=structure', headers=headers)
+    assert response.get_json()['structure'] == structure
+
+    # Lists batch-load the payloads
+    response = client.get('/quiz/mine?expand=structure', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()[0]['structure'] == structure
+
+    response = client.get('/quizzes?expand=answers', headers=headers)
+    assert response.status_code == 400
+
+def test_sync_and_delete(client, test_db, test_user):
+    """Test incremental sync with tombstones for deleted quizzes"""
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.get('/sync', headers=headers)
+    assert response.status_code == 200
+    since = response.get_json()['next']
+
+    quiz_ids = []
+    for question in ('Sync One', 'Sync Two'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': question,
+            'answer_text': 'Answer',
+            'theme_id': None
+        }, headers=headers)
+        quiz_ids.append(response.get_json()['id'])
+
+    response = client.get(f'/sync?since={since}&limit=1', headers=headers)
+    page = response.get_json()
+    assert [quiz['id'] for quiz in page['changed']] == quiz_ids[:1]
+    assert page['has_more']
+    page = client.get(f"/sync?since={page['next']}", headers=headers).get_json()
+    assert [quiz['id'] for quiz in page['changed']] == quiz_ids[1:]
+    assert not page['has_more']
+    since = page['next']
+
+    response = client.delete(f'/quizzes/{quiz_ids[0]}', headers=headers)
+    assert response.status_code == 200
+    assert client.get(f'/quizzes/{quiz_ids[0]}', headers=headers).status_code == 404
+
+    page = client.get(f'/sync?since={since}', headers=headers).get_json()
+    assert page['changed'] == []
+    assert page['deleted'] == [quiz_ids[0]]
+    assert page['next'] > since
+
+def test_create_quiz_idempotency_key(client, test_db, test_user):
+    """Test that retrying POST /quizzes with the same Idempotency-Key creates one quiz"""
+    headers = {'x-api-key': test_user['api_key'], 'Idempotency-Key': 'retry-1'}
+    quiz_data = {
+        'quiz_type': 'text',
+        'question_text': 'Retried Question',
+        'answer_text': 'Answer',
+        'theme_id': None
+    }
+    first = client.post('/quizzes', json=quiz_data, headers=headers)
+    assert first.status_code == 201
+    retry = client.post('/quizzes', json=quiz_data, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+
+    response = client.get('/quizzes', headers={'x-api-key': test_user['api_key']})
+    assert [quiz['question_text'] for quiz in response.get_json()].count('Retried Question') == 1
+
+    quiz_data['question_text'] = 'Different Question'
+    response = client.post('/quizzes', json=quiz_data, headers=headers)
+    assert response.status_code == 422
+
+def test_quiz_tag_filter(client, test_db, test_user):
+    """Test creating tagged quizzes and filtering them with tag algebra"""
+    headers = {'x-api-key': test_user['api_key']}
+    quiz_ids = {}
+    for question, tags in (('Loops', ['Python', 'loops']), ('Basics', ['python', 'loops', 'beginner'])):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': question,
+            'answer_text': 'Answer',
+            'theme_id': None,
+            'tags': tags
+        }, headers=headers)
+        assert response.status_code == 201
+        quiz_ids[question] = response.get_json()['id']
+
+    data = client.get('/quizzes?tags=python,loops&not=beginner', headers=headers).get_json()
+    assert [quiz['id'] for quiz in data['quizzes']] == [quiz_ids['Loops']]
+    assert data['total'] == 1
+
+    since = client.get('/sync', headers=headers).get_json()['next']
+    response = client.put(f"/quizzes/{quiz_ids['Basics']}/tags", json={'tags': ['python']}, headers=headers)
+    assert response.status_code == 200
+    data = client.get('/quizzes?tags=python&not=beginner', headers=headers).get_json()
+    assert sorted(quiz['id'] for quiz in data['quizzes']) == sorted(quiz_ids.values())
+
+    # The edit takes a change_seq, so syncing clients and other processes see it as an update
+    page = client.get(f'/sync?since={since}', headers=headers).get_json()
+    assert [quiz['id'] for quiz in page['changed']] == [quiz_ids['Basics']]
+    [change] = load_quiz_changes(since, 10)
+    assert not change['created'] and change['tags'] == ['python']
+    assert quiz_event(change).type == 'quiz.updated'
+
+def test_autocomplete(client, test_db, test_user):
+    """Test question and theme suggestions for a typed prefix"""
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.post('/quizzes', json={
+        'quiz_type': 'text',
+        'question_text': 'Autocomplete Me Please',
+        'answer_text': 'Answer',
+        'theme_id': None
+    }, headers=headers)
+    assert response.status_code == 201
+
+    response = client.get('/autocomplete?kind=question&prefix=autocomplete%20me', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()[0] == {'question_text': 'Autocomplete Me Please', 'quizzes': 1}
+
+    response = client.get('/autocomplete?kind=theme&prefix=', headers=headers)
+    assert response.status_code == 200
+    assert all({'id', 'name', 'quizzes'} <= set(theme) for theme in response.get_json())
+
+    assert client.get('/autocomplete?kind=answer', headers=headers).status_code == 400
+
+def test_create_quiz_flags_near_duplicate(client, test_db, test_user):
+    """Test that a near-duplicate of the user's own question is reported"""
+    headers = {'x-api-key': test_user['api_key']}
+    quiz_data = {
+        'quiz_type': 'text',
+        'question_text': 'Which river flows through the city of Vienna?',
+        'answer_text': 'Danube',
+        'theme_id': None
+    }
+    first = client.post('/quizzes', json=quiz_data, headers=headers)
+    assert first.status_code == 201
+
+    quiz_data['question_text'] = 'Which river flows through the city of Vienna'
+    second = client.post('/quizzes', json=quiz_data, headers=headers)
+    assert second.status_code == 201
+    assert first.get_json()['id'] in [match['id'] for match in second.get_json()['duplicates']]
+
+def test_grade_answers(client, test_db, test_user):
+    """Test batch grading of text answers with alternates and typos"""
+    headers = {'x-api-key': test_user['api_key']}
+    response = client.post('/quizzes', json={
+        'quiz_type': 'text',
+        'question_text': 'What is the capital of France?',
+        'answer_text': 'Paris|paris, France',
+        'answer_tolerance': 1,
+        'theme_id': None
+    }, headers=headers)
+    quiz_id = response.get_json()['id']
+
+    response = client.post('/quizzes/grade', json={'answers': [
+        {'quiz_id': quiz_id, 'answer': ' PARÍS '},
+        {'quiz_id': quiz_id, 'answer': 'Pairs'},
+        {'quiz_id': quiz_id, 'answer': 'Lyon'},
+        {'quiz_id': 999999, 'answer': 'Paris'},
+    ]}, headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [result['correct'] for result in data['results']] == [True, True, False]
+    assert data['unknown_quiz_ids'] == [999999]
+
+    response = client.post('/quizzes', json={
+        'quiz_type': 'text',
+        'question_text': 'Too tolerant',
+        'answer_text': 'Answer',
+        'answer_tolerance': 9,
+        'theme_id': None
+    }, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,88 @@
+import pytest
+from flask import Flask
+import rate_limit
+
+@pytest.mark.parametrize('make_store', [
+    lambda tmp_path: rate_limit.MemoryStore(),
+    lambda tmp_path: rate_limit.SharedStore(str(tmp_path / 'buckets'), slots=64),
+])
+def test_token_bucket(tmp_path, make_store):
+    """Test bursting to capacity, refilling and the wait reported when empty"""
+    store = make_store(tmp_path)
+    assert all(store.take('k:a', 1, 5, 1.0, 100.0)[0] for _ in range(5))
+    allowed, retry_after = store.take('k:a', 1, 5, 1.0, 100.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    # Other clients have their own bucket
+    assert store.take('k:b', 1, 5, 1.0, 100.0)[0]
+    assert store.take('k:a', 2, 5, 1.0, 102.0)[0]
+
+def test_shared_store_is_shared(tmp_path):
+    """Test that two stores on one file (as in two workers) share buckets"""
+    first = rate_limit.SharedStore(str(tmp_path / 'buckets'), slots=64)
+    second = rate_limit.SharedStore(str(tmp_path / 'buckets'), slots=64)
+    assert first.take('k:a', 3, 3, 1.0, 10.0)[0]
+    assert not second.take('k:a', 1, 3, 1.0, 10.0)[0]
+
+def test_rate_limit_response(monkeypatch):
+    """Test the 429 response with Retry-After and route costs"""
+    monkeypatch.setenv('RATE_LIMIT_ENABLED', 'true')
+    monkeypatch.setenv('RATE_LIMIT_CAPACITY', '4')
+    monkeypatch.setenv('RATE_LIMIT_REFILL_RATE', '0.5')
+    monkeypatch.setitem(rate_limit.ROUTE_COSTS, 'expensive', 3)
+    app = Flask(__name__)
+    rate_limit.init_rate_limit(app, lambda api_key: api_key in ('key-1', 'key-2'))
+    app.route('/expensive', endpoint='expensive')(lambda: 'ok')
+    client = app.test_client()
+
+    headers = {'x-api-key': 'key-1'}
+    # The request that looks a key up is charged to the IP address
+    assert client.get('/expensive', headers=headers).status_code == 200
+    assert client.get('/expensive', headers=headers).status_code == 200
+    response = client.get('/expensive', headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    other = {'REMOTE_ADDR': '10.0.0.2'}
+    assert client.get('/expensive', headers={'x-api-key': 'key-2'}, environ_base=other).status_code == 200
+    assert client.get('/expensive', headers={'x-api-key': 'key-2'}, environ_base=other).status_code == 200
+    assert rate_limit.rate_limit_stats()['limited'] >= 1
+
+def test_unknown_api_keys_share_the_ip_bucket(monkeypatch):
+    """Test that inventing a new API key per request does not get a fresh bucket"""
+    monkeypatch.setenv('RATE_LIMIT_ENABLED', 'true')
+    monkeypatch.setenv('RATE_LIMIT_CAPACITY', '3')
+    monkeypatch.setenv('RATE_LIMIT_REFILL_RATE', '0.01')
+    lookups = []
+    def lookup(api_key):
+        lookups.append(api_key)
+        return api_key == 'real-key'
+    app = Flask(__name__)
+    rate_limit.init_rate_limit(app, lookup)
+    app.route('/login', endpoint='login_page')(lambda: 'ok')
+    client = app.test_client()
+
+    statuses = [client.get('/login', headers={'x-api-key': f'random-{i}'}).status_code for i in range(5)]
+    assert statuses == [200, 200, 200, 429, 429]
+    # Keys arriving once the IP bucket is empty are not even looked up
+    assert lookups == ['random-0', 'random-1', 'random-2']
+    # A real key has its own bucket, and is only looked up once
+    assert client.get('/login', headers={'x-api-key': 'real-key'}, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
+    assert client.get('/login', headers={'x-api-key': 'real-key'}).status_code == 200
+    assert lookups.count('real-key') == 1
+
+def test_unknown_api_keys_are_cached():
+    """Test that repeated unknown keys are looked up once, and cannot evict real keys"""
+    lookups = []
+    def lookup(api_key):
+        lookups.append(api_key)
+        return api_key == 'real-key'
+    api_keys = rate_limit.ApiKeyCache(lookup, max_keys=10, ttl=60.0, max_unknown=2, unknown_ttl=5.0)
+    assert api_keys.is_valid('real-key', 0.0)
+    assert api_keys.cached('fake', 0.0) is None
+    assert not api_keys.is_valid('fake', 0.0) and not api_keys.is_valid('fake', 1.0)
+    assert lookups.count('fake') == 1
+    for i in range(10):
+        api_keys.is_valid(f'fake-{i}', 2.0)
+    assert api_keys.cached('real-key', 3.0) is True
+    assert api_keys.cached('fake-9', 3.0) is False
+    # Unknown answers expire sooner, in case the key has just been created
+    assert api_keys.cached('fake-9', 8.0) is None
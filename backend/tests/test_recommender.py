@@ -0,0 +1,101 @@
+import time
+import numpy as np
+import recommender
+from recommender import Recommendations, cooccurrence, write_version
+
+USERS = [1, 1, 1, 2, 2, 3, 3, 3, 4]
+ITEMS = [10, 20, 30, 10, 20, 10, 20, 40, 40]
+
+def neighbors_of(table, item_id):
+    row = int(np.searchsorted(table['ids'], item_id))
+    start, end = table['offsets'][row], table['offsets'][row + 1]
+    return table['neighbors'][start:end].tolist(), table['scores'][start:end].tolist()
+
+def test_cooccurrence_scores():
+    """Test that items seen by the same users are neighbours, scored by cosine similarity"""
+    table = cooccurrence(USERS, ITEMS)
+    assert table['ids'].tolist() == [10, 20, 30, 40]
+    neighbors, scores = neighbors_of(table, 10)
+    assert neighbors == [20, 30, 40]
+    assert np.allclose(scores, [1.0, 1 / np.sqrt(3), 1 / np.sqrt(6)])
+    assert neighbors_of(table, 40)[0] == [10, 20]
+
+def test_cooccurrence_matches_dense_product():
+    """Test the blocked sparse build against a dense X^T X, with tiny blocks and per-user caps"""
+    rng = np.random.default_rng(0)
+    users = rng.integers(0, 300, 5000)
+    items = rng.integers(0, 80, 5000)
+    table = cooccurrence(users, items, neighbors=100)
+    assert all(np.array_equal(table[name], array)
+               for name, array in cooccurrence(users, items, neighbors=100, pair_chunk=50).items())
+
+    seen = np.zeros((300, 80))
+    seen[users, items] = 1
+    counts = seen.T @ seen
+    popularity = np.diag(counts).copy()
+    np.fill_diagonal(counts, 0)
+    for item_id in table['ids']:
+        neighbors, scores = neighbors_of(table, item_id)
+        assert len(neighbors) == np.count_nonzero(counts[item_id])
+        assert np.allclose(scores, counts[item_id, neighbors] / np.sqrt(popularity[item_id] * popularity[neighbors]))
+        assert scores == sorted(scores, reverse=True)
+
+    # Only each user's most recent items count: user 1 keeps 20 and 30
+    capped = cooccurrence([1, 1, 1, 2, 2], [10, 20, 30, 10, 30], max_items_per_user=2)
+    assert neighbors_of(capped, 20)[0] == [30]
+    assert neighbors_of(capped, 10)[0] == [30]
+    # Recency is the last time an item was seen: seeing 10 again keeps it over 20
+    capped = cooccurrence([1, 1, 1, 1], [10, 20, 30, 10], max_items_per_user=2)
+    assert capped['ids'].tolist() == [10, 30]
+    assert cooccurrence([], [])['offsets'].tolist() == [0]
+
+def test_item_blocks_split_popular_items():
+    """Test that blocks stay near the pair budget even when one item alone exceeds it"""
+    sorted_items = np.array([0] * 10 + [1, 2, 2])
+    pair_sizes = np.full(len(sorted_items), 3)
+    blocks = list(recommender._item_blocks(sorted_items, pair_sizes, 7))
+    assert [(block.start, block.stop) for block in blocks] == [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10), (10, 11), (11, 13)]
+    assert max(pair_sizes[block].sum() for block in blocks) <= 7
+
+def test_versions_and_lookup(tmp_path):
+    """Test writing versions, switching readers to the newest and pruning old ones"""
+    reader = Recommendations(str(tmp_path), check_interval=0)
+    assert reader.similar('quiz', [10]) == []
+
+    first = write_version({'theme': cooccurrence([], []), 'quiz': cooccurrence(USERS, ITEMS)}, str(tmp_path))
+    assert reader.similar('quiz', [10], limit=2) == [(20, 1.0), (30, 0.5774)]
+    assert reader.version == first
+    # Scores of several seeds add up; seeds and excluded items are left out
+    assert [item for item, _ in reader.similar('quiz', [30, 40], exclude=[30, 40])] == [10, 20]
+    assert reader.similar('quiz', [99]) == []
+
+    write_version({'theme': cooccurrence([], []), 'quiz': cooccurrence([1, 1], [10, 50])}, str(tmp_path))
+    second = write_version({'theme': cooccurrence([], []), 'quiz': cooccurrence([1, 1], [10, 60])}, str(tmp_path))
+    assert reader.similar('quiz', [10]) == [(60, 1.0)]
+    assert reader.version == second
+    assert first not in [path.name for path in tmp_path.iterdir()]
+
+def test_lookup_after_empty_build(tmp_path):
+    """Test that a version built from no history answers lookups with no results"""
+    write_version({'theme': cooccurrence([], []), 'quiz': cooccurrence([], [])}, str(tmp_path))
+    reader = Recommendations(str(tmp_path), check_interval=0)
+    assert reader.similar('theme', {5}) == []
+    assert reader.similar('quiz', [10, 20], exclude=[10]) == []
+
+def test_build_speed(tmp_path):
+    """Test that a million interactions build in seconds and a lookup takes milliseconds"""
+    rng = np.random.default_rng(1)
+    users = rng.integers(0, 50000, 1000000)
+    items = rng.zipf(1.3, 1000000) % 10000
+    started = time.perf_counter()
+    table = cooccurrence(users, items)
+    assert time.perf_counter() - started < 10
+    assert np.all(np.diff(table['offsets']) <= recommender.NEIGHBORS_PER_ITEM)
+
+    write_version({'theme': cooccurrence([], []), 'quiz': table}, str(tmp_path))
+    reader = Recommendations(str(tmp_path), check_interval=3600)
+    seeds = table['ids'][:recommender.HISTORY_LIMIT]
+    started = time.perf_counter()
+    for _ in range(100):
+        reader.similar('quiz', seeds, exclude=seeds)
+    assert (time.perf_counter() - started) / 100 < 0.01
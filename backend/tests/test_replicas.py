@@ -0,0 +1,16 @@
+import pymysql
+from replicas import ReplicaPool, parse_hosts
+
+def test_parse_hosts():
+    """Test parsing the DB_REPLICA_HOSTS setting"""
+    assert parse_hosts('replica-1, replica-2:3308,') == [('replica-1', 3306), ('replica-2', 3308)]
+    assert parse_hosts('') == []
+
+def test_unreachable_replica_is_bypassed():
+    """Test that a replica failing its health check is not chosen"""
+    config = {'host': '127.0.0.1', 'port': 1, 'user': 'root', 'password': 'password',
+              'connect_timeout': 1, 'cursorclass': pymysql.cursors.DictCursor}
+    pool = ReplicaPool([config], check_interval=60)
+    pool.check()
+    assert pool.choose() is None
+    assert pool.stats() == {'replicas': 1, 'healthy': 0, 'lag_seconds': {'127.0.0.1:1': None}}
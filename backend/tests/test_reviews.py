@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta
+import srs
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+def test_apply_grade_grows_interval():
+    """Test the SM-2 interval sequence for successful reviews"""
+    state = srs.new_state()
+    intervals = []
+    for _ in range(4):
+        state = srs.apply_grade(state, 5, NOW)
+        intervals.append(state['interval_days'])
+    assert intervals[:2] == [1, 6]
+    assert intervals[2] > intervals[1] and intervals[3] > intervals[2]
+    assert state['due_at'] == NOW + timedelta(days=state['interval_days'])
+
+def test_apply_grade_lapse_resets_card():
+    """Test that a failed review restarts the card and lowers its ease"""
+    state = {'ease': 2.5, 'interval_days': 30, 'repetitions': 5}
+    state = srs.apply_grade(state, 1, NOW)
+    assert state['repetitions'] == 0
+    assert state['interval_days'] == 1
+    assert srs.MIN_EASE <= state['ease'] < 2.5
+
+def test_reviews_flow(client, test_db, test_user):
+    """Test recording a batch of grades and reading the due queue"""
+    headers = {'x-api-key': test_user['api_key']}
+    quiz_ids = []
+    for question in ('Card One', 'Card Two'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': question,
+            'answer_text': 'Answer',
+            'theme_id': None
+        }, headers=headers)
+        quiz_ids.append(response.get_json()['id'])
+
+    response = client.post('/me/reviews', json={'reviews': [
+        {'quiz_id': quiz_ids[0], 'grade': 5},
+        {'quiz_id': quiz_ids[1], 'grade': 0},
+        {'quiz_id': 999, 'grade': 4}
+    ]}, headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['reviewed'] == 2
+    assert data['unknown_quiz_ids'] == [999]
+
+    # Nothing is due yet: both cards were pushed at least a day out
+    response = client.get('/me/reviews/due', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+    with test_db.cursor() as cursor:
+        cursor.execute("UPDATE review_state SET due_at = %s WHERE quiz_id = %s",
+                       (datetime(2000, 1, 1), quiz_ids[1]))
+        test_db.commit()
+
+    response = client.get('/me/reviews/due?limit=5', headers=headers)
+    due = response.get_json()
+    assert [quiz['id'] for quiz in due] == [quiz_ids[1]]
+    assert due[0]['answer_text'] == 'Answer'
+
+    response = client.post('/me/reviews', json={'reviews': [{'quiz_id': quiz_ids[0], 'grade': 9}]},
+                           headers=headers)
+    assert response.status_code == 400
+
+def test_new_cards_fill_the_queue(client, test_db, test_user, test_theme):
+    """Test that a theme can be studied from scratch: unseen quizzes fill a queue with no review state"""
+    headers = {'x-api-key': test_user['api_key']}
+    quiz_ids = []
+    for question in ('New One', 'New Two', 'New Three'):
+        response = client.post('/quizzes', json={
+            'quiz_type': 'text',
+            'question_text': question,
+            'answer_text': 'Answer',
+            'theme_id': test_theme['id']
+        }, headers=headers)
+        quiz_ids.append(response.get_json()['id'])
+
+    response = client.get(f"/me/reviews/due?theme_id={test_theme['id']}&new=2", headers=headers)
+    assert response.status_code == 200
+    due = response.get_json()
+    assert [quiz['id'] for quiz in due] == quiz_ids[:2]
+    assert due[0]['due_at'] is None and due[0]['repetitions'] == 0
+
+    # A reviewed card is no longer new; the next unseen one takes its place
+    client.post('/me/reviews', json={'reviews': [{'quiz_id': quiz_ids[0], 'grade': 5}]}, headers=headers)
+    response = client.get(f"/me/reviews/due?theme_id={test_theme['id']}", headers=headers)
+    assert [quiz['id'] for quiz in response.get_json()] == quiz_ids[1:]
+
+    assert client.get('/me/reviews/due', headers=headers).get_json() == []
+    response = client.get('/me/reviews/due?new=-1', headers=headers)
+    assert response.status_code == 400
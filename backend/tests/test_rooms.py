@@ -0,0 +1,77 @@
+import asyncio
+import rooms
+
+QUIZZES = [
+    {'id': 1, 'quiz_type': 'multiple_choice', 'question_text': 'Pick B',
+     'answer_text': {'options': ['A', 'B', 'C'], 'correct': 'B'}},
+    {'id': 2, 'quiz_type': 'true_false', 'question_text': 'Sky is blue', 'answer_text': 'True'},
+]
+
+def test_is_correct():
+    """Test grading answers for each quiz type"""
+    assert rooms.is_correct(QUIZZES[0], 'B')
+    assert not rooms.is_correct(QUIZZES[0], 'A')
+    assert rooms.is_correct(QUIZZES[1], ' true ')
+    assert not rooms.is_correct(QUIZZES[1], None)
+    multi = {'quiz_type': 'multiple_choice', 'answer_text': {'options': [1, 2, 3], 'correct': [1, 3]}}
+    assert rooms.is_correct(multi, 3)
+
+def test_room_round():
+    """Test broadcasting a question, grading answers and the coalesced leaderboard"""
+    async def play():
+        room = rooms.Room('ABC123', 1, 1, QUIZZES)
+        alice = room.add_player('Alice')
+        bob = room.add_player('Bob')
+        subscribers = [room.subscribe() for _ in range(500)]
+
+        question = room.advance()
+        assert question['options'] == ['A', 'B', 'C']
+        assert 'answer_text' not in question
+
+        assert room.submit(alice, 'B')['correct']
+        assert not room.submit(bob, 'C')['correct']
+        try:
+            room.submit(alice, 'B')
+            assert False, 'second answer accepted'
+        except ValueError:
+            pass
+
+        await asyncio.sleep(rooms.LEADERBOARD_INTERVAL + 0.05)
+        received = []
+        while not subscribers[0].queue.empty():
+            received.append(subscribers[0].queue.get_nowait())
+        # Both answers produce a single leaderboard broadcast
+        assert [message.text.split('"')[3] for message in received] == ['question', 'leaderboard']
+        assert received[0] is subscribers[-1].queue.get_nowait()
+        assert room.leaderboard()[0]['name'] == 'Alice'
+
+        room.advance()
+        assert room.advance() is None
+        assert room.finished
+
+    asyncio.run(play())
+
+def test_slow_subscriber_is_dropped():
+    """Test that a client whose queue is full stops receiving broadcasts"""
+    room = rooms.Room('ABC123', 1, 1, QUIZZES)
+    subscriber = room.subscribe()
+    for _ in range(rooms.SUBSCRIBER_QUEUE_SIZE + 1):
+        room.broadcast('ping', {})
+    assert subscriber.dropped
+    assert subscriber not in room.subscribers
+
+def test_deleted_quizzes_are_not_played(app, test_db, test_user, test_theme, monkeypatch):
+    """Test that a room deck leaves out soft-deleted quizzes"""
+    from app import DB_CONFIG
+    monkeypatch.setattr(rooms, 'DB_CONFIG', dict(DB_CONFIG))
+    with test_db.cursor() as cursor:
+        for question, deleted_at in (('Kept', None), ('Deleted', '2024-01-01 00:00:00')):
+            cursor.execute(
+                """INSERT INTO quizzes (user_id, quiz_type, question_text, answer_text, theme_id, deleted_at)
+                   VALUES (%s, 'true_false', %s, 'True', %s, %s)""",
+                (test_user['id'], question, test_theme['id'], deleted_at)
+            )
+    test_db.commit()
+
+    quizzes = rooms.load_theme_quizzes(test_theme['id'])
+    assert [quiz['question_text'] for quiz in quizzes] == ['Kept']
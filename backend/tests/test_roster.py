@@ -0,0 +1,134 @@
+import json
+import jobs
+import roster
+from app import get_db
+
+def test_parse_and_validate_roster():
+    """Test reading a CSV roster and reporting bad rows"""
+    rows = roster.parse_roster(
+        b"name,email,password\nAda,ada@example.com,secret1\n,nobody@example.com,\nAda Two,ADA@example.com,\n",
+        'text/csv'
+    )
+    users, errors = roster.validate_rows(rows)
+    assert [user['email'] for user in users] == ['ada@example.com']
+    assert [(error['row'], error['error']) for error in errors] == [
+        (1, 'Missing name or email'),
+        (2, 'Duplicate email in roster'),
+    ]
+
+def test_password_must_be_a_string():
+    """Test that a non-string password is a row error rather than a crash while hashing"""
+    users, errors = roster.validate_rows([{'name': 'Ada', 'email': 'ada@example.com', 'password': 12345}])
+    assert users == []
+    assert errors == [{'row': 0, 'email': 'ada@example.com', 'error': 'Password must be a string'}]
+
+def test_generated_passwords_and_redaction():
+    """Test filling in missing passwords and dropping every password from a finished payload"""
+    rows = [{'name': 'Ada', 'email': 'ada@example.com', 'password': 'secret1'},
+            {'name': 'Bob', 'email': 'bob@example.com'}]
+    generated = roster.generate_missing_passwords(rows)
+    assert [(entry['row'], entry['email']) for entry in generated] == [(1, 'bob@example.com')]
+    assert rows[1]['password'] == generated[0]['password']
+    redacted = roster.redact_payload({'users': rows})
+    assert all('password' not in row for row in redacted['users'])
+    assert rows[0]['password'] == 'secret1'
+
+class FakeDb:
+    """Just enough of a connection for import_roster: every email is new"""
+
+    def __init__(self):
+        self.commits = 0
+        self._rows = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        emails = params if sql.startswith('SELECT id') else []
+        self._rows = [{'id': index, 'email': email} for index, email in enumerate(emails)]
+
+    def executemany(self, sql, params):
+        pass
+
+    def fetchall(self):
+        return self._rows
+
+    def commit(self):
+        self.commits += 1
+
+def test_import_reports_progress_for_every_chunk(monkeypatch):
+    """Test that a clean import heartbeats while hashing and after every committed chunk"""
+    monkeypatch.setattr(roster, 'ROSTER_CHUNK_SIZE', 2)
+    monkeypatch.setattr(roster, 'ROSTER_HASH_WORKERS', 1)
+    monkeypatch.setattr(roster, 'hash_passwords', lambda passwords: ['hash'] * len(passwords))
+    rows = [{'name': f'Student {index}', 'email': f's{index}@example.com', 'password': 'secret'} for index in range(5)]
+    reports = []
+    db = FakeDb()
+    result = roster.import_roster(db, rows, progress=lambda fraction, message: reports.append(fraction))
+    assert len(result['created']) == 5 and db.commits == 3
+    assert reports == [0.2, 0.4, 0.5, 0.7, 0.9, 1.0]
+
+def test_sealed_passwords():
+    """Test that queued passwords are encrypted and come back with their types"""
+    rows = [{'name': 'Ada', 'email': 'ada@example.com', 'password': 'secret1'},
+            {'name': 'Bob', 'email': 'bob@example.com', 'password': 12345},
+            {'name': 'Cy', 'email': 'cy@example.com'}]
+    roster.seal_passwords(rows, 'key')
+    assert 'secret1' not in json.dumps(rows) and '12345' not in json.dumps(rows)
+    try:
+        roster.open_passwords([dict(row) for row in rows], 'other-key')
+        assert False, 'opened with the wrong key'
+    except ValueError:
+        pass
+    roster.open_passwords(rows, 'key')
+    assert [row.get('password') for row in rows] == ['secret1', 12345, None]
+
+def test_import_roster(client, test_db, test_admin, test_user):
+    """Test bulk provisioning through a job, with duplicates reported per row and no stored credentials"""
+    headers = {'x-api-key': test_admin['api_key'], 'Idempotency-Key': 'roster-1'}
+    response = client.post('/admin/roster', json={'users': [
+        {'name': 'Student One', 'email': 'one@example.com', 'password': 'student123'},
+        {'name': 'Student Two', 'email': 'two@example.com'},
+        {'name': 'Existing', 'email': test_user['email']},
+    ]}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    generated = response.get_json()['generated_passwords']
+    assert [(entry['row'], entry['email']) for entry in generated] == [(1, 'two@example.com')]
+
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT payload FROM jobs WHERE id = %s", (job_id,))
+            payload = cursor.fetchone()['payload']
+            assert 'student123' not in payload and generated[0]['password'] not in payload
+        job = jobs.claim_job(db, 'test-worker')
+        assert job['id'] == job_id
+        assert jobs.run_job(db, job, 'test-worker')
+        with db.cursor() as cursor:
+            cursor.execute("SELECT payload FROM jobs WHERE id = %s", (job_id,))
+            assert 'password' not in cursor.fetchone()['payload']
+            cursor.execute("SELECT COUNT(*) AS stored FROM idempotency_keys WHERE response_body LIKE %s",
+                           ('%generated_passwords%',))
+            assert cursor.fetchone()['stored'] == 0
+    finally:
+        db.close()
+
+    result = client.get(f'/jobs/{job_id}', headers=headers).get_json()['result']
+    assert [user['email'] for user in result['created']] == ['one@example.com', 'two@example.com']
+    assert 'api_key' not in json.dumps(result) and 'password' not in json.dumps(result)
+    assert result['errors'] == [{'row': 2, 'email': test_user['email'], 'error': 'Email already registered'}]
+
+    response = client.post('/login', json={'email': 'one@example.com', 'password': 'student123'})
+    assert response.status_code == 200
+    response = client.post('/login', json={'email': 'two@example.com', 'password': generated[0]['password']})
+    assert response.status_code == 200
+
+    response = client.post('/admin/roster', json={'users': []}, headers={'x-api-key': test_user['api_key']})
+    assert response.status_code == 403
@@ -0,0 +1,86 @@
+import gzip
+import json
+import threading
+import time
+import pytest
+from flask import Flask
+import snapshots
+
+DECKS = {1: [{'id': 1, 'question_text': 'Theme Question'}]}
+
+@pytest.fixture
+def snapshot_app(tmp_path, monkeypatch):
+    """Create an app serving deck snapshots from a temporary directory"""
+    monkeypatch.setattr(snapshots, 'SNAPSHOTS_ENABLED', True)
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(snapshots, '_fresh', set())
+    snapshots.init_snapshots(lambda theme_id: json.dumps(DECKS[theme_id]).encode() if theme_id in DECKS else None)
+
+    app = Flask(__name__)
+    app.route('/themes/<int:theme_id>/quiz')(snapshots.send_snapshot)
+    return app
+
+def test_rebuild_and_serve_snapshot(snapshot_app):
+    """Test that a rebuilt snapshot is served with conditional and gzip support"""
+    assert not snapshots.is_fresh(1)
+    assert snapshots.rebuild_snapshot(1)
+    assert snapshots.is_fresh(1)
+
+    client = snapshot_app.test_client()
+    response = client.get('/themes/1/quiz')
+    assert response.status_code == 200
+    assert response.get_json() == DECKS[1]
+    etag = response.headers['ETag']
+    response.close()
+
+    response = client.get('/themes/1/quiz', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response.close()
+
+    response = client.get('/themes/1/quiz', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == DECKS[1]
+    response.close()
+
+    response = client.get('/themes/1/quiz', headers={'Range': 'bytes=0-0'})
+    assert response.status_code == 206
+    assert response.data == b'['
+    response.close()
+
+def test_schedule_rebuild_runs_in_background(snapshot_app):
+    """Test that invalidation marks the deck stale until the worker rebuilds it"""
+    snapshots.rebuild_snapshot(1)
+    snapshots.schedule_rebuild(1)
+    for _ in range(100):
+        if snapshots.is_fresh(1):
+            break
+        time.sleep(0.01)
+    assert snapshots.is_fresh(1)
+
+def test_reads_during_rebuild_do_not_invalidate(snapshot_app):
+    """Test that reads missing the snapshot while it is rebuilt let it become fresh"""
+    started, release, builds = threading.Event(), threading.Event(), []
+    def build(theme_id):
+        builds.append(theme_id)
+        started.set()
+        release.wait(5)
+        return json.dumps(DECKS[theme_id]).encode()
+    snapshots.init_snapshots(build)
+
+    snapshots.schedule_rebuild(1)
+    assert started.wait(5)
+    for _ in range(5):
+        assert not snapshots.is_fresh(1)
+        snapshots.request_build(1)
+    release.set()
+    for _ in range(100):
+        if snapshots.is_fresh(1):
+            break
+        time.sleep(0.01)
+    assert snapshots.is_fresh(1)
+    assert builds == [1]
+
+def test_missing_theme_has_no_snapshot(snapshot_app):
+    """Test that deleted themes do not leave a servable snapshot"""
+    assert not snapshots.rebuild_snapshot(2)
+    assert not snapshots.is_fresh(2)
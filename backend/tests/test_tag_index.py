@@ -0,0 +1,54 @@
+import pytest
+from tag_index import TagIndex, bit_positions, normalize_tags
+
+PAIRS = [(1, 'python'), (1, 'loops'), (2, 'python'), (2, 'loops'), (2, 'beginner'), (3, 'python'), (5, 'sql')]
+
+def test_tag_algebra():
+    """Test AND, OR and NOT tag queries on the bitmaps"""
+    index = TagIndex(lambda: PAIRS)
+    assert bit_positions(index.query(['python', 'loops'], none_of=['beginner'])) == [1]
+    assert bit_positions(index.query(any_of=['loops', 'sql'])) == [1, 2, 5]
+    assert bit_positions(index.query(['python'], any_of=['sql'])) == []
+    assert bit_positions(index.query(['missing'])) == []
+    assert index.counts()['python'] == 3
+
+def test_incremental_updates():
+    """Test that writes update the bitmaps without a reload"""
+    index = TagIndex(lambda: PAIRS)
+    index.query(['python'])
+    index.add(7, ['python', 'beginner'])
+    index.remove(1)
+    index.remove(5, ['sql'])
+    assert bit_positions(index.query(['python'])) == [2, 3, 7]
+    assert 'sql' not in index.counts()
+
+def test_writes_during_rebuild_are_kept():
+    """Test that a write landing while the index reloads is not lost when the load is swapped in"""
+    stored = list(PAIRS)
+    loads = []
+    def load():
+        loads.append(1)
+        pairs = list(stored)
+        if len(loads) == 2:
+            # Another request tags quiz 9 after this load has read quiz_tags
+            stored.append((9, 'sql'))
+            index.add(9, ['sql'])
+        return pairs
+    index = TagIndex(load, ttl=0)
+    index.query(['sql'])
+    assert bit_positions(index.query(['sql'])) == [5, 9]
+    assert len(loads) == 3
+
+def test_normalize_tags():
+    """Test tag name normalization and validation"""
+    assert normalize_tags(['Python', ' python ', 'Data  Science']) == ['python', 'data science']
+    with pytest.raises(ValueError):
+        normalize_tags(['bad;tag'])
+    with pytest.raises(ValueError):
+        normalize_tags('python')
+
+def test_bit_positions_limit():
+    """Test extracting a limited number of ids from a large bitmap"""
+    bitmap = (1 << 1_000_000) | (1 << 3) | 1
+    assert bit_positions(bitmap) == [0, 3, 1_000_000]
+    assert bit_positions(bitmap, limit=2) == [0, 3]
@@ -0,0 +1,48 @@
+"""Background job worker: runs jobs queued through POST /jobs
+
+Run with: python worker.py (JOB_WORKERS processes, default 2)
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import jobs
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+logger = logging.getLogger('quizbox-jobs')
+
+def worker_main(stop):
+    # Importing the app registers the job handlers and the database settings
+    import app
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    jobs.run_worker(app.get_db, stop)
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    processes = {}
+    try:
+        while not stop.is_set():
+            # Start missing workers, replacing any that died
+            for slot in range(JOB_WORKERS):
+                process = processes.get(slot)
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        logger.warning(f"Job worker {process.pid} exited with {process.exitcode}, restarting")
+                    process = multiprocessing.Process(target=worker_main, args=(stop,), name=f'job-worker-{slot}')
+                    process.start()
+                    processes[slot] = process
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+    for process in processes.values():
+        process.join()
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@ import requests
 import os
 import logging
 from api_docs import api_bp
+from assets import init_assets
+from compression import init_compression, compression_stats
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev')
@@ -10,6 +12,12 @@ app.secret_key = os.environ.get('SECRET_KEY', 'dev')
 # Register the API documentation blueprint
 app.register_blueprint(api_bp, url_prefix='/api')
 
+# Serve fingerprinted, precompressed static assets
+init_assets(app)
+
+# Opt-in gzip/brotli compression of rendered pages
+init_compression(app)
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -143,13 +151,14 @@ def dashboard():
         # Get user's quizzes
         quizzes_response = requests.get(
             f'{BACKEND_URL}/quizzes',  # Updated endpoint
+            params={'fields': 'all'},  # The dashboard renders answers too
             headers={'x-api-key': api_key},
             cookies={'session': session.get('user_id')}
         )
         quizzes = quizzes_response.json() if quizzes_response.status_code == 200 else []
         
         # Get default quizzes
-        default_response = requests.get(f'{BACKEND_URL}/quizzes/default')
+        default_response = requests.get(f'{BACKEND_URL}/quizzes/default', params={'fields': 'all'})
         default_quizzes = default_response.json() if default_response.status_code == 200 else []
         
         return render_template('dashboard.html', quizzes=quizzes, default_quizzes=default_quizzes)
@@ -205,24 +214,39 @@ def new_quiz():
             logger.error("Error creating quiz", exc_info=True)
             return jsonify({'error': str(e)}), 500
     
-    # GET request - show form
+    # GET request - show form; themes are looked up as the user types
+    return render_template('new_quiz.html')
+
+@app.route('/autocomplete')
+def autocomplete():
+    """Proxy theme and question suggestions for the new quiz form"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
     try:
-        # Get themes
-        logger.info("Fetching themes from backend...")
-        themes_response = requests.get(f'{BACKEND_URL}/themes')
-        logger.info(f"Themes response status: {themes_response.status_code}")
-        logger.info(f"Themes response content: {themes_response.text}")
-        
-        if themes_response.status_code == 200:
-            themes = themes_response.json()  # Themes array is returned directly now
-            logger.info(f"Retrieved themes: {themes}")
-            return render_template('new_quiz.html', themes=themes)
-        else:
-            logger.error(f"Failed to get themes: {themes_response.text}")
-            return render_template('new_quiz.html', themes=[], error='Failed to load themes')
+        # Queried on every keystroke, so the API key is looked up once per session
+        api_key = session.get('api_key')
+        if not api_key:
+            api_key_response = requests.get(
+                f'{BACKEND_URL}/me/api-key',
+                cookies={'session': session.get('user_id')}
+            )
+            if api_key_response.status_code != 200:
+                return jsonify({'error': 'Failed to get API key'}), api_key_response.status_code
+            api_key = session['api_key'] = api_key_response.json()['api_key']
+
+        response = requests.get(
+            f'{BACKEND_URL}/autocomplete',
+            params={key: request.args[key] for key in ('prefix', 'kind', 'limit') if key in request.args},
+            headers={'x-api-key': api_key},
+            timeout=2
+        )
+        if response.status_code == 401:
+            session.pop('api_key', None)
+        return jsonify(response.json()), response.status_code
     except Exception as e:
-        logger.error("Error getting themes", exc_info=True)
-        return render_template('new_quiz.html', themes=[], error=str(e))
+        logger.error("Error fetching suggestions", exc_info=True)
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/settings')
 def settings():
@@ -260,10 +284,16 @@ def refresh_api_key():
         if response.status_code != 200:
             return jsonify({'error': 'Failed to refresh API key'}), response.status_code
         
+        session.pop('api_key', None)
         return jsonify(response.json())
     except Exception as e:
         logger.error("Error refreshing API key", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Expose internal performance counters"""
+    return jsonify({'compression': compression_stats()})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5151, debug=True) 
\ No newline at end of file
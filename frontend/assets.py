@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+from flask import Blueprint, request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always built
+    brotli = None
+
+logger = logging.getLogger('quizbox-frontend')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+BUILD_DIR = os.path.join(BASE_DIR, 'build', 'assets')
+
+# Fingerprinted files never change, so browsers may keep them for a year
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Only text formats benefit from precompression
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.map', '.html'}
+MIN_COMPRESS_SIZE = 256
+
+# Encodings we precompress, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+assets_bp = Blueprint('assets', __name__)
+
+_manifest = {}
+
+def fingerprint(content):
+    """Return a short content hash used in asset filenames"""
+    return hashlib.sha256(content).hexdigest()[:12]
+
+def fingerprinted_name(path, digest):
+    """Insert the digest before the file extension (css/app.css -> css/app.<digest>.css)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def _source_files(static_dir):
+    for root, _dirs, files in os.walk(static_dir):
+        for filename in files:
+            full_path = os.path.join(root, filename)
+            yield os.path.relpath(full_path, static_dir).replace(os.sep, '/'), full_path
+
+def build_assets(static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    """Copy static files into build_dir under fingerprinted names with .gz/.br variants.
+
+    Returns the manifest mapping logical paths (js/dashboard.js) to
+    fingerprinted paths (js/dashboard.1a2b3c4d5e6f.js).
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    manifest = {}
+    for logical_path, full_path in _source_files(static_dir):
+        with open(full_path, 'rb') as f:
+            content = f.read()
+
+        built_path = fingerprinted_name(logical_path, fingerprint(content))
+        target = os.path.join(build_dir, built_path)
+        _write(target, content)
+
+        ext = os.path.splitext(logical_path)[1].lower()
+        if ext in COMPRESSIBLE_EXTENSIONS and len(content) >= MIN_COMPRESS_SIZE:
+            # mtime=0 keeps the gzip output byte-for-byte reproducible
+            _write(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(target + '.br', brotli.compress(content, quality=11))
+
+        manifest[logical_path] = built_path
+
+    with open(os.path.join(build_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    logger.info(f"Built {len(manifest)} static assets into {build_dir}")
+    return manifest
+
+def _manifest_is_stale(static_dir, manifest_path):
+    if not os.path.exists(manifest_path):
+        return True
+    built_at = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(full_path) > built_at
+               for _logical_path, full_path in _source_files(static_dir))
+
+def load_manifest(static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    """Load the asset manifest, rebuilding it when sources changed"""
+    manifest_path = os.path.join(build_dir, 'manifest.json')
+    if _manifest_is_stale(static_dir, manifest_path):
+        return build_assets(static_dir, build_dir)
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def asset_url(path):
+    """Template helper returning the fingerprinted URL for a static asset"""
+    built_path = _manifest.get(path)
+    if built_path is None:
+        # Unknown to the manifest (e.g. added after startup): serve it uncached
+        return url_for('static', filename=path)
+    return url_for('assets.asset', filename=built_path)
+
+@assets_bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted asset, preferring a precompressed variant"""
+    if filename.endswith(('.gz', '.br')) or filename == 'manifest.json':
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = None
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(BUILD_DIR, filename + suffix)):
+            response = send_from_directory(BUILD_DIR, filename + suffix, mimetype=mimetype,
+                                           max_age=ASSET_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            del response.headers['Content-Disposition']
+            break
+    if response is None:
+        response = send_from_directory(BUILD_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_assets(app):
+    """Build (if needed) and register the static asset pipeline on app"""
+    global _manifest
+    _manifest = load_manifest()
+    app.register_blueprint(assets_bp)
+    app.add_template_global(asset_url)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    build_assets()
@@ -0,0 +1,186 @@
+"""Opt-in gzip/brotli compression of Flask responses
+
+The backend and frontend are deployed separately, so each carries a copy of
+this module: backend/compression.py and frontend/compression.py must stay identical.
+"""
+import gzip
+import os
+import threading
+import time
+import zlib
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Responses smaller than this are not worth the CPU (and may grow when compressed)
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+# Brotli quality 4 is close to gzip -6 in speed while compressing better
+DEFAULT_BROTLI_QUALITY = 4
+
+# Non-text types that still compress well; images, archives, fonts etc. are
+# already compressed and are left alone
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'compressed': 0,
+    'streamed': 0,
+    'skipped_small': 0,
+    'skipped_ineffective': 0,
+    'bytes_in': 0,
+    'bytes_out': 0,
+    'seconds': 0.0,
+    'by_encoding': {},
+}
+
+def _env_flag(name, default='false'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+def _record(encoding, bytes_in, bytes_out, seconds, streamed=False):
+    with _stats_lock:
+        _stats['compressed'] += 1
+        if streamed:
+            _stats['streamed'] += 1
+        _stats['bytes_in'] += bytes_in
+        _stats['bytes_out'] += bytes_out
+        _stats['seconds'] += seconds
+        _stats['by_encoding'][encoding] = _stats['by_encoding'].get(encoding, 0) + 1
+
+def _record_skip(reason):
+    with _stats_lock:
+        _stats[reason] += 1
+
+def compression_stats():
+    """Return compression counters, including the overall ratio and mean time per response"""
+    with _stats_lock:
+        stats = dict(_stats, by_encoding=dict(_stats['by_encoding']))
+    stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 4) if stats['bytes_in'] else None
+    stats['avg_ms'] = round(stats['seconds'] * 1000 / stats['compressed'], 3) if stats['compressed'] else None
+    return stats
+
+def is_compressible(mimetype):
+    """Check whether a response of this mimetype is worth compressing"""
+    if not mimetype:
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+def choose_encoding(accept_encodings):
+    """Pick the best encoding the client accepts, preferring brotli on ties"""
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding):
+    """Compress a complete response body"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=current_app.config['COMPRESSION_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=current_app.config['COMPRESSION_GZIP_LEVEL'])
+
+class _StreamCompressor:
+    """Incremental compressor that flushes after every chunk so streamed data is not held back"""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 selects the gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def _compress_stream(chunks, compressor):
+    bytes_in = bytes_out = 0
+    seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            start = time.perf_counter()
+            out = compressor.compress(chunk)
+            seconds += time.perf_counter() - start
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            if out:
+                yield out
+        out = compressor.finish()
+        bytes_out += len(out)
+        yield out
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        _record(compressor.encoding, bytes_in, bytes_out, seconds, streamed=True)
+
+def compress_response(response):
+    """after_request hook compressing eligible responses according to Accept-Encoding"""
+    config = current_app.config
+    if not config['COMPRESSION_ENABLED']:
+        return response
+    if (request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough  # files served by send_file
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        compressor = _StreamCompressor(encoding, config['COMPRESSION_GZIP_LEVEL'],
+                                       config['COMPRESSION_BROTLI_QUALITY'])
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < config['COMPRESSION_MIN_SIZE']:
+        _record_skip('skipped_small')
+        return response
+
+    start = time.perf_counter()
+    compressed = compress(data, encoding)
+    elapsed = time.perf_counter() - start
+    if len(compressed) >= len(data):
+        _record_skip('skipped_ineffective')
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    _record(encoding, len(data), len(compressed), elapsed)
+    return response
+
+def init_compression(app):
+    """Register opt-in response compression on app (enable with COMPRESSION_ENABLED=true)"""
+    app.config.setdefault('COMPRESSION_ENABLED', _env_flag('COMPRESSION_ENABLED'))
+    app.config.setdefault('COMPRESSION_MIN_SIZE', int(os.environ.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)))
+    app.config.setdefault('COMPRESSION_GZIP_LEVEL', int(os.environ.get('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)))
+    app.config.setdefault('COMPRESSION_BROTLI_QUALITY',
+                          int(os.environ.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)))
+    app.after_request(compress_response)
@@ -0,0 +1,54 @@
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.check-answer').forEach(button => {
+        button.addEventListener('click', function() {
+            const quizId = this.dataset.quizId;
+            const quizContainer = document.getElementById(`quiz-${quizId}`);
+            const feedbackDiv = quizContainer.querySelector('.feedback');
+
+            let isCorrect = false;
+            let message = '';
+
+            if (this.dataset.correct.startsWith('[')) {
+                // Multiple choice quiz
+                const correctAnswers = JSON.parse(this.dataset.correct);
+                const selectedOption = quizContainer.querySelector('input[type="radio"]:checked');
+
+                if (!selectedOption) {
+                    message = 'Please select an answer.';
+                } else {
+                    isCorrect = correctAnswers.includes(selectedOption.value);
+                    message = isCorrect ? 'Correct!' : `Incorrect. The correct answer is: ${correctAnswers.join(' or ')}`;
+                }
+            } else {
+                // Text or True/False quiz
+                const quizType = quizContainer.querySelector('.true-false-options') ? 'true_false' : 'text';
+
+                if (quizType === 'true_false') {
+                    const selectedOption = quizContainer.querySelector('input[type="radio"]:checked');
+                    if (!selectedOption) {
+                        message = 'Please select an answer.';
+                    } else {
+                        const correctAnswer = this.dataset.correct.toLowerCase();
+                        isCorrect = selectedOption.value.toLowerCase() === correctAnswer;
+                        message = isCorrect ? 'Correct!' : `Incorrect. The correct answer is: ${correctAnswer}`;
+                    }
+                } else {
+                    // Text answer quiz
+                    const userAnswer = quizContainer.querySelector('input[type="text"]').value.trim().toLowerCase();
+                    const correctAnswer = this.dataset.correct.toLowerCase();
+
+                    if (!userAnswer) {
+                        message = 'Please enter an answer.';
+                    } else {
+                        isCorrect = userAnswer === correctAnswer;
+                        message = isCorrect ? 'Correct!' : `Incorrect. The correct answer is: ${this.dataset.correct}`;
+                    }
+                }
+            }
+
+            feedbackDiv.textContent = message;
+            feedbackDiv.className = `feedback mt-2 ${isCorrect ? 'correct' : 'incorrect'}`;
+            feedbackDiv.style.display = 'block';
+        });
+    });
+});
@@ -0,0 +1,33 @@
+document.getElementById('loginForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const errorMessage = document.getElementById('error-message');
+    errorMessage.classList.add('d-none');
+
+    const formData = {
+        email: document.getElementById('email').value,
+        password: document.getElementById('password').value
+    };
+
+    try {
+        const response = await fetch('/login', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(formData)
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            window.location.href = '/dashboard';
+        } else {
+            errorMessage.textContent = data.error || 'Login failed';
+            errorMessage.classList.remove('d-none');
+        }
+    } catch (error) {
+        errorMessage.textContent = 'An error occurred during login';
+        errorMessage.classList.remove('d-none');
+    }
+});
@@ -0,0 +1,206 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const quizTypeSelect = document.getElementById('quiz_type');
+    const quizSections = document.querySelectorAll('.quiz-section');
+    const optionsContainer = document.getElementById('optionsContainer');
+    const addOptionButton = document.getElementById('addOption');
+    const quizForm = document.getElementById('quizForm');
+    const submitButton = document.getElementById('submitButton');
+    let optionCount = 1;
+
+    // Show/hide quiz sections based on type
+    quizTypeSelect.addEventListener('change', function() {
+        const selectedType = this.value;
+        console.log('Selected type:', selectedType);
+
+        // Hide all sections first
+        quizSections.forEach(section => section.style.display = 'none');
+
+        // Show the selected section
+        const selectedSection = document.getElementById(selectedType + 'Section');
+        console.log('Selected section:', selectedSection);
+
+        if (selectedSection) {
+            selectedSection.style.display = 'block';
+        }
+    });
+
+    // Add new option for multiple choice
+    addOptionButton && addOptionButton.addEventListener('click', function() {
+        const newOption = document.createElement('div');
+        newOption.className = 'input-group mb-2';
+        newOption.innerHTML = `
+            <input type="text" class="form-control" name="options[]" placeholder="Option text" required>
+            <div class="input-group-text">
+                <input class="form-check-input" type="checkbox" name="correct_options[]" value="${optionCount}">
+            </div>
+        `;
+        optionsContainer.appendChild(newOption);
+        optionCount++;
+    });
+
+    // Suggestions as the user types; each keystroke cancels the previous lookup
+    function attachAutocomplete(input, list, kind, render, onPick) {
+        let pending = null;
+        input.addEventListener('input', function() {
+            if (pending) {
+                pending.abort();
+            }
+            pending = new AbortController();
+            const params = new URLSearchParams({ kind: kind, prefix: input.value, limit: 8 });
+            fetch('/autocomplete?' + params, { signal: pending.signal })
+                .then(response => response.ok ? response.json() : [])
+                .then(items => {
+                    list.innerHTML = '';
+                    items.forEach(item => {
+                        const button = document.createElement('button');
+                        button.type = 'button';
+                        button.className = 'list-group-item list-group-item-action';
+                        button.textContent = render(item);
+                        button.addEventListener('click', function() {
+                            onPick(item);
+                            list.innerHTML = '';
+                        });
+                        list.appendChild(button);
+                    });
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Autocomplete failed:', error);
+                    }
+                });
+        });
+    }
+
+    const themeSearch = document.getElementById('theme_search');
+    const themeIdInput = document.getElementById('theme_id');
+    themeSearch.addEventListener('input', function() {
+        themeIdInput.value = '';
+    });
+    attachAutocomplete(themeSearch, document.getElementById('themeSuggestions'), 'theme',
+        theme => `${theme.name} (${theme.quizzes})`,
+        theme => {
+            themeSearch.value = theme.name;
+            themeIdInput.value = theme.id;
+        });
+
+    // Existing questions are shown so duplicates are spotted before they are written
+    const questionInput = document.getElementById('question_text');
+    attachAutocomplete(questionInput, document.getElementById('questionSuggestions'), 'question',
+        question => question.question_text,
+        question => {
+            questionInput.value = question.question_text;
+        });
+
+    // Form submission handling
+    function handleSubmit(e) {
+        e.preventDefault();
+        console.log('Form submission triggered');
+
+        try {
+            const formData = new FormData(quizForm);
+            const quizType = formData.get('quiz_type');
+            console.log('Quiz type:', quizType);
+
+            const quizData = {
+                quiz_type: quizType === 'multipleChoice' ? 'multiple_choice' : 
+                          quizType === 'trueFalse' ? 'true_false' : 'text',
+                question_text: formData.get('question_text'),
+                theme_id: formData.get('theme_id') || null
+            };
+
+            // Handle different quiz types
+            switch(quizType) {
+                case 'textAnswer':
+                    quizData.answer_text = formData.get('answer_text');
+                    break;
+                case 'multipleChoice':
+                    const options = Array.from(formData.getAll('options[]')).filter(opt => opt.trim());
+                    const correctIndices = formData.getAll('correct_options[]');
+
+                    if (options.length === 0) {
+                        throw new Error('Please add at least one option');
+                    }
+                    if (correctIndices.length === 0) {
+                        throw new Error('Please select at least one correct answer');
+                    }
+
+                    const correctOptions = correctIndices.map(i => options[parseInt(i)]).filter(Boolean);
+                    if (correctOptions.length === 0) {
+                        throw new Error('Invalid correct answer selection');
+                    }
+
+                    quizData.answer_text = {
+                        options: options,
+                        correct: correctOptions
+                    };
+                    break;
+                case 'fillBlank':
+                    quizData.quiz_type = 'text';
+                    quizData.answer_text = formData.get('fill_blank_answer');
+                    if (!quizData.answer_text) {
+                        throw new Error('Please enter a correct answer');
+                    }
+                    break;
+                case 'trueFalse':
+                    quizData.answer_text = formData.get('true_false_answer');
+                    if (!quizData.answer_text) {
+                        throw new Error('Please select true or false');
+                    }
+                    break;
+                default:
+                    throw new Error('Please select a quiz type');
+            }
+
+            console.log('Submitting quiz data:', quizData);
+
+            // Submit the form data
+            fetch('/quiz/new', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(quizData)
+            })
+            .then(response => {
+                if (response.ok) {
+                    window.location.href = '/dashboard';
+                    return;
+                }
+                return response.text().then(text => {
+                    try {
+                        const data = JSON.parse(text);
+                        throw new Error(data.error || 'Failed to create quiz');
+                    } catch (e) {
+                        throw new Error(text || 'Failed to create quiz');
+                    }
+                });
+            })
+            .catch(error => {
+                const errorDiv = document.querySelector('.alert-danger') || document.createElement('div');
+                errorDiv.className = 'alert alert-danger';
+                errorDiv.textContent = error.message;
+                const cardBody = document.querySelector('.card-body');
+                const form = document.querySelector('form');
+                if (!errorDiv.parentNode) {
+                    cardBody.insertBefore(errorDiv, form);
+                }
+            });
+        } catch (error) {
+            const errorDiv = document.querySelector('.alert-danger') || document.createElement('div');
+            errorDiv.className = 'alert alert-danger';
+            errorDiv.textContent = error.message;
+            const cardBody = document.querySelector('.card-body');
+            const form = document.querySelector('form');
+            if (!errorDiv.parentNode) {
+                cardBody.insertBefore(errorDiv, form);
+            }
+        }
+    }
+
+    // Add both submit button click and form submit handlers
+    quizForm.addEventListener('submit', handleSubmit);
+    submitButton.addEventListener('click', function(e) {
+        e.preventDefault();
+        handleSubmit(e);
+    });
+});
@@ -0,0 +1,49 @@
+document.getElementById('registerForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const errorMessage = document.getElementById('error-message');
+    errorMessage.classList.add('d-none');
+
+    // Disable the submit button to prevent double submission
+    const submitButton = e.target.querySelector('button[type="submit"]');
+    const originalButtonText = submitButton.textContent;
+    submitButton.disabled = true;
+    submitButton.textContent = 'Registering...';
+
+    const formData = {
+        name: document.getElementById('name').value,
+        email: document.getElementById('email').value,
+        password: document.getElementById('password').value
+    };
+
+    try {
+        const response = await fetch('/register', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(formData)
+        });
+
+        const data = await response.json();
+
+        if (response.status === 201) {
+            // Successful registration, redirect to dashboard
+            window.location.href = '/dashboard';
+            return;
+        }
+
+        // Handle error cases
+        errorMessage.textContent = data.error || 'Registration failed';
+        errorMessage.classList.remove('d-none');
+        submitButton.disabled = false;
+        submitButton.textContent = originalButtonText;
+
+    } catch (error) {
+        console.error('Registration error:', error);
+        errorMessage.textContent = 'An error occurred during registration';
+        errorMessage.classList.remove('d-none');
+        submitButton.disabled = false;
+        submitButton.textContent = originalButtonText;
+    }
+});
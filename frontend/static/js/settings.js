@@ -0,0 +1,37 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const copyButton = document.getElementById('copyKey');
+    const refreshButton = document.getElementById('refreshKey');
+    const apiKeyInput = document.getElementById('apiKey');
+
+    copyButton.addEventListener('click', function() {
+        apiKeyInput.select();
+        document.execCommand('copy');
+        copyButton.innerHTML = '<i class="bi bi-check"></i> Copied!';
+        setTimeout(() => {
+            copyButton.innerHTML = '<i class="bi bi-clipboard"></i> Copy';
+        }, 2000);
+    });
+
+    refreshButton.addEventListener('click', function() {
+        fetch('/settings/refresh-key', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.api_key) {
+                apiKeyInput.value = data.api_key;
+                refreshButton.innerHTML = '<i class="bi bi-check"></i> Refreshed!';
+                setTimeout(() => {
+                    refreshButton.innerHTML = '<i class="bi bi-arrow-clockwise"></i> Refresh';
+                }, 2000);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Failed to refresh API key');
+        });
+    });
+});
@@ -0,0 +1,45 @@
+import gzip
+import json
+import os
+from assets import build_assets, fingerprint, fingerprinted_name, load_manifest
+
+def _make_static(tmp_path):
+    static_dir = tmp_path / 'static'
+    (static_dir / 'js').mkdir(parents=True)
+    (static_dir / 'js' / 'app.js').write_text('console.log("quizbox");\n' * 50)
+    (static_dir / 'css').mkdir()
+    (static_dir / 'css' / 'tiny.css').write_text('.a{}')
+    return static_dir
+
+def test_build_assets_fingerprints_and_precompresses(tmp_path):
+    """Test that assets are copied under content hashes with compressed variants"""
+    static_dir = _make_static(tmp_path)
+    build_dir = tmp_path / 'build'
+
+    manifest = build_assets(str(static_dir), str(build_dir))
+
+    content = (static_dir / 'js' / 'app.js').read_bytes()
+    expected = fingerprinted_name('js/app.js', fingerprint(content))
+    assert manifest['js/app.js'] == expected
+    assert (build_dir / expected).read_bytes() == content
+    assert gzip.decompress((build_dir / (expected + '.gz')).read_bytes()) == content
+
+    # Files below the size threshold are not worth compressing
+    tiny = manifest['css/tiny.css']
+    assert not os.path.exists(build_dir / (tiny + '.gz'))
+
+    with open(build_dir / 'manifest.json') as f:
+        assert json.load(f) == manifest
+
+def test_fingerprint_changes_with_content(tmp_path):
+    """Test that editing a source file yields a new asset name"""
+    static_dir = _make_static(tmp_path)
+    build_dir = tmp_path / 'build'
+    first = load_manifest(str(static_dir), str(build_dir))
+
+    (static_dir / 'js' / 'app.js').write_text('console.log("changed");\n')
+    os.utime(static_dir / 'js' / 'app.js', (os.path.getmtime(build_dir / 'manifest.json') + 10,) * 2)
+    second = load_manifest(str(static_dir), str(build_dir))
+
+    assert first['js/app.js'] != second['js/app.js']
+    assert first['css/tiny.css'] == second['css/tiny.css']
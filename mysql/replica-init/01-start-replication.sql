@@ -0,0 +1,9 @@
+-- Replicate everything from the primary using GTID auto-positioning
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'password',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;